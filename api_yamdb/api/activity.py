@@ -0,0 +1,308 @@
+"""
+Site-wide feed of the newest reviews and comments, ``/api/v1/activity/``.
+
+Every process keeps the newest ``ACTIVITY_BUFFER_SIZE`` events in a ring
+buffer, backfilled from the ``pub_date`` indexes at startup and patched by
+the model signals of its own writes. Writes of other processes are picked
+up by a sync at most every ``ACTIVITY_SYNC_INTERVAL`` seconds, which reads
+the rows updated and the tombstones left since the last one and patches
+the buffered events in place. Events of hidden titles and users are left
+out; hiding bumps an ``IndexVersion`` so every process backfills again.
+Cursors older than the buffer read the indexes directly.
+"""
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from reviews.models import Comment, IndexVersion, Review, Tombstone, User
+
+from . import cursors
+
+INDEX_NAME = 'activity'
+KINDS = ('comment', 'review')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Commits may land out of pub_date order, syncs look back this far.
+SYNC_LOOKBACK = timedelta(seconds=10)
+
+
+def review_event(row):
+    return (row['pub_date'], 'review', row['id']), {
+        'type': 'review',
+        'id': row['id'],
+        'title_id': row['title_id'],
+        'author_id': row['author_id'],
+        'author': row['username'],
+        'text': row['text'][:settings.ACTIVITY_TEXT_LENGTH],
+        'score': row['score'],
+        'pub_date': row['pub_date'],
+    }
+
+
+def comment_event(row):
+    return (row['pub_date'], 'comment', row['id']), {
+        'type': 'comment',
+        'id': row['id'],
+        'title_id': row['title_id'],
+        'review_id': row['review_id'],
+        'author_id': row['author_id'],
+        'author': row['username'],
+        'text': row['text'][:settings.ACTIVITY_TEXT_LENGTH],
+        'pub_date': row['pub_date'],
+    }
+
+
+def load(before=None, changed_since=None, limit=None):
+    """
+    Visible events newest first, older than the ``before`` key and updated
+    after the ``changed_since`` datetime, at most ``limit`` of them.
+    """
+    reviews = Review.objects.filter(
+        cursors.before('pub_date', 'review', before),
+        hidden_at__isnull=True,
+        title__deleted_at__isnull=True,
+        author__deleted_at__isnull=True,
+    ).values(
+        'id', 'title_id', 'author_id', 'text', 'score', 'pub_date',
+        username=F('author__username'),
+    )
+    comments = Comment.objects.filter(
+        cursors.before('pub_date', 'comment', before),
+        hidden_at__isnull=True,
+        review__hidden_at__isnull=True,
+        review__title__deleted_at__isnull=True,
+        review__author__deleted_at__isnull=True,
+        author__deleted_at__isnull=True,
+    ).values(
+        'id', 'review_id', 'author_id', 'text', 'pub_date',
+        title_id=F('review__title_id'), username=F('author__username'),
+    )
+    if changed_since is not None:
+        reviews = reviews.filter(updated_at__gt=changed_since)
+        comments = comments.filter(updated_at__gt=changed_since)
+    reviews = reviews.order_by('-pub_date', '-id')[:limit]
+    comments = comments.order_by('-pub_date', '-id')[:limit]
+    events = merge(
+        map(review_event, reviews),
+        map(comment_event, comments),
+        key=lambda event: event[0],
+        reverse=True,
+    )
+    return list(islice(events, limit))
+
+
+def resolve(events):
+    """
+    Fill in the authors and titles the signals could not know without a
+    query, two queries for the whole page at most.
+    """
+    data = [data for _, data in events]
+    authors = {row['author_id'] for row in data if row['author'] is None}
+    if authors:
+        names = dict(
+            User.objects.filter(pk__in=authors).values_list('pk', 'username')
+        )
+        for row in data:
+            if row['author'] is None:
+                row['author'] = names.get(row['author_id'])
+    reviews = {row['review_id'] for row in data if row['title_id'] is None}
+    if reviews:
+        titles = dict(
+            Review.objects.filter(pk__in=reviews).values_list('pk', 'title_id')
+        )
+        for row in data:
+            if row['title_id'] is None:
+                row['title_id'] = titles.get(row['review_id'])
+    return events
+
+
+def patch(data, update):
+    """``data`` updated with what ``update`` knows, e.g. not the author."""
+    if update is None:
+        return data
+    return {
+        **data,
+        **{name: value for name, value in update.items() if value is not None},
+    }
+
+
+class ActivityFeed:
+    """The ring buffer of this process, newest event first."""
+
+    def __init__(self):
+        self.events = deque()
+        # Whether the buffer holds every event there is.
+        self.complete = False
+        self.version = None
+        self.synced = 0.0
+        # Database time the next sync reads changes from.
+        self.changes_since = None
+        self.lock = threading.Lock()
+
+    def backfill(self):
+        size = settings.ACTIVITY_BUFFER_SIZE
+        version = IndexVersion.objects.current(INDEX_NAME)
+        started = timezone.now()
+        events = load(limit=size + 1)
+        with self.lock:
+            self.events = deque(events[:size], maxlen=size)
+            self.complete = len(events) <= size
+            self.version = version
+            self.synced = time.monotonic()
+            self.changes_since = started
+        return len(self.events)
+
+    def sync(self):
+        """Pick up the writes and deletes of other processes."""
+        now = time.monotonic()
+        if now - self.synced < settings.ACTIVITY_SYNC_INTERVAL:
+            return
+        if IndexVersion.objects.current(INDEX_NAME) != self.version:
+            self.backfill()
+            return
+        self.synced = now
+        size = settings.ACTIVITY_BUFFER_SIZE
+        started = timezone.now()
+        since = self.changes_since - SYNC_LOOKBACK
+        events = load(changed_since=since, limit=size + 1)
+        deleted = list(
+            Tombstone.objects.filter(kind__in=KINDS, deleted_at__gt=since)
+            .values_list('kind', 'object_id')[:size + 1]
+        )
+        if len(events) > size or len(deleted) > size:
+            # Cheaper to read the buffer again than to patch it.
+            self.backfill()
+            return
+        self.add(events, deleted)
+        self.changes_since = started
+
+    def add(self, events, deleted=()):
+        """
+        Merge ``events`` in, replacing the buffered ones with the same key,
+        and drop the ``(kind, id)`` pairs of ``deleted``. Events older than
+        an incomplete buffer are left to the indexes.
+        """
+        with self.lock:
+            deleted = set(deleted)
+            changed = {
+                key: data for key, data in events if key[1:] not in deleted
+            }
+            kept = [
+                (key, patch(data, changed.pop(key, None)))
+                for key, data in self.events if key[1:] not in deleted
+            ]
+            if kept and not self.complete:
+                changed = {
+                    key: data for key, data in changed.items()
+                    if key > kept[-1][0]
+                }
+            size = settings.ACTIVITY_BUFFER_SIZE
+            merged = list(merge(
+                sorted(changed.items(), reverse=True),
+                kept,
+                key=lambda event: event[0],
+                reverse=True,
+            ))
+            if len(merged) > size:
+                self.complete = False
+            self.events = deque(merged[:size], maxlen=size)
+
+    def page(self, cursor, limit):
+        """Up to ``limit`` events older than ``cursor`` and the next cursor."""
+        if self.version is None:
+            self.backfill()
+        else:
+            self.sync()
+        before = cursors.decode(cursor, KINDS) if cursor else None
+        with self.lock:
+            buffered = list(self.events)
+            complete = self.complete
+        events = [
+            event for event in buffered if before is None or event[0] < before
+        ][:limit + 1]
+        if len(events) < limit and not complete:
+            # Past the hot window.
+            start = events[-1][0] if events else before
+            events += load(before=start, limit=limit + 1 - len(events))
+            complete = len(events) <= limit
+        # A full page of an incomplete buffer may be followed by more.
+        if len(events) > limit or len(events) == limit and not complete:
+            events = events[:limit]
+            return resolve(events), cursors.encode(events[-1][0])
+        return resolve(events), None
+
+
+feed = ActivityFeed()
+
+
+def warm():
+    """Startup warmer: backfill the buffer before the workers fork."""
+    return feed.backfill()
+
+
+def activity_limit(request):
+    """``limit`` from the query string, clamped like page limits."""
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def username(instance):
+    """The username if the author is at hand, else resolved on read."""
+    if instance._meta.get_field('author').is_cached(instance):
+        return instance.author.username
+    return None
+
+
+def changed():
+    """Have every process backfill again, e.g. when a title is hidden."""
+    transaction.on_commit(lambda: IndexVersion.objects.bump(INDEX_NAME))
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    event = review_event({
+        'id': instance.pk,
+        'title_id': instance.title_id,
+        'author_id': instance.author_id,
+        'username': username(instance),
+        'text': instance.text,
+        'score': instance.score,
+        'pub_date': instance.pub_date,
+    })
+    transaction.on_commit(lambda: feed.add([event]))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, **kwargs):
+    review = instance._meta.get_field('review')
+    event = comment_event({
+        'id': instance.pk,
+        'review_id': instance.review_id,
+        'title_id': (
+            instance.review.title_id if review.is_cached(instance) else None
+        ),
+        'author_id': instance.author_id,
+        'username': username(instance),
+        'text': instance.text,
+        'pub_date': instance.pub_date,
+    })
+    transaction.on_commit(lambda: feed.add([event]))
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def event_deleted(sender, instance, **kwargs):
+    deleted = (sender._meta.model_name, instance.pk)
+    transaction.on_commit(lambda: feed.add([], [deleted]))
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import (activity, autocomplete, changes, deletion,  # noqa: F401
+                       moderation, pagination, purge, reference, stats)
@@ -0,0 +1,447 @@
+"""
+In-memory prefix index behind ``/api/v1/autocomplete/``.
+
+Normalized names of titles, genres and categories are packed into one UTF-8
+blob. Every word start of a name is an entry and the entries are sorted, so
+the ones matching a prefix form a single range found by binary search. A
+segment tree over the popularity (review count) of the entries picks the
+most reviewed matches of that range without scanning it.
+
+Every process builds the index at startup. Writes to the indexed models
+bump an ``IndexVersion`` row; processes compare it at most every
+``AUTOCOMPLETE_CHECK_INTERVAL`` seconds and, when it moved, read the names
+updated and the tombstones left since into a small overlay searched along
+with the index. Past ``AUTOCOMPLETE_DELTA_LIMIT`` changes, or
+``AUTOCOMPLETE_MAX_AGE`` for the review counts, the index is rebuilt in
+the background, the previous one served meanwhile.
+"""
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from reviews.models import Category, Genre, IndexVersion, Title, Tombstone
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'autocomplete'
+KINDS = ('title', 'genre', 'category')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+SEPARATORS = re.compile(r'[\W_]+')
+ACCENTS = re.compile('[\u0300-\u036f]')
+# Commits may land out of updated_at order, syncs look back this far.
+SYNC_LOOKBACK = timedelta(seconds=10)
+
+
+def normalize(text):
+    """Lower case without accents, words separated by single spaces."""
+    text = text.casefold()
+    if not text.isascii():
+        text = ACCENTS.sub('', unicodedata.normalize('NFKD', text))
+    return SEPARATORS.sub(' ', text).strip()
+
+
+def search_limit(request):
+    """``limit`` from the query string, clamped like page limits."""
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return max(0, min(limit, MAX_LIMIT))
+
+
+class _Keys:
+    """The sorted entry keys as a sequence ``bisect`` can search."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index.starts)
+
+    def __getitem__(self, position):
+        index = self.index
+        end = index.name_ends[index.items[position]]
+        return index.blob[index.starts[position]:end]
+
+
+class PrefixIndex:
+    """
+    Immutable index over ``(kind, pk, slug, name, popularity)`` rows. Only
+    the first ``max_words`` words of a name are searchable, which bounds
+    the number of entries per name.
+    """
+
+    def __init__(self, rows, max_words=5):
+        blob = bytearray()
+        labels = bytearray()
+        self.name_ends = array('I')
+        self.label_ends = array('I')
+        self.kinds = array('B')
+        self.pks = array('I')
+        self.popularity = array('I')
+        self.slugs = {}
+        starts = array('I')
+        items = array('I')
+        for item, (kind, pk, slug, name, popularity) in enumerate(rows):
+            key = normalize(name).encode()
+            offset = len(blob)
+            blob += key
+            labels += name.encode()
+            self.name_ends.append(len(blob))
+            self.label_ends.append(len(labels))
+            self.kinds.append(KINDS.index(kind))
+            self.pks.append(pk)
+            self.popularity.append(popularity)
+            if kind != 'title':
+                self.slugs[item] = slug
+            if not key:
+                continue
+            words = [0] + [
+                match.end() for match in re.finditer(b' ', key)
+            ][:max_words - 1]
+            for word in words:
+                starts.append(offset + word)
+                items.append(item)
+        self.blob = bytes(blob)
+        self.labels = bytes(labels)
+
+        order = sorted(
+            range(len(starts)),
+            key=lambda entry: self.blob[
+                starts[entry]:self.name_ends[items[entry]]
+            ],
+        )
+        self.starts = array('I', (starts[entry] for entry in order))
+        self.items = array('I', (items[entry] for entry in order))
+        self.scores = array(
+            'I', (self.popularity[item] for item in self.items)
+        )
+        self.build_tree()
+
+    def build_tree(self):
+        """Node ``n`` holds the best entry under it, children ``2n, 2n+1``."""
+        count = len(self.items)
+        self.size = 1
+        while self.size < count:
+            self.size *= 2
+        tree = array('i', [-1]) * (2 * self.size)
+        tree[self.size:self.size + count] = array('i', range(count))
+        scores = self.scores
+        for node in range(self.size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = (
+                right if right >= 0 and scores[right] > scores[left]
+                else left
+            )
+        self.tree = tree
+
+    def best(self, lo, hi):
+        """The most popular entry in ``[lo, hi)``, the first one on ties."""
+        tree, scores = self.tree, self.scores
+        best = -1
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                candidate = tree[lo]
+                if best < 0 or scores[candidate] > scores[best] or (
+                    scores[candidate] == scores[best] and candidate < best
+                ):
+                    best = candidate
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                candidate = tree[hi]
+                if best < 0 or scores[candidate] > scores[best] or (
+                    scores[candidate] == scores[best] and candidate < best
+                ):
+                    best = candidate
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        return [self.describe(item) for item in self.matches(query, limit)]
+
+    def matches(self, query, limit=DEFAULT_LIMIT):
+        """Items of the ``limit`` most popular matches, best first."""
+        prefix = normalize(query).encode()
+        if not prefix or limit <= 0:
+            return []
+        keys = _Keys(self)
+        lo = bisect_left(keys, prefix)
+        # No UTF-8 sequence contains 0xff, so this sorts after every match.
+        hi = bisect_left(keys, prefix + b'\xff', lo)
+        heap = []
+        if lo < hi:
+            best = self.best(lo, hi)
+            heap.append((-self.scores[best], best, lo, hi))
+        results = []
+        seen = set()
+        while heap and len(results) < limit:
+            _, position, lo, hi = heapq.heappop(heap)
+            item = self.items[position]
+            if item not in seen:
+                seen.add(item)
+                results.append(item)
+            for start, stop in ((lo, position), (position + 1, hi)):
+                if start < stop:
+                    best = self.best(start, stop)
+                    heapq.heappush(
+                        heap, (-self.scores[best], best, start, stop)
+                    )
+        return results
+
+    def key(self, item):
+        return KINDS[self.kinds[item]], self.pks[item]
+
+    def describe(self, item):
+        kind = KINDS[self.kinds[item]]
+        start = self.label_ends[item - 1] if item else 0
+        result = {'type': kind}
+        if kind == 'title':
+            result['id'] = self.pks[item]
+        else:
+            result['slug'] = self.slugs[item]
+        result['name'] = self.labels[start:self.label_ends[item]].decode()
+        result['reviews'] = self.popularity[item]
+        return result
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index, without the slug dict."""
+        buffers = (
+            self.name_ends, self.label_ends, self.kinds, self.pks,
+            self.popularity, self.starts, self.items, self.scores, self.tree,
+        )
+        return len(self.blob) + len(self.labels) + sum(
+            len(buffer) * buffer.itemsize for buffer in buffers
+        )
+
+    def __len__(self):
+        return len(self.kinds)
+
+
+TAGS = (
+    ('genre', Genre, 'title__reviews'),
+    ('category', Category, 'titles_category__reviews'),
+)
+
+
+def count_visible(reviews):
+    """Count of the visible ``reviews``."""
+    return Count(reviews, filter=Q(**{f'{reviews}__hidden_at__isnull': True}))
+
+
+def load_rows():
+    titles = (
+        Title.visible.order_by()
+        .annotate(popularity=count_visible('reviews'))
+        .values_list('pk', 'name', 'popularity')
+    )
+    for pk, name, popularity in titles.iterator(chunk_size=10000):
+        yield 'title', pk, None, name, popularity
+    for kind, model, reviews in TAGS:
+        rows = (
+            model.objects.order_by()
+            .annotate(popularity=count_visible(reviews))
+            .values_list('pk', 'slug', 'name', 'popularity')
+        )
+        for pk, slug, name, popularity in rows:
+            yield kind, pk, slug, name, popularity
+
+
+def load_changes(since, limit):
+    """
+    Rows of the names updated after ``since`` by ``(kind, pk)``, None for
+    those deleted or hidden; None instead when there are over ``limit``.
+    """
+    changes = {}
+    titles = (
+        Title.objects.filter(updated_at__gt=since).order_by()
+        .annotate(popularity=count_visible('reviews'))
+        .values_list('pk', 'name', 'popularity', 'deleted_at')[:limit + 1]
+    )
+    for pk, name, popularity, deleted_at in titles:
+        changes['title', pk] = (
+            None if deleted_at else ('title', pk, None, name, popularity)
+        )
+    for kind, model, reviews in TAGS:
+        rows = (
+            model.objects.filter(updated_at__gt=since).order_by()
+            .annotate(popularity=count_visible(reviews))
+            .values_list('pk', 'slug', 'name', 'popularity')[:limit + 1]
+        )
+        for pk, slug, name, popularity in rows:
+            changes[kind, pk] = (kind, pk, slug, name, popularity)
+    changes.update(
+        (key, None) for key in Tombstone.objects.filter(
+            kind__in=KINDS, deleted_at__gt=since
+        ).values_list('kind', 'object_id')[:limit + 1]
+    )
+    return changes if len(changes) <= limit else None
+
+
+def row_matches(name, prefix, max_words):
+    """Whether one of the first ``max_words`` words of ``name`` starts it."""
+    key = normalize(name)
+    words = [0] + [
+        match.end() for match in re.finditer(' ', key)
+    ][:max_words - 1]
+    return any(key.startswith(prefix, word) for word in words)
+
+
+def describe_row(kind, pk, slug, name, popularity):
+    result = {'type': kind}
+    if kind == 'title':
+        result['id'] = pk
+    else:
+        result['slug'] = slug
+    result['name'] = name
+    result['reviews'] = popularity
+    return result
+
+
+def bump_version():
+    IndexVersion.objects.bump(INDEX_NAME)
+
+
+class Autocomplete:
+    """
+    The index of this process, the rows changed since it was built and
+    their refresh from the database.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self.changes = {}
+        # Database time the next sync reads changes from.
+        self.changes_since = None
+        self.built = 0.0
+        self.checked = 0.0
+        self.lock = threading.RLock()
+        self.thread = None
+        self.pid = None
+
+    def build(self):
+        # Read before the rows, so a write racing the build is seen later.
+        version = IndexVersion.objects.current(INDEX_NAME)
+        changes_since = timezone.now()
+        started = time.perf_counter()
+        index = PrefixIndex(load_rows(), settings.AUTOCOMPLETE_MAX_WORDS)
+        with self.lock:
+            self.index, self.version = index, version
+            self.changes, self.changes_since = {}, changes_since
+            self.built = time.monotonic()
+        logger.info(
+            'Autocomplete index v%s in pid %s: %s names, %.1f MiB, %.0f ms',
+            version,
+            os.getpid(),
+            len(index),
+            index.nbytes / 2 ** 20,
+            (time.perf_counter() - started) * 1000,
+        )
+        return index
+
+    def get(self):
+        """The index and the changes to apply over it."""
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.build()
+        now = time.monotonic()
+        if now - self.checked >= settings.AUTOCOMPLETE_CHECK_INTERVAL:
+            self.checked = now
+            if now - self.built >= settings.AUTOCOMPLETE_MAX_AGE:
+                self.refresh()
+            else:
+                version = IndexVersion.objects.current(INDEX_NAME)
+                if version != self.version:
+                    self.sync(version)
+        with self.lock:
+            return self.index, self.changes
+
+    def sync(self, version):
+        """Read the changes since the last sync, rebuild past the limit."""
+        started = timezone.now()
+        limit = settings.AUTOCOMPLETE_DELTA_LIMIT
+        changes = load_changes(self.changes_since - SYNC_LOOKBACK, limit)
+        with self.lock:
+            if changes is not None:
+                changes = {**self.changes, **changes}
+            if changes is None or len(changes) > limit:
+                self.refresh()
+                return
+            self.changes, self.version = changes, version
+            self.changes_since = started
+
+    def refresh(self):
+        """Rebuild in a background thread unless one is running already."""
+        with self.lock:
+            # Threads do not survive a fork.
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(
+                target=self.rebuild, name='autocomplete', daemon=True
+            )
+            self.thread.start()
+
+    def rebuild(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Autocomplete index rebuild failed')
+        finally:
+            connections.close_all()
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        index, changes = self.get()
+        if not changes:
+            return index.search(query, limit)
+        prefix = normalize(query)
+        if not prefix or limit <= 0:
+            return []
+        # The changed names may displace as many matches of the index.
+        results = [
+            index.describe(item)
+            for item in index.matches(query, limit + len(changes))
+            if index.key(item) not in changes
+        ]
+        results += [
+            describe_row(*row) for row in changes.values()
+            if row is not None
+            and row_matches(row[3], prefix, settings.AUTOCOMPLETE_MAX_WORDS)
+        ]
+        results.sort(key=lambda result: -result['reviews'])
+        return results[:limit]
+
+
+autocomplete = Autocomplete()
+
+
+def warm():
+    """Startup warmer: build the index before the workers fork."""
+    return len(autocomplete.build())
+
+
+@receiver((post_save, post_delete), sender=Title)
+@receiver((post_save, post_delete), sender=Genre)
+@receiver((post_save, post_delete), sender=Category)
+def bump_on_change(sender, **kwargs):
+    transaction.on_commit(bump_version)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def title_keys(title, category=True, genres=True):
+    """Keys of a title and of the category and genres rendered with it."""
+    keys = {f'title-{title.pk}'}
+    if category and title.category_id:
+        keys.add(f'category-{title.category_id}')
+    if genres:
+        keys.update(f'genre-{genre.pk}' for genre in title.genre.all())
+    return keys
+
+
+class SurrogateKeyMixin:
+    """
+    Edge-cacheable GET responses tagged with the objects they render.
+
+    Viewsets name their collection with ``surrogate_collection`` and tag
+    rendered objects in ``get_surrogate_keys``; ``api.purge`` purges the
+    same keys when the objects change.
+    """
+
+    surrogate_collection = None
+
+    def get_surrogate_collection(self):
+        return self.surrogate_collection
+
+    def get_surrogate_keys(self, instance):
+        return set()
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        for instance in page if page is not None else ():
+            self.surrogate_keys.update(self.get_surrogate_keys(instance))
+        return page
+
+    def get_object(self):
+        instance = super().get_object()
+        self.surrogate_keys.update(self.get_surrogate_keys(instance))
+        return instance
+
+    def initial(self, request, *args, **kwargs):
+        self.surrogate_keys = set()
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method in SAFE_METHODS and response.status_code == 200:
+            self.add_cache_headers(request, response)
+        return response
+
+    def add_cache_headers(self, request, response):
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+            return
+        ttl = settings.CACHE_EDGE_TTL
+        patch_cache_control(response, public=True, max_age=0, s_maxage=ttl)
+        # Takes precedence in nginx and is not passed on to clients.
+        response['X-Accel-Expires'] = str(ttl)
+        keys = set(getattr(self, 'surrogate_keys', ()))
+        collection = self.get_surrogate_collection()
+        if collection:
+            keys.add(collection)
+        if keys:
+            response['Surrogate-Key'] = ' '.join(sorted(keys))
+            response['X-Cache-Tags'] = ','.join(sorted(keys))
@@ -0,0 +1,229 @@
+"""
+Change feed for mirrors and clients, ``/api/v1/changes/``.
+
+Titles, genres, categories, reviews and comments carry an indexed
+``updated_at`` and their deletes leave a ``Tombstone``; so does hiding a
+title, whose reviews and comments are no longer listed. A page merges the
+rows of every table changed after the cursor in ``(updated_at, kind, id)``
+order with one bounded keyset query per table, so a sync reads the changes
+and not the catalog. Changes of the last ``CHANGES_SETTLE_TIME`` seconds
+are held back, so a transaction committing late cannot land behind a
+cursor already handed out.
+"""
+from datetime import timedelta
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+from reviews.models import Category, Comment, Genre, Review, Title, Tombstone
+
+from . import cursors
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+TitleGenre = Title.genre.through
+
+SOURCES = {
+    'category': (
+        lambda: Category.objects.values('id', 'name', 'slug', 'updated_at'),
+        'updated_at',
+    ),
+    'comment': (
+        lambda: Comment.objects.filter(
+            hidden_at__isnull=True,
+            review__hidden_at__isnull=True,
+            review__title__deleted_at__isnull=True,
+        ).values(
+            'id', 'review_id', 'text', 'pub_date', 'updated_at',
+            title_id=F('review__title_id'), username=F('author__username'),
+        ),
+        'updated_at',
+    ),
+    'genre': (
+        lambda: Genre.objects.values('id', 'name', 'slug', 'updated_at'),
+        'updated_at',
+    ),
+    'review': (
+        lambda: Review.objects.filter(
+            hidden_at__isnull=True, title__deleted_at__isnull=True
+        ).values(
+            'id', 'title_id', 'text', 'score', 'pub_date', 'updated_at',
+            username=F('author__username'),
+        ),
+        'updated_at',
+    ),
+    'title': (
+        lambda: Title.visible.values(
+            'id', 'name', 'year', 'description', 'updated_at',
+            category_slug=F('category__slug'),
+        ),
+        'updated_at',
+    ),
+    'tombstone': (
+        lambda: Tombstone.objects.values(
+            'id', 'kind', 'object_id', 'slug', 'deleted_at'
+        ),
+        'deleted_at',
+    ),
+}
+KINDS = tuple(SOURCES)
+# The largest primary key, with the last kind the key sorting after every
+# row at a given date.
+MAX_PK = 2 ** 63 - 1
+
+
+class ExpiredCursor(cursors.InvalidCursor):
+    """The tombstones since the cursor may have been pruned."""
+
+
+def load(kind, key, horizon, limit):
+    """Rows of ``kind`` after ``key`` and up to ``horizon``, with keys."""
+    queryset, field = SOURCES[kind]
+    rows = queryset().filter(
+        cursors.after(field, kind, key), **{f'{field}__lte': horizon}
+    ).order_by(field, 'pk')[:limit]
+    return (((row[field], kind, row['id']), row) for row in rows)
+
+
+def change(kind, row):
+    if kind == 'tombstone':
+        return {
+            'op': 'delete',
+            'type': row['kind'],
+            'id': row['object_id'],
+            'changed_at': row['deleted_at'],
+            'data': {'slug': row['slug']} if row['slug'] else None,
+        }
+    data = dict(row)
+    if 'username' in data:
+        data['author'] = data.pop('username')
+    if 'category_slug' in data:
+        data['category'] = data.pop('category_slug')
+    return {
+        'op': 'upsert',
+        'type': kind,
+        'id': data.pop('id'),
+        'changed_at': data.pop('updated_at'),
+        'data': data,
+    }
+
+
+def attach_genres(rows):
+    """Genre slugs of the titles among ``rows``, one query for all."""
+    titles = {row['id']: row for kind, row in rows if kind == 'title'}
+    for row in titles.values():
+        row['genre'] = []
+    for title_id, slug in TitleGenre.objects.filter(
+        title_id__in=titles
+    ).order_by('genre__slug').values_list('title_id', 'genre__slug'):
+        titles[title_id]['genre'].append(slug)
+
+
+def page(cursor, limit):
+    """
+    Up to ``limit`` changes after ``cursor``, the cursor to resume from,
+    the horizon once caught up, and whether more changes are ready.
+    """
+    key = cursors.decode(cursor, KINDS) if cursor else None
+    now = timezone.now()
+    retention = timedelta(days=settings.CHANGES_TOMBSTONE_DAYS)
+    if key is not None and key[0] < now - retention:
+        raise ExpiredCursor(cursor)
+    horizon = now - timedelta(seconds=settings.CHANGES_SETTLE_TIME)
+    keyed = list(islice(
+        merge(
+            *(load(kind, key, horizon, limit + 1) for kind in KINDS),
+            key=lambda item: item[0],
+        ),
+        limit + 1,
+    ))
+    more = len(keyed) > limit
+    keyed = keyed[:limit]
+    rows = [(row_key[1], row) for row_key, row in keyed]
+    attach_genres(rows)
+    if more:
+        cursor = cursors.encode(keyed[-1][0])
+    else:
+        # Everything up to the horizon is out: resume from it, so the cursor
+        # of a mirror of a quiet catalog moves on instead of expiring.
+        cursor = cursors.encode((horizon, max(KINDS), MAX_PK))
+    return [change(kind, row) for kind, row in rows], cursor, more
+
+
+def changes_limit(request):
+    """``limit`` from the query string, clamped like page limits."""
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def touch_titles(titles):
+    """A title lists the slugs of its genres and category."""
+    titles.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=TitleGenre)
+def title_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_titles(Title.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        touch_titles(Title.objects.filter(genre=instance))
+    else:
+        touch_titles(Title.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_titles(Title.objects.filter(genre=instance))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_titles(Title.objects.filter(category=instance))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Category)
+def tag_deleted(sender, instance, **kwargs):
+    # Titles lose the genre or category without a save of their own.
+    lookup = 'genre' if sender is Genre else 'category'
+    touch_titles(Title.objects.filter(**{lookup: instance}))
+
+
+@receiver(post_save, sender=Title)
+def title_hidden(sender, instance, update_fields=None, **kwargs):
+    # Gone for mirrors now, its deletion job may take a while.
+    if instance.deleted_at is not None and 'deleted_at' in (
+        update_fields or ()
+    ):
+        Tombstone.objects.create(kind='title', object_id=instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Title)
+def deleted(sender, instance, **kwargs):
+    if getattr(instance, 'deleted_at', None) is not None or getattr(
+        instance, 'hidden_at', None
+    ) is not None:
+        # Left when the title or the row was hidden.
+        return
+    Tombstone.objects.create(
+        kind=sender._meta.model_name,
+        object_id=instance.pk,
+        slug=getattr(instance, 'slug', ''),
+    )
@@ -0,0 +1,58 @@
+"""
+Opaque keyset cursors over several tables ordered by a date field.
+
+A key is ``(date, kind, id)``: rows of different kinds at the same instant
+are ordered by kind, rows of one kind by primary key.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode(key):
+    date, kind, pk = key
+    raw = json.dumps([date.isoformat(), kind, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode(cursor, kinds):
+    try:
+        date, kind, pk = json.loads(base64.urlsafe_b64decode(cursor))
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, TypeError, ValueError) as error:
+        raise InvalidCursor(cursor) from error
+    if date is None or kind not in kinds:
+        raise InvalidCursor(cursor)
+    return date, kind, pk
+
+
+def before(field, kind, key):
+    """Rows of ``kind`` sorting before ``key``."""
+    if key is None:
+        return Q()
+    date, key_kind, pk = key
+    if kind < key_kind:
+        return Q(**{f'{field}__lte': date})
+    if kind == key_kind:
+        return Q(**{f'{field}__lt': date}) | Q(**{field: date, 'pk__lt': pk})
+    return Q(**{f'{field}__lt': date})
+
+
+def after(field, kind, key):
+    """Rows of ``kind`` sorting after ``key``."""
+    if key is None:
+        return Q()
+    date, key_kind, pk = key
+    if kind > key_kind:
+        return Q(**{f'{field}__gte': date})
+    if kind == key_kind:
+        return Q(**{f'{field}__gt': date}) | Q(**{field: date, 'pk__gt': pk})
+    return Q(**{f'{field}__gt': date})
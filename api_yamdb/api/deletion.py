@@ -0,0 +1,249 @@
+"""
+Background deletion of titles and users.
+
+``DELETE`` through ``BackgroundDeleteMixin`` hides the object and queues a
+job, answered with 202. The job deletes the reviews and comments behind
+the object ``DELETION_CHUNK_SIZE`` rows at a time with raw DELETEs, each
+chunk in a short transaction of its own, and applies what the skipped
+signals would have: user statistics, tombstones for the change feed and
+cache purges. Reviews and comments hidden by a moderator had all that
+applied when they were hidden and are only deleted. The object itself is
+deleted last, when little is left to cascade to.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from reviews.models import Comment, Review, Title, Tombstone, User
+
+from . import activity, jobs, stats
+from .pagination import bump_nested_counts
+from .purge import dispatcher
+from .serializers import JobSerializer
+
+TitleGenre = Title.genre.through
+
+
+def hide(instance):
+    """Take ``instance`` out of the API until its job deletes it."""
+    instance.deleted_at = timezone.now()
+    fields = ['deleted_at']
+    if isinstance(instance, User):
+        # Also refuses the tokens the user already holds.
+        instance.is_active = False
+        fields.append('is_active')
+    else:
+        fields.append('updated_at')
+    instance.save(update_fields=fields)
+    # Their events leave the activity feeds at once.
+    activity.changed()
+
+
+def raw_delete(queryset):
+    # One DELETE, no collector and no signals.
+    queryset._raw_delete(queryset.db)
+
+
+def apply_comment_rows(rows, sign=-1):
+    """
+    Count ``(id, author id, review id)`` rows of comments out of the API,
+    or back in with ``sign`` 1: statistics, tombstones, counts and purges.
+    """
+    counts = Counter(author_id for _, author_id, _ in rows)
+    stats.change_users({
+        author_id: {'comments_count': sign * count}
+        for author_id, count in counts.items()
+    }, create=sign > 0)
+    if sign < 0:
+        Tombstone.objects.bulk_create(
+            Tombstone(kind='comment', object_id=pk) for pk, _, _ in rows
+        )
+    bump_nested_counts(
+        Comment, 'review', [review_id for _, _, review_id in rows]
+    )
+    dispatcher.schedule(
+        {f'comment-{pk}' for pk, _, _ in rows}
+        | {f'review-{review_id}-comments' for _, _, review_id in rows}
+    )
+
+
+def apply_review_rows(rows, sign=-1):
+    """
+    Count ``(id, author id, title id, score)`` rows of reviews out of the
+    API, or back in with ``sign`` 1.
+    """
+    ids = [pk for pk, _, _, _ in rows]
+    totals = defaultdict(Counter)
+    for _, author_id, _, score in rows:
+        totals[author_id]['reviews_count'] += sign
+        totals[author_id]['score_sum'] += sign * score
+    stats.change_users(totals, create=sign > 0)
+    genres = defaultdict(list)
+    for title_id, genre_id in TitleGenre.objects.filter(
+        title_id__in={title_id for _, _, title_id, _ in rows}
+    ).values_list('title_id', 'genre_id'):
+        genres[title_id].append(genre_id)
+    deltas = Counter()
+    for _, author_id, title_id, _ in rows:
+        for genre_id in genres[title_id]:
+            deltas[author_id, genre_id] += sign
+    stats.change_genres(deltas)
+    if sign < 0:
+        Tombstone.objects.bulk_create(
+            Tombstone(kind='review', object_id=pk) for pk in ids
+        )
+    titles = {title_id for _, _, title_id, _ in rows} - {None}
+    bump_nested_counts(Review, 'title', titles)
+    keys = {f'review-{pk}' for pk in ids}
+    if titles:
+        # Their ratings are in every title listing.
+        keys.add('titles')
+    for title_id in titles:
+        keys |= {f'title-{title_id}', f'title-{title_id}-reviews'}
+    dispatcher.schedule(keys)
+
+
+def delete_comment_rows(rows):
+    """Delete ``(id, author id, review id)`` rows of visible comments."""
+    raw_delete(Comment.objects.filter(pk__in=[pk for pk, _, _ in rows]))
+    apply_comment_rows(rows)
+
+
+def delete_review_rows(rows):
+    """Delete ``(id, author id, title id, score)`` rows of visible reviews."""
+    ids = [pk for pk, _, _, _ in rows]
+    comments = Comment.objects.filter(review_id__in=ids)
+    # Comments written since the comments were deleted.
+    visible = list(
+        comments.filter(hidden_at__isnull=True)
+        .values_list('pk', 'author_id', 'review_id')
+    )
+    if visible:
+        delete_comment_rows(visible)
+    # Hidden ones were counted out when they were hidden.
+    raw_delete(comments)
+    raw_delete(Review.objects.filter(pk__in=ids))
+    apply_review_rows(rows)
+
+
+def delete_hidden_comment_rows(rows):
+    raw_delete(Comment.objects.filter(pk__in=[pk for pk, in rows]))
+
+
+def delete_hidden_review_rows(rows):
+    ids = [pk for pk, in rows]
+    # Hidden with the review.
+    raw_delete(Comment.objects.filter(review_id__in=ids))
+    raw_delete(Review.objects.filter(pk__in=ids))
+
+
+def delete_in_chunks(job, queryset, fields, delete_rows):
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.order_by('pk').values_list(*fields)[
+                    :settings.DELETION_CHUNK_SIZE
+                ]
+            )
+            if rows:
+                delete_rows(rows)
+        if not rows:
+            return
+        jobs.advance(job, len(rows))
+
+
+def delete_comments(job, comments):
+    delete_in_chunks(
+        job,
+        comments.filter(hidden_at__isnull=True),
+        ('pk', 'author_id', 'review_id'),
+        delete_comment_rows,
+    )
+    delete_in_chunks(
+        job,
+        comments.filter(hidden_at__isnull=False),
+        ('pk',),
+        delete_hidden_comment_rows,
+    )
+
+
+def delete_reviews(job, reviews):
+    delete_in_chunks(
+        job,
+        reviews.filter(hidden_at__isnull=True),
+        ('pk', 'author_id', 'title_id', 'score'),
+        delete_review_rows,
+    )
+    delete_in_chunks(
+        job,
+        reviews.filter(hidden_at__isnull=False),
+        ('pk',),
+        delete_hidden_review_rows,
+    )
+
+
+@jobs.handler('delete_title')
+def delete_title(job):
+    title = Title.objects.filter(pk=job.object_id).first()
+    if title is None:
+        return
+    comments = Comment.objects.filter(review__title_id=title.pk)
+    reviews = Review.objects.filter(title_id=title.pk)
+    jobs.advance(job, total=comments.count() + reviews.count() + 1)
+    delete_comments(job, comments)
+    delete_reviews(job, reviews)
+    title.delete()
+    jobs.advance(job, 1)
+
+
+@jobs.handler('delete_user')
+def delete_user(job):
+    user = User.objects.filter(pk=job.object_id).first()
+    if user is None:
+        return
+    comments = Comment.objects.filter(
+        Q(author_id=user.pk) | Q(review__author_id=user.pk)
+    )
+    reviews = Review.objects.filter(author_id=user.pk)
+    jobs.advance(job, total=comments.count() + reviews.count() + 1)
+    delete_comments(job, Comment.objects.filter(author_id=user.pk))
+    delete_comments(job, Comment.objects.filter(review__author_id=user.pk))
+    delete_reviews(job, reviews)
+    user.delete()
+    jobs.advance(job, 1)
+
+
+def accepted(request, job):
+    """202 with ``job`` and the address to follow it at."""
+    return Response(
+        JobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={
+            'Location': reverse('jobs-detail', args=[job.pk], request=request)
+        },
+    )
+
+
+class BackgroundDeleteMixin:
+    """
+    ``DELETE`` hides the object and answers 202 with the ``deletion_job``
+    that deletes it, when ``BACKGROUND_DELETES`` is on.
+    """
+
+    deletion_job = None
+
+    def destroy(self, request, *args, **kwargs):
+        if not settings.BACKGROUND_DELETES:
+            return super().destroy(request, *args, **kwargs)
+        instance = self.get_object()
+        with transaction.atomic():
+            hide(instance)
+            job = jobs.enqueue(
+                self.deletion_job, instance.pk, user=request.user
+            )
+        return accepted(request, job)
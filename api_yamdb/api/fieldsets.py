@@ -0,0 +1,105 @@
+"""
+Sparse fieldsets: ``?fields=id,name`` and ``?exclude=description``.
+
+Serializers drop the fields that were not asked for, and viewsets load only
+what the remaining fields render: their columns, the relations they follow
+and the annotations they read.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, names):
+    """
+    The subset of ``names`` a safe request asked for, or None when it
+    did not narrow the fields.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = request.query_params.get('fields')
+    exclude = request.query_params.get('exclude')
+    if not fields and not exclude:
+        return None
+    wanted = set(names) & _names(fields) if fields else set(names)
+    return wanted - _names(exclude or '')
+
+
+class SparseFieldsSerializerMixin:
+    """Drops the fields not requested by the request in the context."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'), self.fields)
+        for name in set(self.fields) - (wanted or set(self.fields)):
+            self.fields.pop(name)
+
+
+class SparseQuerysetMixin:
+    """
+    Loads only what the requested serializer fields render.
+
+    Concrete fields become ``only()`` columns, foreign keys are joined with
+    ``select_related`` (or loaded as the bare ``<name>_id`` column, when
+    that is all the field reads) and many-to-many fields prefetched. Fields
+    that are not model fields are computed by the annotations in
+    ``sparse_annotations``; columns in ``sparse_columns`` are always loaded.
+    """
+
+    sparse_annotations = {}
+    sparse_columns = ()
+
+    @cached_property
+    def serializer_fields(self):
+        return self.get_serializer_class()().fields
+
+    @cached_property
+    def sparse_fields(self):
+        wanted = requested_fields(
+            getattr(self, 'request', None), self.serializer_fields
+        )
+        return set(self.serializer_fields) if wanted is None else wanted
+
+    def wants(self, name):
+        return name in self.sparse_fields
+
+    def filter_queryset(self, queryset):
+        return self.prune_queryset(super().filter_queryset(queryset))
+
+    def prune_queryset(self, queryset):
+        opts = queryset.model._meta
+        columns = set(self.sparse_columns)
+        for name in self.sparse_fields:
+            field = self.serializer_fields[name]
+            source = field.source.split('.')[0]
+            if name in self.sparse_annotations:
+                queryset = queryset.annotate(
+                    **{name: self.sparse_annotations[name]}
+                )
+                continue
+            try:
+                model_field = opts.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.many_to_many:
+                queryset = queryset.prefetch_related(source)
+            elif model_field.is_relation and source == model_field.name:
+                queryset = queryset.select_related(source)
+                columns.update(self.related_columns(field, source))
+            else:
+                columns.add(source)
+        if not columns or self.request.method not in SAFE_METHODS:
+            # Writes save and signal whole rows.
+            return queryset
+        return queryset.only(*columns)
+
+    @staticmethod
+    def related_columns(field, source):
+        if isinstance(field, serializers.SlugRelatedField):
+            return {f'{source}__{field.slug_field}'}
+        return {source}
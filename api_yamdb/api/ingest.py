@@ -0,0 +1,296 @@
+"""
+Write-behind ingestion of comments, on with ``COMMENT_WRITE_BEHIND``.
+
+``POST`` through ``WriteBehindMixin`` validates the comment, checks its
+review like the synchronous path and appends it to a SQLite file in WAL
+mode, ``COMMENT_INGEST_PATH``, before answering 202 with ``id`` null. The
+file is local to the host: every host running the API runs ``manage.py
+flush_comments``, which inserts the queue ``COMMENT_INGEST_BATCH_SIZE``
+comments per transaction and applies what the skipped signals would have:
+user statistics, the count version, the activity feed and cache purges.
+A queued comment keeps the ``pub_date`` of its POST and is read nowhere
+until its batch commits.
+
+Rows are marked attempted before their batch is inserted and removed from
+the file after it commits, so a flusher killed in between finds them on
+its next run and skips those already in the database. Comments whose
+review or author is gone by then are dropped, as the synchronous path
+would have answered 404.
+"""
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from reviews.models import Comment, Review, User, UserStats
+
+from . import activity, stats
+from .pagination import bump_nested_counts
+from .purge import dispatcher
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS comment (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    review_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date TEXT NOT NULL,
+    attempted INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+
+class Queue:
+    """The staging file of one host, one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            # A comment answered with 202 is on disk, not in a page cache.
+            connection.execute('PRAGMA synchronous=FULL')
+            connection.execute(SCHEMA)
+            self.local.connection = connection
+        return connection
+
+    def append(self, comment):
+        self.connection.execute(
+            'INSERT INTO comment (review_id, author_id, text, pub_date) '
+            'VALUES (?, ?, ?, ?)',
+            (
+                comment.review_id,
+                comment.author_id,
+                comment.text,
+                comment.pub_date.isoformat(),
+            ),
+        )
+
+    def oldest(self, limit):
+        """``(id, review id, author id, text, pub_date, attempted)`` rows."""
+        return [
+            (pk, review_id, author_id, text, parse_datetime(pub_date),
+             bool(attempted))
+            for pk, review_id, author_id, text, pub_date, attempted
+            in self.connection.execute(
+                'SELECT id, review_id, author_id, text, pub_date, attempted '
+                'FROM comment ORDER BY id LIMIT ?',
+                (limit,),
+            )
+        ]
+
+    def update(self, sql, ids):
+        self.connection.execute(
+            sql.format(', '.join('?' * len(ids))), ids
+        )
+
+    def mark_attempted(self, ids):
+        self.update('UPDATE comment SET attempted = 1 WHERE id IN ({})', ids)
+
+    def remove(self, ids):
+        self.update('DELETE FROM comment WHERE id IN ({})', ids)
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM comment'
+        ).fetchone()[0]
+
+
+QUEUES = {}
+
+
+def queue():
+    path = settings.COMMENT_INGEST_PATH
+    if path not in QUEUES:
+        QUEUES[path] = Queue(path)
+    return QUEUES[path]
+
+
+def stage(comment):
+    """Queue an unsaved ``comment``, stamped with its ``pub_date``."""
+    comment.pub_date = timezone.now()
+    queue().append(comment)
+    return comment
+
+
+def already_inserted(rows):
+    """Keys of the attempted ``rows`` a killed flusher did commit."""
+    attempted = [row for row in rows if row[-1]]
+    if not attempted:
+        return set()
+    return set(
+        Comment.objects.filter(
+            review_id__in={row[1] for row in attempted},
+            pub_date__in={row[4] for row in attempted},
+        ).values_list('review_id', 'author_id', 'pub_date')
+    )
+
+
+def insert(comments):
+    """
+    INSERT ``comments`` and set their ids. Raw, which keeps the
+    ``pub_date`` of the POST that ``bulk_create`` would replace with now.
+    """
+    fields = [
+        field for field in Comment._meta.local_concrete_fields
+        if field is not Comment._meta.pk
+    ]
+    manager = Comment._base_manager
+    features = connections[manager.db].features
+    if features.can_return_ids_from_bulk_insert and len(comments) > 1:
+        ids = manager._insert(comments, fields, return_id=True, raw=True)
+    else:
+        ids = [
+            manager._insert([comment], fields, return_id=True, raw=True)
+            for comment in comments
+        ]
+    for comment, pk in zip(comments, ids):
+        comment.pk = pk
+
+
+def apply_effects(comments, titles, usernames):
+    authors = Counter(comment.author_id for comment in comments)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=author_id) for author_id in authors],
+        ignore_conflicts=True,
+    )
+    stats.change_users({
+        author_id: {'comments_count': count}
+        for author_id, count in authors.items()
+    })
+    bump_nested_counts(
+        Comment, 'review', [comment.review_id for comment in comments]
+    )
+    dispatcher.schedule(
+        {f'comment-{comment.pk}' for comment in comments}
+        | {f'review-{comment.review_id}-comments' for comment in comments}
+    )
+    events = [
+        activity.comment_event({
+            'id': comment.pk,
+            'review_id': comment.review_id,
+            'title_id': titles[comment.review_id],
+            'author_id': comment.author_id,
+            'username': usernames[comment.author_id],
+            'text': comment.text,
+            'pub_date': comment.pub_date,
+        })
+        for comment in comments
+    ]
+    transaction.on_commit(lambda: activity.feed.add(events))
+
+
+def flush_rows(rows):
+    """Insert the queued ``rows``; returns the comments inserted."""
+    titles = dict(
+        Review.objects.filter(
+            pk__in={row[1] for row in rows},
+            hidden_at__isnull=True,
+            title__deleted_at__isnull=True,
+        ).values_list('pk', 'title_id')
+    )
+    usernames = dict(
+        User.objects.filter(
+            pk__in={row[2] for row in rows}, is_active=True
+        ).values_list('pk', 'username')
+    )
+    inserted = already_inserted(rows)
+    comments = [
+        Comment(
+            review_id=review_id,
+            author_id=author_id,
+            text=text,
+            pub_date=pub_date,
+            updated_at=timezone.now(),
+        )
+        for _, review_id, author_id, text, pub_date, _ in rows
+        if review_id in titles and author_id in usernames
+        and (review_id, author_id, pub_date) not in inserted
+    ]
+    if comments:
+        insert(comments)
+        apply_effects(comments, titles, usernames)
+    return comments
+
+
+def flush():
+    """Insert one batch of the queue; returns the number of rows taken."""
+    staged = queue()
+    with open(f'{staged.path}.lock', 'w') as lock:
+        # One flusher per file, the rows are taken in order.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        rows = staged.oldest(settings.COMMENT_INGEST_BATCH_SIZE)
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        staged.mark_attempted(ids)
+        with transaction.atomic():
+            flush_rows(rows)
+        staged.remove(ids)
+    return len(rows)
+
+
+def work(once=False):
+    """
+    Flush as comments come, or until the queue is empty with ``once``.
+    Returns the number of rows flushed.
+    """
+    count = 0
+    while True:
+        close_old_connections()
+        try:
+            flushed = flush()
+        except Exception:
+            # The batch stays queued and is retried.
+            logger.exception('Flushing queued comments failed')
+            if once:
+                raise
+            flushed = 0
+        count += flushed
+        if not flushed:
+            if once:
+                return count
+            time.sleep(settings.COMMENT_INGEST_INTERVAL)
+
+
+class WriteBehindMixin:
+    """
+    ``POST`` of a comment answers 202 once the comment is queued, when
+    ``COMMENT_WRITE_BEHIND`` is on.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not settings.COMMENT_WRITE_BEHIND:
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not self.get_parent().exists():
+            raise NotFound
+        comment = stage(Comment(
+            review_id=int(self.kwargs.get('review_id')),
+            author=request.user,
+            **serializer.validated_data,
+        ))
+        return Response(
+            self.get_serializer(comment).data, status=status.HTTP_202_ACCEPTED
+        )
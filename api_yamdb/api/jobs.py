@@ -0,0 +1,96 @@
+"""
+Background jobs stored in ``Job`` and run by ``manage.py run_jobs``.
+
+Handlers register for a job kind with ``@handler(kind)`` and report their
+progress with ``advance``, which is also the heartbeat of the job: a job
+not advanced for ``JOBS_STALE_AFTER`` seconds is taken to have lost its
+worker and is claimed again, so handlers must be safe to run twice.
+"""
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from reviews.models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, object_id=None, arguments=None, user=None):
+    return Job.objects.create(
+        kind=kind,
+        user=user,
+        object_id=object_id,
+        arguments='' if arguments is None else json.dumps(arguments),
+    )
+
+
+def claim():
+    """The oldest pending or abandoned job, marked as running."""
+    stale = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.PENDING)
+                | Q(status=Job.RUNNING, updated_at__lt=stale)
+            )
+            .order_by('pk')
+            .first()
+        )
+        if job is not None:
+            job.status = Job.RUNNING
+            job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def advance(job, done=0, total=None):
+    """Count ``done`` more rows and, when known, the ``total``."""
+    job.done += done
+    if total is not None:
+        job.total = total
+    job.save(update_fields=['done', 'total', 'updated_at'])
+
+
+def run(job):
+    try:
+        HANDLERS[job.kind](job)
+    except Exception as error:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        job.status = Job.FAILED
+        job.error = repr(error)
+    else:
+        job.status = Job.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+
+
+def work(once=False):
+    """
+    Run jobs as they come, or until none is left with ``once``. Returns
+    the number of jobs run.
+    """
+    count = 0
+    while True:
+        close_old_connections()
+        job = claim()
+        if job is not None:
+            run(job)
+            count += 1
+            continue
+        if once:
+            return count
+        time.sleep(settings.JOBS_POLL_INTERVAL)
@@ -0,0 +1,17 @@
+from api import ingest
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Insert the comments queued with COMMENT_WRITE_BEHIND.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for more.',
+        )
+
+    def handle(self, *args, **options):
+        count = ingest.work(once=options['once'])
+        self.stdout.write(f'Flushed {count} comments')
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from reviews.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones older than CHANGES_TOMBSTONE_DAYS.'
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(
+            deleted_at__lt=timezone.now() - timedelta(
+                days=settings.CHANGES_TOMBSTONE_DAYS
+            )
+        ).delete()
+        self.stdout.write(f'Deleted {deleted} tombstones')
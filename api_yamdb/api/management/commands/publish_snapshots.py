@@ -0,0 +1,28 @@
+from api import snapshots
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Render the public catalog to JSON files under SNAPSHOT_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'keys', nargs='*',
+            help='only the files behind these surrogate keys, e.g. title-1',
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            metavar='SECONDS',
+            help='render everything again every SECONDS, until interrupted',
+        )
+
+    def handle(self, *args, **options):
+        if options['every']:
+            snapshots.publish_every(options['every'])
+        elif options['keys']:
+            urls = snapshots.publish(options['keys'])
+            self.stdout.write(f'Rendered {len(urls)} snapshots')
+        else:
+            count = snapshots.publish_all()
+            self.stdout.write(f'Rendered {count} snapshots')
@@ -0,0 +1,16 @@
+import time
+
+from api import stats
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recompute the review statistics of every user.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users = stats.rebuild()
+        self.stdout.write(
+            f'Rebuilt statistics of {users} users '
+            f'in {time.perf_counter() - started:.1f} s'
+        )
@@ -0,0 +1,17 @@
+from api import jobs
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs, such as the deletion of titles and users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no job is left instead of waiting for more.',
+        )
+
+    def handle(self, *args, **options):
+        count = jobs.work(once=options['once'])
+        self.stdout.write(f'Ran {count} jobs')
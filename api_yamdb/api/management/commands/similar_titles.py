@@ -0,0 +1,36 @@
+import time
+
+from api import similarity
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute similar titles: the titles queued by review changes, '
+        'or every title with --full.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true', help='recompute every title'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='worker processes, one per CPU by default',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=similarity.CHUNK_SIZE,
+            help='titles multiplied at once by a worker',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        refreshed = similarity.refresh(
+            full=options['full'],
+            processes=options['processes'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(
+            f'Refreshed similar titles of {refreshed} titles '
+            f'in {time.perf_counter() - started:.1f} s'
+        )
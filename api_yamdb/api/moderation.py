@@ -0,0 +1,170 @@
+"""
+Bulk moderation of reviews and comments, ``/api/v1/moderation/``.
+
+A request selects the reviews and comments of an ``author``, under a
+``title`` or with ``text`` in them, the filters combined, and deletes,
+hides or restores what was hidden. Hidden rows stay in their tables with
+``hidden_at`` set and leave the API as deleted ones do. At most
+``MODERATION_SYNC_LIMIT`` rows are changed in the request, in one
+transaction; more are left to a ``moderate`` job of ``manage.py
+run_jobs``, which reads the primary keys once and changes
+``DELETION_CHUNK_SIZE`` rows per transaction. Either way the rows go
+through ``api.deletion``: DELETEs or UPDATEs by primary key, one UPDATE
+of user statistics per distinct change, tombstones and purges of the
+titles whose ratings change. No object is loaded or checked one by one.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from reviews.models import Comment, Review, Tombstone
+
+from . import jobs
+from .deletion import (apply_comment_rows, apply_review_rows,
+                       delete_comment_rows, delete_review_rows)
+
+KINDS = ('reviews', 'comments')
+ACTIONS = ('delete', 'hide', 'restore')
+COMMENT_FIELDS = ('pk', 'author_id', 'review_id')
+REVIEW_FIELDS = ('pk', 'author_id', 'title_id', 'score')
+
+
+def matching(author=None, title=None, text=None, kinds=KINDS,
+             action='delete'):
+    """
+    The reviews selected and the comments changed with them: those
+    selected and those of the reviews. Restoring selects hidden rows, and
+    comments only under reviews that are visible or restored with them.
+    """
+    hidden = action == 'restore'
+    reviews = Review.objects.filter(hidden_at__isnull=not hidden)
+    selected = Q()
+    if author is not None:
+        reviews = reviews.filter(author_id=author)
+        selected &= Q(author_id=author)
+    if title is not None:
+        reviews = reviews.filter(title_id=title)
+        selected &= Q(review__title_id=title)
+    if text:
+        reviews = reviews.filter(text__icontains=text)
+        selected &= Q(text__icontains=text)
+    if 'reviews' not in kinds:
+        reviews = reviews.none()
+    comments = Q(review_id__in=reviews.values('pk'))
+    if 'comments' in kinds:
+        comments |= selected
+    comments = Comment.objects.filter(comments, hidden_at__isnull=not hidden)
+    if hidden:
+        comments = comments.filter(
+            Q(review__hidden_at__isnull=True)
+            | Q(review_id__in=reviews.values('pk'))
+        )
+    return reviews, comments
+
+
+def hide_comment_rows(rows):
+    now = timezone.now()
+    Comment.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+        hidden_at=now, updated_at=now
+    )
+    apply_comment_rows(rows)
+
+
+def hide_review_rows(rows):
+    ids = [pk for pk, _, _, _ in rows]
+    # Comments written since the comments were hidden.
+    comments = list(
+        Comment.objects.filter(review_id__in=ids, hidden_at__isnull=True)
+        .values_list(*COMMENT_FIELDS)
+    )
+    if comments:
+        hide_comment_rows(comments)
+    now = timezone.now()
+    Review.objects.filter(pk__in=ids).update(hidden_at=now, updated_at=now)
+    apply_review_rows(rows)
+
+
+def restore_comment_rows(rows):
+    ids = [pk for pk, _, _ in rows]
+    # The updated rows are new to the change feed and the activity buffers.
+    Comment.objects.filter(pk__in=ids).update(
+        hidden_at=None, updated_at=timezone.now()
+    )
+    Tombstone.objects.filter(kind='comment', object_id__in=ids).delete()
+    apply_comment_rows(rows, sign=1)
+
+
+def restore_review_rows(rows):
+    ids = [pk for pk, _, _, _ in rows]
+    Review.objects.filter(pk__in=ids).update(
+        hidden_at=None, updated_at=timezone.now()
+    )
+    Tombstone.objects.filter(kind='review', object_id__in=ids).delete()
+    apply_review_rows(rows, sign=1)
+
+
+# The functions changing comment and review rows, in the order to apply.
+STEPS = {
+    'delete': (
+        (Comment, COMMENT_FIELDS, delete_comment_rows),
+        (Review, REVIEW_FIELDS, delete_review_rows),
+    ),
+    'hide': (
+        (Comment, COMMENT_FIELDS, hide_comment_rows),
+        (Review, REVIEW_FIELDS, hide_review_rows),
+    ),
+    # Reviews first, so no restored comment is left under a hidden one.
+    'restore': (
+        (Review, REVIEW_FIELDS, restore_review_rows),
+        (Comment, COMMENT_FIELDS, restore_comment_rows),
+    ),
+}
+
+
+def change_now(reviews, comments, action='delete'):
+    """Change the rows in one transaction; returns the numbers changed."""
+    querysets = {Review: reviews, Comment: comments}
+    changed = {}
+    with transaction.atomic():
+        # Both read before either changes what the other selects.
+        rows = {
+            model: list(querysets[model].values_list(*fields))
+            for model, fields, _ in STEPS[action]
+        }
+        for model, _, change_rows in STEPS[action]:
+            if rows[model]:
+                change_rows(rows[model])
+            changed[model] = len(rows[model])
+    return {'reviews': changed[Review], 'comments': changed[Comment]}
+
+
+@jobs.handler('moderate')
+def moderate(job):
+    arguments = json.loads(job.arguments)
+    action = arguments.get('action', 'delete')
+    reviews, comments = matching(**arguments)
+    querysets = {Review: reviews, Comment: comments}
+    # Read once: the filters scan the tables, a chunk is found by its keys.
+    ids = {
+        model: list(querysets[model].order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        for model in querysets
+    }
+    jobs.advance(job, total=len(ids[Review]) + len(ids[Comment]))
+    size = settings.DELETION_CHUNK_SIZE
+    for model, fields, change_rows in STEPS[action]:
+        for start in range(0, len(ids[model]), size):
+            with transaction.atomic():
+                # Skips the rows changed by someone else in the meantime.
+                rows = list(
+                    model.objects.filter(
+                        pk__in=ids[model][start:start + size],
+                        hidden_at__isnull=action != 'restore',
+                    ).values_list(*fields)
+                )
+                if rows:
+                    change_rows(rows)
+            jobs.advance(job, len(rows))
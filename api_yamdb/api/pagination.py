@@ -0,0 +1,179 @@
+"""
+Limit/offset pages counted by the ``count_strategy`` of the view, or
+``PAGINATION_COUNT_STRATEGY`` where the view has none:
+
+* ``exact`` runs ``COUNT(*)`` for every page;
+* ``cached`` reuses the count for ``PAGINATION_COUNT_CACHE_TTL`` seconds,
+  until a write bumps the count version of the model in ``IndexVersion``.
+  The rows under the parent named by ``count_parent`` of a nested view are
+  versioned per parent in the cache instead, so a review drops the count
+  of its title only without a write to the database; their counts live
+  ``PAGINATION_NESTED_COUNT_CACHE_TTL`` seconds, the staleness left to the
+  processes a per-process cache does not reach;
+* ``estimated`` reports the planner's estimate when it is above
+  ``PAGINATION_EXACT_COUNT_LIMIT`` rows and counts exactly below;
+* ``none`` leaves ``count`` out of the response.
+
+The last two read one row past the page to know whether there is a next
+one, so a short page ends the listing without counting anything.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import pagination
+from rest_framework.response import Response
+from reviews.models import (Category, Comment, Genre, IndexVersion, Review,
+                            Title, User)
+
+from api_yamdb import counts
+
+EXACT = 'exact'
+CACHED = 'cached'
+ESTIMATED = 'estimated'
+NONE = 'none'
+
+
+def version_name(model, parent=None, parent_id=None):
+    if parent is None:
+        return f'count-{model._meta.model_name}'
+    return f'count-{model._meta.model_name}-{parent}-{parent_id}'
+
+
+def bump(names):
+    for name in names:
+        transaction.on_commit(
+            lambda name=name: IndexVersion.objects.bump(name)
+        )
+
+
+def bump_counts(*models):
+    """Drop the cached counts of ``models`` once the transaction commits."""
+    bump(version_name(model) for model in models)
+
+
+def bump_nested_counts(model, parent, parent_ids):
+    """
+    Drop the cached counts of ``model`` under the ``parent`` rows of
+    ``parent_ids`` once the transaction commits.
+    """
+    names = [
+        version_name(model, parent, parent_id)
+        for parent_id in sorted(set(parent_ids))
+    ]
+    # The next read draws a new version.
+    transaction.on_commit(lambda: cache.delete_many(names))
+
+
+def nested_version(name):
+    """The cached version of the counts under a parent."""
+    return cache.get_or_set(
+        name, lambda: uuid4().hex, settings.PAGINATION_NESTED_COUNT_CACHE_TTL
+    )
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_strategy = (
+            getattr(view, 'count_strategy', None)
+            or settings.PAGINATION_COUNT_STRATEGY
+        )
+        self.view = view
+        if self.count_strategy in (EXACT, CACHED):
+            return super().paginate_queryset(queryset, request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.request = request
+        page = list(queryset[self.offset:self.offset + self.limit + 1])
+        has_next = len(page) > self.limit
+        # The count only has to keep the links right past this page.
+        self.count = self.offset + len(page)
+        if has_next and self.count_strategy == ESTIMATED:
+            self.count = max(self.get_count(queryset), self.count)
+        if self.template is not None and (has_next or self.offset):
+            self.display_page_controls = True
+        return page[:self.limit]
+
+    def get_count(self, queryset):
+        # Annotations only render the page, counting must not compute them
+        # for every row.
+        try:
+            queryset = queryset.values('pk')
+        except AttributeError:
+            return len(queryset)
+        if self.count_strategy == CACHED:
+            parent = getattr(self.view, 'count_parent', None)
+            if parent is None:
+                version = IndexVersion.objects.current(
+                    version_name(queryset.model)
+                )
+                timeout = settings.PAGINATION_COUNT_CACHE_TTL
+            else:
+                version = nested_version(version_name(
+                    queryset.model,
+                    parent,
+                    self.view.kwargs.get(f'{parent}_id'),
+                ))
+                timeout = settings.PAGINATION_NESTED_COUNT_CACHE_TTL
+            return counts.cached_count(
+                queryset, timeout, prefix=f'count-v{version}'
+            )
+        if self.count_strategy == ESTIMATED:
+            if queryset.query.where:
+                estimate = counts.query_estimate(queryset)
+            else:
+                estimate = counts.table_estimate(queryset.model, queryset.db)
+            if (
+                estimate is not None
+                and estimate > settings.PAGINATION_EXACT_COUNT_LIMIT
+            ):
+                return estimate
+        return queryset.count()
+
+    def get_paginated_response(self, data):
+        if self.count_strategy != NONE:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+@receiver((post_save, post_delete), sender=User)
+@receiver((post_save, post_delete), sender=Title)
+def bump_on_change(sender, **kwargs):
+    # Edits hide titles and users or change what their filters match.
+    bump_counts(sender)
+
+
+@receiver((post_save, post_delete), sender=Review)
+def bump_on_review_create_or_delete(sender, instance, created=True,
+                                    **kwargs):
+    if created:
+        bump_nested_counts(Review, 'title', [instance.title_id])
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def bump_on_comment_create_or_delete(sender, instance, created=True,
+                                     **kwargs):
+    if created:
+        bump_nested_counts(Comment, 'review', [instance.review_id])
+
+
+@receiver((post_save, post_delete), sender=Genre)
+@receiver((post_save, post_delete), sender=Category)
+def bump_on_catalog_change(sender, **kwargs):
+    # Titles are listed by genre and category slug.
+    bump_counts(sender, Title)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_on_genres_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_counts(Title)
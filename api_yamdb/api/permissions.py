@@ -42,6 +42,14 @@ class IsAuthorModeratorAdminOrReadOnly(BasePermission):
         )
 
 
+class IsModeratorOrAdmin(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return user.is_authenticated and (
+            user.is_moderator or user.is_admin or user.is_superuser
+        )
+
+
 class IsAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         if request.user.is_authenticated:
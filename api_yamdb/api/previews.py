@@ -0,0 +1,63 @@
+"""
+Latest comments of a page of reviews, embedded with ``?include=comments``.
+"""
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from reviews.models import Comment
+
+DEFAULT_LIMIT = 3
+MAX_LIMIT = 20
+
+
+def comments_limit(request):
+    """``comments_limit`` from the query string, clamped like page limits."""
+    try:
+        limit = int(request.query_params.get('comments_limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return max(0, min(limit, MAX_LIMIT))
+
+
+def comment_previews(review_ids, limit):
+    """
+    The latest ``limit`` comments of every review, numbered per review with
+    ``ROW_NUMBER()`` and counted with a windowed ``COUNT`` in one query.
+    Django 2.2 cannot filter on window functions, so the ranked queryset
+    is wrapped in raw SQL.
+    """
+    ranked = (
+        Comment.objects.filter(
+            review_id__in=review_ids, hidden_at__isnull=True
+        )
+        .annotate(
+            preview_rank=Window(
+                RowNumber(),
+                partition_by=[F('review_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            ),
+            comments_total=Window(Count('id'), partition_by=[F('review_id')]),
+            author_username=F('author__username'),
+        )
+        .only('text', 'pub_date', 'review')
+        .order_by()
+    )
+    sql, params = ranked.query.sql_with_params()
+    return Comment.objects.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE preview_rank <= %s '
+        f'ORDER BY preview_rank',
+        (*params, limit),
+    )
+
+
+def attach_comment_previews(reviews, limit):
+    """Set ``comment_previews`` and ``comments_count`` on ``reviews``."""
+    for review in reviews:
+        review.comment_previews = []
+        review.comments_count = 0
+    by_id = {review.pk: review for review in reviews}
+    # A preview of zero comments still needs the counts.
+    for comment in comment_previews(list(by_id), max(limit, 1)):
+        review = by_id[comment.review_id]
+        review.comments_count = comment.comments_total
+        if comment.preview_rank <= limit:
+            review.comment_previews.append(comment)
@@ -0,0 +1,245 @@
+"""
+Purge fan-out for the edge cache.
+
+Model writes schedule the surrogate keys they invalidate (see
+``api.caching``) once their transaction commits. A background thread per
+process collects keys for ``CACHE_PURGE_BATCH_WINDOW`` seconds, drops
+duplicates and hands them in batches to each of the backends listed,
+comma-separated, in ``CACHE_PURGE_BACKEND``.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from api_yamdb.db.middleware import PIN_COOKIE
+
+logger = logging.getLogger(__name__)
+
+
+class LocMemBackend:
+    """Records purged keys instead of sending them anywhere."""
+
+    purged = []
+
+    def purge(self, keys):
+        self.purged.append(set(keys))
+
+
+class SurrogateKeyBackend:
+    """
+    Sends ``PURGE`` with a ``Surrogate-Key`` header, as understood by
+    Varnish (xkey), Fastly and similar tag-aware caches.
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def purge(self, keys):
+        self.session.request(
+            'PURGE',
+            settings.CACHE_PURGE_URL,
+            headers={'Surrogate-Key': ' '.join(sorted(keys))},
+            timeout=5,
+        ).raise_for_status()
+
+
+class NginxBackend:
+    """
+    Purges the cached responses behind the keys through the internal nginx
+    listener, built with ``ngx_cache_purge`` (see ``infra/nginx``), then
+    refreshes the canonical listings and titles from the primary database.
+
+    Open source nginx has no tags: a key maps to the cache key prefixes of
+    the paths it renders, every query string, format and encoding of a path
+    sharing one. Reviews and comments are cached under their own ids, so
+    their keys need no title; genres and categories are rendered by every
+    title page and drop them all.
+    """
+
+    purges = (
+        (re.compile(r'^(titles|genres|categories)$'), '/api/v1/{0}/|'),
+        (re.compile(r'^title-(\d+)$'), '/api/v1/titles/{0}/|'),
+        (re.compile(r'^title-(\d+)-reviews$'), '/api/v1/titles/{0}/reviews/|'),
+        (re.compile(r'^title-(\d+)-similar$'), '/api/v1/titles/{0}/similar/|'),
+        (re.compile(r'^review-(\d+)$'), '/reviews/{0}/|'),
+        (re.compile(r'^review-(\d+)-comments$'), '/reviews/{0}/comments/|'),
+        (re.compile(r'^comment-(\d+)$'), '/comments/{0}/|'),
+        (re.compile(r'^(genre|category)-\d+$'), '/api/v1/titles/'),
+    )
+    urls = (
+        (re.compile(r'^(titles|genres|categories)$'), '/api/v1/{0}/'),
+        (re.compile(r'^title-(\d+)$'), '/api/v1/titles/{0}/'),
+        (re.compile(r'^title-(\d+)-reviews$'), '/api/v1/titles/{0}/reviews/'),
+        (re.compile(r'^title-(\d+)-similar$'), '/api/v1/titles/{0}/similar/'),
+    )
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    @staticmethod
+    def expand(keys, patterns):
+        found = set()
+        for key in keys:
+            for pattern, template in patterns:
+                match = pattern.match(key)
+                if match:
+                    found.add(template.format(*match.groups()))
+        return sorted(found)
+
+    def prefixes(self, keys):
+        """Cache key prefixes to purge, none inside another."""
+        prefixes = self.expand(keys, self.purges)
+        return [
+            prefix for prefix in prefixes
+            if not any(
+                prefix != other and prefix.startswith(other)
+                for other in prefixes
+            )
+        ]
+
+    def paths(self, keys):
+        return self.expand(keys, self.urls)
+
+    def purge(self, keys):
+        base_url = settings.CACHE_PURGE_URL.rstrip('/')
+        for prefix in self.prefixes(keys):
+            response = self.session.request(
+                'PURGE',
+                base_url + '/purge' + quote(prefix + '*', safe='/*'),
+                timeout=5,
+            )
+            # 404: nothing was cached under the prefix.
+            if response.status_code != 404:
+                response.raise_for_status()
+        # Pinned like a client that has just written, a replica behind the
+        # write would put the old response back.
+        cookies = {
+            PIN_COOKIE: str(time.time() + settings.DB_REPLICA_PIN_SECONDS)
+        }
+        for path in self.paths(keys):
+            # One cached copy per response encoding.
+            for encoding in ('br', 'gzip', 'identity'):
+                self.session.get(
+                    base_url + path,
+                    headers={
+                        'Accept': 'application/json',
+                        'Accept-Encoding': encoding,
+                    },
+                    cookies=cookies,
+                    timeout=5,
+                    stream=True,
+                ).close()
+
+
+class PurgeDispatcher:
+    def __init__(self):
+        self.pending = set()
+        self.condition = threading.Condition()
+        self.backends = []
+        self.thread = None
+        self.pid = None
+
+    def schedule(self, keys):
+        """Purge ``keys`` once the current transaction commits."""
+        if settings.CACHE_PURGE_BACKEND:
+            transaction.on_commit(lambda: self.add(keys))
+
+    def add(self, keys):
+        with self.condition:
+            self.pending.update(keys)
+            self.start()
+            self.condition.notify()
+
+    def start(self):
+        if self.pid == os.getpid() and self.thread.is_alive():
+            return
+        self.pid = os.getpid()
+        self.backends = [
+            import_string(path.strip())()
+            for path in settings.CACHE_PURGE_BACKEND.split(',')
+        ]
+        self.thread = threading.Thread(
+            target=self.run, name='cache-purge', daemon=True
+        )
+        self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            # Let the keys of concurrent writes pile up into one batch.
+            threading.Event().wait(settings.CACHE_PURGE_BATCH_WINDOW)
+            self.flush()
+
+    def flush(self):
+        with self.condition:
+            keys, self.pending = sorted(self.pending), set()
+        size = settings.CACHE_PURGE_MAX_KEYS
+        for backend in self.backends:
+            for start in range(0, len(keys), size):
+                try:
+                    backend.purge(keys[start:start + size])
+                except Exception:
+                    logger.exception(
+                        'Cache purge of %d keys failed', len(keys)
+                    )
+
+
+dispatcher = PurgeDispatcher()
+
+
+@receiver((post_save, post_delete), sender=Title)
+def purge_title(sender, instance, **kwargs):
+    dispatcher.schedule({'titles', f'title-{instance.pk}'})
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def purge_title_genres(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Title):
+        dispatcher.schedule({'titles', f'title-{instance.pk}'})
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def purge_genre(sender, instance, **kwargs):
+    dispatcher.schedule({'genres', f'genre-{instance.pk}'})
+
+
+@receiver((post_save, post_delete), sender=Category)
+def purge_category(sender, instance, **kwargs):
+    dispatcher.schedule({'categories', f'category-{instance.pk}'})
+
+
+@receiver((post_save, post_delete), sender=Review)
+def purge_review(sender, instance, created=True, **kwargs):
+    keys = {
+        f'title-{instance.title_id}',
+        f'title-{instance.title_id}-reviews',
+        f'review-{instance.pk}',
+    }
+    # The rating of the title is in every title listing; the score before
+    # an update is read by api.stats.
+    if created or getattr(instance, 'saved_score', None) not in (
+        None, instance.score
+    ):
+        keys.add('titles')
+    dispatcher.schedule(keys)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def purge_comment(sender, instance, **kwargs):
+    dispatcher.schedule({
+        f'review-{instance.review_id}-comments',
+        f'comment-{instance.pk}',
+    })
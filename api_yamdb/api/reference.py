@@ -0,0 +1,117 @@
+"""
+Genres and categories held by every process: ``slug → id`` and
+``id → (name, slug)``.
+
+They are a few rows that change a few times a day, yet every genre and
+category listing, every title rendered with its category and every title
+written with genre and category slugs looks them up. Their writes bump the
+``reference`` version in ``IndexVersion``; a process compares it at most
+every ``REFERENCE_CHECK_INTERVAL`` seconds and reloads both tables when it
+moved, so between the checks the lookups make no query at all. The
+process that writes reloads at once.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Category, Genre, IndexVersion
+
+INDEX_NAME = 'reference'
+MODELS = (Category, Genre)
+
+
+class Table:
+    """The rows of one reference model, ordered like the model."""
+
+    def __init__(self, model, rows):
+        self.model = model
+        self.rows = rows
+        self.names = {pk: (name, slug) for pk, name, slug in rows}
+        self.ids = {slug: pk for pk, _, slug in rows}
+
+    def instance(self, pk):
+        name, slug = self.names[pk]
+        return self.model(pk=pk, name=name, slug=slug)
+
+    def instances(self):
+        return [
+            self.model(pk=pk, name=name, slug=slug)
+            for pk, name, slug in self.rows
+        ]
+
+    def by_slug(self, slug):
+        """The row of ``slug`` as an instance, or None."""
+        pk = self.ids.get(slug)
+        return None if pk is None else self.instance(pk)
+
+
+class ReferenceCache:
+    def __init__(self):
+        self.tables = None
+        self.version = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def load(self):
+        # Read before the rows, so a write racing the load is seen later.
+        version = IndexVersion.objects.current(INDEX_NAME)
+        tables = {
+            model: Table(model, list(
+                model.objects.order_by(*model._meta.ordering, 'pk')
+                .values_list('pk', 'name', 'slug')
+            ))
+            for model in MODELS
+        }
+        self.tables, self.version = tables, version
+        self.checked = time.monotonic()
+        return tables
+
+    def get(self, model):
+        tables = self.tables
+        if tables is None:
+            with self.lock:
+                tables = self.tables or self.load()
+            return tables[model]
+        now = time.monotonic()
+        if now - self.checked >= settings.REFERENCE_CHECK_INTERVAL:
+            self.checked = now
+            if IndexVersion.objects.current(INDEX_NAME) != self.version:
+                with self.lock:
+                    tables = self.load()
+        return tables[model]
+
+    def names(self, model, pk):
+        """
+        ``(name, slug)`` of ``pk``, reloading once for a row newer than the
+        tables; None for a row deleted since.
+        """
+        names = self.get(model).names
+        if pk not in names:
+            with self.lock:
+                names = self.load()[model].names
+        return names.get(pk)
+
+    def clear(self):
+        self.tables = None
+
+
+references = ReferenceCache()
+
+
+def warm():
+    """Startup warmer: load the tables before the workers fork."""
+    return sum(len(table.rows) for table in references.load().values())
+
+
+def bump_version():
+    IndexVersion.objects.bump(INDEX_NAME)
+
+
+@receiver((post_save, post_delete), sender=Genre)
+@receiver((post_save, post_delete), sender=Category)
+def reload_on_change(sender, **kwargs):
+    references.clear()
+    transaction.on_commit(bump_version)
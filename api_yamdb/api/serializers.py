@@ -1,16 +1,23 @@
 import datetime as dt
 
+from django.conf import settings
 from django.contrib.auth.hashers import check_password
 from django.db.models import Avg, Q
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from reviews.models import (MAX_LENGTH_LONG, MAX_LENGTH_MED, Category, Comment,
-                            Genre, Review, Title, User)
+                            Genre, Job, Review, SimilarTitle, Title, User,
+                            UserGenreStats, UserStats)
 
-from .validators import NotFoundValidationError, username_restriction
+from .fieldsets import SparseFieldsSerializerMixin
+from .reference import references
+from .validators import (NotFoundValidationError, UniqueSlugValidator,
+                         username_restriction)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     username = serializers.CharField(
         max_length=MAX_LENGTH_MED,
         validators=[
@@ -35,6 +42,26 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
 
 
+class GenreStatsSerializer(serializers.ModelSerializer):
+    slug = serializers.CharField(source='genre.slug')
+    name = serializers.CharField(source='genre.name')
+
+    class Meta:
+        fields = ('slug', 'name', 'reviews_count')
+        model = UserGenreStats
+
+
+class UserStatsSerializer(serializers.ModelSerializer):
+    average_score = serializers.FloatField(read_only=True)
+    top_genres = GenreStatsSerializer(many=True, read_only=True)
+
+    class Meta:
+        fields = (
+            'reviews_count', 'average_score', 'comments_count', 'top_genres'
+        )
+        model = UserStats
+
+
 class UserSelfSerializer(serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=MAX_LENGTH_MED,
@@ -121,7 +148,9 @@ class LoginUserSerializer(serializers.Serializer):
         return data
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
     )
@@ -131,49 +160,175 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'pub_date', 'author')
         model = Review
 
-    def validate(self, data):
-        if self.context.get('request').method != 'POST':
-            return data
-        user = self.context.get('request').user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        if Review.objects.filter(author=user, title_id=title_id).exists():
+
+class CommentsSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
+    author = serializers.SlugRelatedField(
+        read_only=True, slug_field='username'
+    )
+
+    class Meta:
+        fields = ('id', 'text', 'author', 'pub_date')
+        model = Comment
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        choices=('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+    )
+    path = serializers.RegexField(r'^/api/v1/')
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        if value.split('?')[0].rstrip('/') == '/api/v1/batch':
+            raise serializers.ValidationError('Batches cannot be nested.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        limit = settings.BATCH_MAX_REQUESTS
+        if len(value) > limit:
             raise serializers.ValidationError(
-                {'detail': 'Not allowed to create multiple reviews.'}
+                f'At most {limit} requests per batch.'
             )
-        return data
+        return value
+
+
+class ActivitySerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    title_id = serializers.IntegerField()
+    review_id = serializers.IntegerField(required=False)
+    author = serializers.CharField()
+    text = serializers.CharField()
+    score = serializers.IntegerField(required=False)
+    pub_date = serializers.DateTimeField()
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'id', 'kind', 'object_id', 'status', 'done', 'total', 'error',
+            'created_at', 'finished_at',
+        )
+        model = Job
 
 
-class CommentsSerializer(serializers.ModelSerializer):
+class ModerationSerializer(serializers.Serializer):
     author = serializers.SlugRelatedField(
-        read_only=True, slug_field='username'
+        slug_field='username', queryset=User.objects.all(), required=False
+    )
+    title = serializers.PrimaryKeyRelatedField(
+        queryset=Title.objects.all(), required=False
+    )
+    text = serializers.CharField(required=False, max_length=MAX_LENGTH_MED)
+    # Both when left out.
+    kinds = serializers.MultipleChoiceField(
+        choices=('reviews', 'comments'), required=False
+    )
+    action = serializers.ChoiceField(
+        choices=('delete', 'hide', 'restore'), default='delete'
     )
 
+    def validate(self, data):
+        if not {'author', 'title', 'text'} & data.keys():
+            raise serializers.ValidationError(
+                'Set author, title or text.'
+            )
+        return data
+
+    def arguments(self):
+        """The filters as ``api.moderation.matching`` and a job take them."""
+        data = self.validated_data
+        return {
+            'author': data['author'].pk if 'author' in data else None,
+            'title': data['title'].pk if 'title' in data else None,
+            'text': data.get('text'),
+            'kinds': sorted(data.get('kinds') or ('reviews', 'comments')),
+            'action': data['action'],
+        }
+
+
+class CommentPreviewSerializer(serializers.ModelSerializer):
+    author = serializers.CharField(source='author_username', read_only=True)
+
     class Meta:
         fields = ('id', 'text', 'author', 'pub_date')
         model = Comment
 
 
-class CategorySerializer(serializers.ModelSerializer):
-    slug = serializers.SlugField(
-        validators=[UniqueValidator(queryset=Category.objects.all())]
+class SimilarTitleSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='similar_id')
+    name = serializers.CharField(source='similar.name')
+    year = serializers.IntegerField(source='similar.year')
+
+    class Meta:
+        fields = ('id', 'name', 'year', 'score')
+        model = SimilarTitle
+
+
+class ReviewWithCommentsSerializer(ReviewSerializer):
+    comments = CommentPreviewSerializer(
+        source='comment_previews', many=True, read_only=True
     )
+    comments_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('comments', 'comments_count')
+
+
+class CategorySerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
+    slug = serializers.SlugField(validators=[UniqueSlugValidator(Category)])
 
     class Meta:
         fields = ('name', 'slug')
         model = Category
 
 
-class GenreSerializer(serializers.ModelSerializer):
-    slug = serializers.SlugField(
-        validators=[UniqueValidator(queryset=Genre.objects.all())]
-    )
+class GenreSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
+    slug = serializers.SlugField(validators=[UniqueSlugValidator(Genre)])
 
     class Meta:
         fields = ('name', 'slug')
         model = Genre
 
 
+class ReferenceField(serializers.Field):
+    """A genre or category by its id, rendered from ``api.reference``."""
+
+    def __init__(self, model, **kwargs):
+        self.model = model
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        row = references.names(self.model, value)
+        if row is None:
+            return None
+        name, slug = row
+        return {'name': name, 'slug': slug}
+
+
 class TaggedObjectRelatedField(serializers.SlugRelatedField):
+    def to_internal_value(self, data):
+        # Resolved by api.reference instead of a query per slug.
+        if not isinstance(data, str):
+            self.fail('invalid')
+        instance = references.get(self.queryset.model).by_slug(data)
+        if instance is None:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field, value=data
+            )
+        return instance
+
     def to_representation(self, value):
         if isinstance(value, Genre):
             serializer = GenreSerializer(value)
@@ -185,7 +340,9 @@ class TaggedObjectRelatedField(serializers.SlugRelatedField):
         return serializer.data
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     id = serializers.IntegerField(read_only=True)
     category = TaggedObjectRelatedField(
         slug_field='slug', queryset=Category.objects.all()
@@ -196,7 +353,7 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('updated_at', 'deleted_at')
 
     def create(self, validated_data):
         genres = validated_data.pop('genre', [])
@@ -211,17 +368,25 @@ class TitleSerializer(serializers.ModelSerializer):
         return value
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TitleReadSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     genre = GenreSerializer(read_only=True, many=True)
-    category = CategorySerializer(read_only=True)
+    category = ReferenceField(Category, source='category_id')
     rating = serializers.SerializerMethodField()
 
     class Meta:
-        fields = '__all__'
+        exclude = ('updated_at', 'deleted_at')
         model = Title
 
     def get_rating(self, obj):
-        rating = obj.reviews.aggregate(Avg('score'))['score__avg']
+        # Annotated by TitleViewSet, aggregated for titles read elsewhere.
+        if hasattr(obj, 'rating'):
+            rating = obj.rating
+        else:
+            rating = obj.reviews.filter(hidden_at__isnull=True).aggregate(
+                rating=Avg('score')
+            )['rating']
         if rating:
             return (
                 round(rating)
@@ -0,0 +1,229 @@
+"""
+Similar titles from review scores, served by ``/titles/{id}/similar/``.
+
+Reviews form a sparse author by title matrix. Scores are centred on the
+mean score of their author (adjusted cosine) and title columns are scaled
+to unit length, so the similarity of two titles is the dot product of
+their columns. Chunks of titles are multiplied against the whole matrix in
+worker processes and the ``SIMILAR_TITLES_K`` best positive neighbours of
+every title are stored in ``SimilarTitle``.
+
+An incremental refresh finds the titles whose reviews changed by comparing
+a fingerprint of their reviews with the one stored in ``SimilarityState``,
+so the write path pays nothing for it, and recomputes those titles and the
+titles whose neighbour lists they appear in or enter. Titles waiting for
+deletion are left out like titles without reviews.
+"""
+import multiprocessing
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from reviews.models import Review, SimilarityState, SimilarTitle
+from scipy import sparse
+
+from .purge import dispatcher
+
+CHUNK_SIZE = 1000
+
+# Set in the parent before the pool forks, read by the workers.
+_shared = None
+
+
+def score_matrix(authors, titles, scores):
+    """
+    Normalized CSC matrix of the reviews given as parallel arrays, and the
+    title ids of its columns.
+    """
+    author_ids, author_index = np.unique(authors, return_inverse=True)
+    title_ids, title_index = np.unique(titles, return_inverse=True)
+    scores = np.asarray(scores, dtype=np.float32)
+    means = np.bincount(author_index, weights=scores) / np.bincount(
+        author_index
+    )
+    matrix = sparse.csc_matrix(
+        (scores - means[author_index], (author_index, title_index)),
+        shape=(len(author_ids), len(title_ids)),
+        dtype=np.float32,
+    )
+    # Authors of a single review, or of equal scores only, carry no signal.
+    matrix.eliminate_zeros()
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=0)).A1
+    norms[norms == 0] = 1
+    return (matrix @ sparse.diags(1 / norms)).tocsc(), title_ids
+
+
+def fingerprints(authors, titles, scores):
+    """
+    Order-independent hash of the ``(author, score)`` pairs of every title,
+    in the column order of ``score_matrix``.
+    """
+    title_ids, title_index = np.unique(titles, return_inverse=True)
+    with np.errstate(over='ignore'):
+        mixed = np.asarray(authors, dtype=np.uint64) * np.uint64(
+            0x9E3779B97F4A7C15
+        ) + np.asarray(scores, dtype=np.uint64)
+        mixed ^= mixed >> np.uint64(31)
+        mixed *= np.uint64(0xBF58476D1CE4E5B9)
+        mixed ^= mixed >> np.uint64(29)
+        sums = np.zeros(len(title_ids), dtype=np.uint64)
+        np.add.at(sums, title_index, mixed)
+    return sums.view(np.int64)
+
+
+def top_neighbours(matrix, columns, k):
+    """
+    The ``k`` most similar positive neighbours of ``columns`` as parallel
+    arrays of column, neighbour column, score and rank.
+    """
+    products = (matrix[:, columns].T @ matrix).tocoo()
+    rows = columns[products.row]
+    keep = (products.data > 0) & (products.col != rows)
+    rows, neighbours = rows[keep], products.col[keep]
+    scores = products.data[keep]
+    order = np.lexsort((neighbours, -scores, rows))
+    rows, neighbours, scores = rows[order], neighbours[order], scores[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    top = ranks < k
+    return rows[top], neighbours[top], scores[top], ranks[top]
+
+
+def _worker(columns):
+    matrix, k = _shared
+    return top_neighbours(matrix, columns, k)
+
+
+def compute(matrix, columns, k, processes=None, chunk_size=CHUNK_SIZE):
+    """Neighbour arrays of ``columns``, chunk by chunk over processes."""
+    global _shared
+    chunks = [
+        columns[start:start + chunk_size]
+        for start in range(0, len(columns), chunk_size)
+    ]
+    if processes == 1 or len(chunks) <= 1:
+        results = [top_neighbours(matrix, chunk, k) for chunk in chunks]
+    else:
+        # Forked workers inherit the matrix instead of unpickling it.
+        connections.close_all()
+        _shared = (matrix, k)
+        try:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                results = pool.map(_worker, chunks)
+        finally:
+            _shared = None
+    if not results:
+        return tuple(np.empty(0, dtype=int) for _ in range(4))
+    return tuple(np.concatenate(arrays) for arrays in zip(*results))
+
+
+def load_reviews():
+    """Author ids, title ids and scores of every review of a visible title."""
+    reviews = np.array(
+        list(
+            Review.objects.filter(
+                title__isnull=False,
+                hidden_at__isnull=True,
+                title__deleted_at__isnull=True,
+            )
+            .order_by()
+            .values_list('author_id', 'title_id', 'score')
+            .iterator(chunk_size=10000)
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    return reviews[:, 0], reviews[:, 1], reviews[:, 2]
+
+
+def store(title_ids, rows, neighbours, scores, ranks, replace):
+    """Replace the neighbours of ``replace`` (every title if None)."""
+    stored = SimilarTitle.objects.all()
+    if replace is not None:
+        stored = stored.filter(title_id__in=replace)
+    stored.delete()
+    SimilarTitle.objects.bulk_create(
+        (
+            SimilarTitle(
+                title_id=title, similar_id=similar, score=score, rank=rank
+            )
+            for title, similar, score, rank in zip(
+                title_ids[rows].tolist(),
+                title_ids[neighbours].tolist(),
+                scores.tolist(),
+                ranks.tolist(),
+            )
+        ),
+        batch_size=2000,
+    )
+
+
+def store_state(current, changed):
+    """Remember the fingerprints of ``changed`` (every title if None)."""
+    stored = SimilarityState.objects.all()
+    if changed is not None:
+        stored = stored.filter(title_id__in=changed)
+        current = {
+            title: current[title] for title in changed if title in current
+        }
+    stored.delete()
+    SimilarityState.objects.bulk_create(
+        (
+            SimilarityState(title_id=title, fingerprint=fingerprint)
+            for title, fingerprint in current.items()
+        ),
+        batch_size=2000,
+    )
+
+
+def refresh(full=False, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Recompute stored neighbours, of every title or of the titles whose
+    reviews changed since. Returns the number of titles refreshed.
+    """
+    k = settings.SIMILAR_TITLES_K
+    reviews = load_reviews()
+    matrix, title_ids = score_matrix(*reviews)
+    current = dict(zip(title_ids.tolist(), fingerprints(*reviews).tolist()))
+
+    def columns_of(ids):
+        ids = np.array(sorted(ids), dtype=np.int64)
+        positions = np.searchsorted(title_ids, ids)
+        found = positions < len(title_ids)
+        found[found] = title_ids[positions[found]] == ids[found]
+        return positions[found]
+
+    if full:
+        changed = replace = None
+        # Every list may change, those left with no neighbours included.
+        purged = set(title_ids.tolist()) | set(
+            SimilarTitle.objects.values_list('title_id', flat=True)
+        )
+        result = compute(
+            matrix, np.arange(len(title_ids)), k, processes, chunk_size
+        )
+    else:
+        stored = dict(
+            SimilarityState.objects.values_list('title_id', 'fingerprint')
+        )
+        changed = {
+            title for title, fingerprint in current.items()
+            if stored.get(title) != fingerprint
+        } | (stored.keys() - current.keys())
+        if not changed:
+            return 0
+        # A changed title changes the lists it appears in or now enters.
+        _, neighbours, _, _ = compute(
+            matrix, columns_of(changed), k, processes, chunk_size
+        )
+        replace = changed | set(title_ids[neighbours].tolist()) | set(
+            SimilarTitle.objects.filter(similar_id__in=changed)
+            .values_list('title_id', flat=True)
+        )
+        result = compute(
+            matrix, columns_of(replace), k, processes, chunk_size
+        )
+        purged = replace
+    with transaction.atomic():
+        store(title_ids, *result, replace=replace)
+        store_state(current, changed)
+        dispatcher.schedule({f'title-{pk}-similar' for pk in purged})
+    return len(title_ids) if full else len(replace)
@@ -0,0 +1,296 @@
+"""
+Pre-rendered JSON of the public catalog under ``SNAPSHOT_ROOT``, served by
+nginx without reaching Django (see ``infra/nginx/default.conf``).
+
+Published are the genre and category listings, the first page of titles,
+unfiltered and filtered by each genre and category, and every title. A
+URL is rendered anonymously through the whole middleware stack into
+``<path>/index.json``, or ``<path>/<filter>=<slug>.json`` for a filtered
+listing, by writing a temporary file and renaming it over the old one.
+
+``manifest.json`` keeps the surrogate keys every listing rendered. Purged
+keys (``SnapshotBackend``, see ``api.purge``) re-render the listings that
+rendered them, the titles they name or whose genres and category they name,
+and publish the genres and categories new among them; ``manage.py
+publish_snapshots`` renders everything. Keys are only kept in memory and a
+snapshot never expires, so ``publish_snapshots --every`` renders
+everything again periodically, catching up with the keys lost to a
+restart or a failed render.
+"""
+import fcntl
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import parse_qsl, urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.db.models import Q
+from reviews.models import Category, Genre, Title
+
+from api_yamdb.db.middleware import PIN_COOKIE
+
+from .batch import get_handler
+
+logger = logging.getLogger(__name__)
+
+LISTINGS = {
+    'categories': '/api/v1/categories/',
+    'genres': '/api/v1/genres/',
+    'titles': '/api/v1/titles/',
+}
+FILTERS = {'genre': Genre, 'category': Category}
+
+TITLE_URL = re.compile(r'^/api/v1/titles/(\d+)/$')
+
+TitleGenre = Title.genre.through
+
+
+def title_url(pk):
+    return f'/api/v1/titles/{pk}/'
+
+
+def filter_url(kind, slug):
+    return f'/api/v1/titles/?{kind}={slug}'
+
+
+def path_for(url):
+    path, _, query = url.partition('?')
+    return os.path.join(
+        settings.SNAPSHOT_ROOT, path.strip('/'), f'{query or "index"}.json'
+    )
+
+
+def build_request(url):
+    path, _, query = url.partition('?')
+    base = urlsplit(settings.SNAPSHOT_BASE_URL)
+    return WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query,
+        'SERVER_NAME': base.hostname,
+        'SERVER_PORT': str(base.port or 80),
+        'HTTP_HOST': base.netloc,
+        'HTTP_ACCEPT': 'application/json',
+        'HTTP_ACCEPT_ENCODING': 'identity',
+        # Pinned to the primary, a lagging replica would publish old data.
+        'HTTP_COOKIE': f'{PIN_COOKIE}={time.time() + 60}',
+        'wsgi.url_scheme': base.scheme,
+        'wsgi.input': BytesIO(),
+    })
+
+
+def write(path, content):
+    """Replace ``path`` with ``content`` at once, unless it holds it."""
+    try:
+        with open(path, 'rb') as file:
+            if file.read() == content:
+                return
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        # Readable by nginx, mkstemp leaves it to the owner.
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class Snapshots:
+    def __init__(self):
+        self.manifest_path = os.path.join(
+            settings.SNAPSHOT_ROOT, 'manifest.json'
+        )
+        try:
+            with open(self.manifest_path) as file:
+                self.manifest = json.load(file)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def save(self):
+        write(
+            self.manifest_path,
+            json.dumps(self.manifest, sort_keys=True).encode(),
+        )
+
+    def render(self, url, source=None):
+        """
+        Publish ``url``, or remove it when it is gone: a 404 or, for a
+        filtered listing, a ``source`` genre or category of another slug.
+        """
+        if source is not None and not self.source_exists(url, source):
+            self.remove(url)
+            return
+        response = get_handler().get_response(build_request(url))
+        if response.status_code != 200:
+            self.remove(url)
+            return
+        write(path_for(url), response.content)
+        if TITLE_URL.match(url):
+            # Titles are found from the keys, see new_targets.
+            return
+        keys = set(response.get('Surrogate-Key', '').split())
+        if source is not None:
+            # Only the titles of the genre or category enter the page.
+            keys.discard('titles')
+            keys.add(source)
+        self.manifest[url] = {'keys': sorted(keys), 'source': source}
+
+    def remove(self, url):
+        self.manifest.pop(url, None)
+        try:
+            os.unlink(path_for(url))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def source_exists(url, source):
+        kind, pk = source.rsplit('-', 1)
+        slug = dict(parse_qsl(urlsplit(url).query)).get(kind)
+        return FILTERS[kind].objects.filter(pk=pk, slug=slug).exists()
+
+    def affected(self, keys):
+        """URLs of the published files that rendered any of ``keys``."""
+        return {
+            url: entry['source'] for url, entry in self.manifest.items()
+            if not keys.isdisjoint(entry['keys'])
+        }
+
+
+def new_targets(keys):
+    """
+    URLs of the listings named by ``keys``, of the titles they name or
+    whose genres and category they name, and of the listings filtered by
+    the genres and categories among them or of those titles.
+    """
+    targets = {url: None for key, url in LISTINGS.items() if key in keys}
+    ids = {kind: set() for kind in ('title', *FILTERS)}
+    for key in keys:
+        kind, _, pk = key.partition('-')
+        if kind in ids and pk.isdigit():
+            ids[kind].add(int(pk))
+    # Deleted titles are rendered too, their 404 removes the file.
+    targets.update((title_url(pk), None) for pk in ids['title'])
+    titles = list(
+        Title.visible.filter(
+            Q(pk__in=ids['title'])
+            | Q(category_id__in=ids['category'])
+            | Q(genre__in=ids['genre'])
+        ).values_list('pk', 'category_id').distinct()
+    )
+    targets.update((title_url(pk), None) for pk, _ in titles)
+    ids['category'].update(
+        category_id for pk, category_id in titles
+        if category_id and pk in ids['title']
+    )
+    ids['genre'].update(TitleGenre.objects.filter(
+        title_id__in=ids['title']
+    ).values_list('genre_id', flat=True))
+    for kind, model in FILTERS.items():
+        targets.update(
+            (filter_url(kind, slug), f'{kind}-{pk}')
+            for pk, slug in model.objects.filter(
+                pk__in=ids[kind]
+            ).values_list('pk', 'slug')
+        )
+    return targets
+
+
+def catalog_targets():
+    yield from ((url, None) for url in LISTINGS.values())
+    for kind, model in FILTERS.items():
+        for pk, slug in model.objects.values_list('pk', 'slug'):
+            yield filter_url(kind, slug), f'{kind}-{pk}'
+    for pk in Title.visible.values_list('pk', flat=True).iterator():
+        yield title_url(pk), None
+
+
+@contextmanager
+def published():
+    """The snapshots, locked against other processes publishing."""
+    os.makedirs(settings.SNAPSHOT_ROOT, exist_ok=True)
+    with open(os.path.join(settings.SNAPSHOT_ROOT, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = Snapshots()
+        try:
+            yield snapshots
+        finally:
+            snapshots.save()
+
+
+def publish(keys):
+    """Re-render the files behind ``keys``; returns the URLs rendered."""
+    keys = set(keys)
+    with published() as snapshots:
+        targets = snapshots.affected(keys)
+        targets.update(new_targets(keys))
+        for url, source in targets.items():
+            snapshots.render(url, source)
+    return sorted(targets)
+
+
+def published_titles():
+    directory = os.path.dirname(path_for(LISTINGS['titles']))
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return set()
+    return {int(name) for name in names if name.isdigit()}
+
+
+def publish_all():
+    """Render the whole catalog and remove what is no longer in it."""
+    with published() as snapshots:
+        stale = set(snapshots.manifest)
+        gone = published_titles()
+        count = 0
+        for url, source in catalog_targets():
+            snapshots.render(url, source)
+            stale.discard(url)
+            match = TITLE_URL.match(url)
+            if match:
+                gone.discard(int(match.group(1)))
+            count += 1
+        for url in stale:
+            snapshots.remove(url)
+        for pk in gone:
+            snapshots.remove(title_url(pk))
+    return count
+
+
+def publish_every(interval):
+    """Render everything every ``interval`` seconds, until interrupted."""
+    while True:
+        started = time.monotonic()
+        try:
+            publish_all()
+        except Exception:
+            # The next run renders it all again.
+            logger.exception('Publishing snapshots failed')
+        finally:
+            connections.close_all()
+        time.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+class SnapshotBackend:
+    """Purge backend re-rendering the snapshots behind the keys."""
+
+    def purge(self, keys):
+        try:
+            publish(keys)
+        finally:
+            # The purge thread must not hold a connection forever.
+            connections.close_all()
@@ -0,0 +1,213 @@
+"""
+Per-user review statistics kept in ``UserStats`` and ``UserGenreStats``.
+
+Review, comment and title genre signals apply the change of every write to
+the rows of the authors concerned, in the same transaction, so a profile
+reads two small rows instead of aggregating reviews, comments and genres.
+``manage.py rebuild_user_stats`` recomputes them from scratch, as migration
+0024 did for what was written before them.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from reviews.models import Comment, Review, Title, UserGenreStats, UserStats
+
+TitleGenre = Title.genre.through
+
+
+def load(user):
+    """Statistics of ``user`` with its ``top_genres``."""
+    stats = UserStats.objects.filter(user=user).first() or UserStats(
+        user=user
+    )
+    stats.top_genres = list(
+        UserGenreStats.objects.filter(user=user, reviews_count__gt=0)
+        .select_related('genre')
+        .order_by('-reviews_count', 'genre__name')[:settings.STATS_TOP_GENRES]
+    )
+    return stats
+
+
+def change_stats(user_id, create=False, **deltas):
+    if create:
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id)], ignore_conflicts=True
+        )
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def change_users(deltas, create=False):
+    """
+    Apply ``{user id: {field: delta}}``, one UPDATE per distinct change
+    rather than per user.
+    """
+    if create:
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in deltas],
+            ignore_conflicts=True,
+        )
+    users = defaultdict(list)
+    for user_id, fields in deltas.items():
+        users[tuple(sorted(fields.items()))].append(user_id)
+    for fields, user_ids in users.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(**{
+            field: F(field) + delta for field, delta in fields
+        })
+
+
+def change_genres(deltas):
+    """Apply ``{(user id, genre id): delta}`` to the genre counts."""
+    deltas = {pair: delta for pair, delta in deltas.items() if delta}
+    created = [
+        UserGenreStats(user_id=user_id, genre_id=genre_id)
+        for (user_id, genre_id), delta in deltas.items() if delta > 0
+    ]
+    if created:
+        UserGenreStats.objects.bulk_create(created, ignore_conflicts=True)
+    users = defaultdict(list)
+    for (user_id, genre_id), delta in deltas.items():
+        users[genre_id, delta].append(user_id)
+    for (genre_id, delta), user_ids in users.items():
+        UserGenreStats.objects.filter(
+            genre_id=genre_id, user_id__in=user_ids
+        ).update(reviews_count=F('reviews_count') + delta)
+
+
+def change_review(review, sign):
+    change_stats(
+        review.author_id,
+        create=sign > 0,
+        reviews_count=sign,
+        score_sum=sign * review.score,
+    )
+    if review.title_id is not None:
+        genre_ids = TitleGenre.objects.filter(
+            title_id=review.title_id
+        ).values_list('genre_id', flat=True)
+        change_genres({
+            (review.author_id, genre_id): sign for genre_id in genre_ids
+        })
+
+
+@receiver(pre_save, sender=Review)
+def remember_score(sender, instance, update_fields=None, **kwargs):
+    # One query for the updates that may change the score, none for the
+    # inserts and for every review merely loaded.
+    instance.saved_score = None
+    if instance._state.adding or (
+        update_fields is not None and 'score' not in update_fields
+    ):
+        return
+    instance.saved_score = Review.objects.filter(
+        pk=instance.pk
+    ).values_list('score', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    if created:
+        change_review(instance, 1)
+    elif instance.saved_score not in (None, instance.score):
+        change_stats(
+            instance.author_id, score_sum=instance.score - instance.saved_score
+        )
+
+
+@receiver(pre_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # Before the delete, while the genres of a deleted title still exist.
+    # Hidden reviews were counted out when they were hidden.
+    if instance.hidden_at is None:
+        change_review(instance, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        change_stats(instance.author_id, create=True, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.hidden_at is None:
+        change_stats(instance.author_id, comments_count=-1)
+
+
+@receiver(m2m_changed, sender=TitleGenre)
+def title_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    links = TitleGenre.objects.filter(
+        **{'genre' if reverse else 'title': instance}
+    )
+    if pk_set is not None:
+        links = links.filter(
+            **{'title_id__in' if reverse else 'genre_id__in': pk_set}
+        )
+    genres = defaultdict(list)
+    for title_id, genre_id in links.values_list('title_id', 'genre_id'):
+        genres[title_id].append(genre_id)
+    sign = 1 if action == 'post_add' else -1
+    deltas = Counter()
+    for title_id, author_id in Review.objects.filter(
+        title_id__in=genres, hidden_at__isnull=True
+    ).values_list('title_id', 'author_id'):
+        for genre_id in genres[title_id]:
+            deltas[author_id, genre_id] += sign
+    change_genres(deltas)
+
+
+@transaction.atomic
+def rebuild():
+    """
+    Recompute every row from reviews and comments. Run with writes paused:
+    the rows are deleted and inserted again, so the signals of concurrent
+    writes update rows about to go or find none and their deltas are lost.
+    """
+    totals = defaultdict(dict)
+    for row in Review.objects.filter(
+        hidden_at__isnull=True
+    ).order_by().values('author_id').annotate(
+        reviews_count=Count('id'), score_sum=Sum('score')
+    ):
+        totals[row.pop('author_id')].update(row)
+    for row in Comment.objects.filter(
+        hidden_at__isnull=True
+    ).order_by().values('author_id').annotate(
+        comments_count=Count('id')
+    ):
+        totals[row.pop('author_id')].update(row)
+    genres = list(
+        Review.objects.filter(
+            title__genre__isnull=False, hidden_at__isnull=True
+        )
+        .order_by()
+        .values_list('author_id', 'title__genre')
+        .annotate(reviews_count=Count('id'))
+    )
+    UserGenreStats.objects.all().delete()
+    UserStats.objects.all().delete()
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id, **fields)
+            for user_id, fields in totals.items()
+        ),
+        batch_size=2000,
+    )
+    UserGenreStats.objects.bulk_create(
+        (
+            UserGenreStats(
+                user_id=user_id, genre_id=genre_id, reviews_count=count
+            )
+            for user_id, genre_id, count in genres
+        ),
+        batch_size=2000,
+    )
+    return len(totals)
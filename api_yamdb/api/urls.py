@@ -1,9 +1,11 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from .views import (CategoryViewSet, CommentViewSet, EmailRegistrationView,
-                    GenreViewSet, RetrieveAccessToken, ReviewViewSet,
-                    TitleViewSet, UserViewSet)
+from .views import (ActivityView, AutocompleteView, BatchView, CategoryViewSet,
+                    ChangesView, CommentViewSet, EmailRegistrationView,
+                    GenreViewSet, JobViewSet, ModerationView,
+                    RetrieveAccessToken, ReviewViewSet, TitleViewSet,
+                    UserViewSet)
 
 v1_router = SimpleRouter()
 v1_router.register('users', UserViewSet, basename='auth-users')
@@ -18,11 +20,19 @@ v1_router.register(
 v1_router.register('genres', GenreViewSet, basename='genres')
 v1_router.register('categories', CategoryViewSet, basename='categories')
 v1_router.register('titles', TitleViewSet, basename='titles')
+v1_router.register('jobs', JobViewSet, basename='jobs')
 
 
 urlpatterns = [
     path('', include(v1_router.urls)),
     path('auth/signup/', EmailRegistrationView.as_view()),
+    path('activity/', ActivityView.as_view(), name='activity'),
+    path(
+        'autocomplete/', AutocompleteView.as_view(), name='autocomplete'
+    ),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('changes/', ChangesView.as_view(), name='changes'),
+    path('moderation/', ModerationView.as_view(), name='moderation'),
     path(
         'auth/token/', RetrieveAccessToken.as_view(), name='token_obtain_pair'
     ),
@@ -1,6 +1,8 @@
 from rest_framework import serializers, status
 from rest_framework.exceptions import APIException
 
+from .reference import references
+
 
 class NotFoundValidationError(APIException):
     status_code = status.HTTP_404_NOT_FOUND
@@ -12,3 +14,19 @@ def username_restriction(username):
             'Not allowed to use "me" as username'
         )
     return username
+
+
+class UniqueSlugValidator:
+    """
+    ``UniqueValidator`` for the slug of a genre or category, answered by
+    ``api.reference`` without a query; the unique index has the last word.
+    """
+
+    message = 'This field must be unique.'
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, value):
+        if value in references.get(self.model).ids:
+            raise serializers.ValidationError(self.message, code='unique')
@@ -1,37 +1,59 @@
 import secrets
 import string
 
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, FloatField, OuterRef, Subquery
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, Job, Review,
+                            SimilarTitle, Title, User)
 
+from . import activity, batch, changes, cursors, jobs, moderation, stats
+from .autocomplete import autocomplete, search_limit
+from .caching import SurrogateKeyMixin, title_keys
+from .deletion import BackgroundDeleteMixin, accepted
+from .fieldsets import SparseQuerysetMixin
 from .filters import TitlesFilter
+from .ingest import WriteBehindMixin
+from .pagination import CACHED, ESTIMATED, LimitOffsetPagination
 from .permissions import (IsAdmin, IsAdminOrReadOnly,
-                          IsAuthorModeratorAdminOrReadOnly, IsSelf)
-from .serializers import (CategorySerializer, CommentsSerializer,
-                          EmailRegistration, GenreSerializer,
-                          LoginUserSerializer, ReviewSerializer,
-                          TitleReadSerializer, TitleSerializer,
-                          UserSelfSerializer, UserSerializer)
+                          IsAuthorModeratorAdminOrReadOnly, IsModeratorOrAdmin,
+                          IsSelf)
+from .previews import attach_comment_previews, comments_limit
+from .reference import references
+from .serializers import (ActivitySerializer, BatchSerializer,
+                          CategorySerializer, CommentsSerializer,
+                          EmailRegistration, GenreSerializer, JobSerializer,
+                          LoginUserSerializer, ModerationSerializer,
+                          ReviewSerializer, ReviewWithCommentsSerializer,
+                          SimilarTitleSerializer, TitleReadSerializer,
+                          TitleSerializer, UserSelfSerializer, UserSerializer,
+                          UserStatsSerializer)
 from .utilities import send_token_email
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(
+    BackgroundDeleteMixin, SparseQuerysetMixin, viewsets.ModelViewSet
+):
     permission_classes = (IsAdmin,)
-    queryset = User.objects.all()
+    queryset = User.objects.filter(deleted_at__isnull=True)
     serializer_class = UserSerializer
     lookup_field = 'username'
+    deletion_job = 'delete_user'
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
     pagination_class = LimitOffsetPagination
+    count_strategy = ESTIMATED
 
     @action(
         detail=False,
@@ -42,7 +64,10 @@ class UserViewSet(viewsets.ModelViewSet):
         if request.method == 'GET':
             instance = self.request.user
             serializer = self.get_serializer(instance)
-            return Response(serializer.data)
+            return Response({
+                **serializer.data,
+                'stats': UserStatsSerializer(stats.load(instance)).data,
+            })
         if request.method == 'PATCH':
             partial = True
             instance = self.request.user
@@ -57,6 +82,143 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         return None
 
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def stats(self, request, username=None):
+        """Review statistics, public like the reviews behind them."""
+        user = get_object_or_404(
+            User.objects.only('pk'), username=username, deleted_at__isnull=True
+        )
+        return Response(UserStatsSerializer(stats.load(user)).data)
+
+
+class AutocompleteView(APIView):
+    """Type-ahead over the names of titles, genres and categories."""
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        return Response({'results': autocomplete.search(
+            request.query_params.get('q', ''), search_limit(request)
+        )})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Progress of background jobs, such as deletions."""
+
+    permission_classes = (IsModeratorOrAdmin,)
+    queryset = Job.objects.order_by('-pk')
+    serializer_class = JobSerializer
+    pagination_class = LimitOffsetPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_admin or user.is_superuser:
+            return super().get_queryset()
+        # Moderators follow the jobs they asked for only.
+        return super().get_queryset().filter(user=user)
+
+
+class ModerationView(APIView):
+    """
+    Delete, hide or restore the reviews and comments of an author, under a
+    title or with a text in them, in the request or, above
+    ``MODERATION_SYNC_LIMIT`` rows, in a background job.
+    """
+
+    permission_classes = (IsModeratorOrAdmin,)
+
+    def post(self, request):
+        serializer = ModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        arguments = serializer.arguments()
+        reviews, comments = moderation.matching(**arguments)
+        total = reviews.count() + comments.count()
+        if total > settings.MODERATION_SYNC_LIMIT:
+            job = jobs.enqueue(
+                'moderate', arguments=arguments, user=request.user
+            )
+            return accepted(request, job)
+        return Response(moderation.change_now(
+            reviews, comments, arguments['action']
+        ))
+
+
+class ActivityView(APIView):
+    """
+    The newest reviews and comments across all titles, read from the
+    buffer of the process and followed with an opaque ``cursor``.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        try:
+            events, cursor = activity.feed.page(
+                request.query_params.get('cursor'),
+                activity.activity_limit(request),
+            )
+        except cursors.InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return Response({
+            'next': cursor and replace_query_param(
+                request.build_absolute_uri(), 'cursor', cursor
+            ),
+            'results': ActivitySerializer(
+                [data for _, data in events], many=True
+            ).data,
+        })
+
+
+class ChangesView(APIView):
+    """
+    Upserts and deletes of titles, genres, categories, reviews and comments
+    after ``cursor``, oldest first, for mirrors and offline clients.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        try:
+            results, cursor, more = changes.page(
+                request.query_params.get('cursor'),
+                changes.changes_limit(request),
+            )
+        except changes.ExpiredCursor:
+            return Response(
+                {'detail': 'Cursor expired, sync from the start.'},
+                status=status.HTTP_410_GONE,
+            )
+        except cursors.InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return Response({
+            'cursor': cursor,
+            'next': replace_query_param(
+                request.build_absolute_uri(), 'cursor', cursor
+            ) if more else None,
+            'results': results,
+        })
+
+
+class BatchView(APIView):
+    """
+    Several API calls in one round trip. Every sub-request checks its own
+    permissions with the credentials of the batch request.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses, cookies = batch.run(
+            request, serializer.validated_data['requests']
+        )
+        response = Response(
+            {'responses': responses}, status=status.HTTP_200_OK
+        )
+        response.cookies.update(cookies)
+        return response
+
 
 class EmailRegistrationView(APIView):
     permission_classes = (AllowAny,)
@@ -100,54 +262,179 @@ class RetrieveAccessToken(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    serializer_class = ReviewSerializer
+class NestedListMixin:
+    """
+    Nested listing filtered by the parent ids from the URL in one query.
+
+    The parent is looked up only when the page comes out empty, to tell an
+    empty listing from a missing parent.
+    """
+
+    def get_parent(self):
+        raise NotImplementedError
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page and not self.get_parent().exists():
+            raise NotFound
+        return page
+
+
+class ReviewViewSet(
+    NestedListMixin,
+    SparseQuerysetMixin,
+    SurrogateKeyMixin,
+    viewsets.ModelViewSet,
+):
+    replica_reads = True
     permission_classes = (
         IsAuthorModeratorAdminOrReadOnly,
         permissions.IsAuthenticatedOrReadOnly,
     )
     pagination_class = LimitOffsetPagination
+    count_strategy = CACHED
+    count_parent = 'title'
+
+    def includes_comments(self):
+        request = getattr(self, 'request', None)
+        return request is not None and 'comments' in (
+            request.query_params.get('include', '').split(',')
+        )
+
+    def wants_comments(self):
+        return self.includes_comments() and self.wants('comments')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.includes_comments():
+            return ReviewWithCommentsSerializer
+        return ReviewSerializer
+
+    def get_surrogate_collection(self):
+        return f'title-{self.kwargs.get("title_id")}-reviews'
+
+    def get_surrogate_keys(self, instance):
+        if self.wants_comments():
+            return {f'review-{instance.pk}', f'review-{instance.pk}-comments'}
+        return {f'review-{instance.pk}'}
+
+    def get_parent(self):
+        return Title.visible.filter(pk=self.kwargs.get('title_id'))
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page and self.wants_comments():
+            attach_comment_previews(page, comments_limit(self.request))
+        return page
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id'),
+            hidden_at__isnull=True,
+            title__deleted_at__isnull=True,
+        )
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        title_id = int(self.kwargs.get('title_id'))
+        # A title waiting for deletion still satisfies the foreign key.
+        if not self.get_parent().exists():
+            raise NotFound
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title_id=title_id)
+        except IntegrityError:
+            # The title was checked, so unique_review was violated.
+            raise ValidationError(
+                {'detail': ['Not allowed to create multiple reviews.']}
+            )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    WriteBehindMixin,
+    NestedListMixin,
+    SparseQuerysetMixin,
+    SurrogateKeyMixin,
+    viewsets.ModelViewSet,
+):
+    replica_reads = True
     serializer_class = CommentsSerializer
     permission_classes = (
         IsAuthorModeratorAdminOrReadOnly,
         permissions.IsAuthenticatedOrReadOnly,
     )
     pagination_class = LimitOffsetPagination
+    count_strategy = CACHED
+    count_parent = 'review'
+
+    def get_surrogate_collection(self):
+        return f'review-{self.kwargs.get("review_id")}-comments'
+
+    def get_surrogate_keys(self, instance):
+        return {f'comment-{instance.pk}'}
+
+    def get_parent(self):
+        return Review.objects.filter(
+            pk=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id'),
+            hidden_at__isnull=True,
+            title__deleted_at__isnull=True,
+        )
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id'),
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'),
+            hidden_at__isnull=True,
+            review__hidden_at__isnull=True,
+            review__title__deleted_at__isnull=True,
         )
-        return review.comments.all()
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id'),
-        )
-        serializer.save(author=self.request.user, review=review)
+        review_id = int(self.kwargs.get('review_id'))
+        # Django 2.2 cannot insert from a subquery, so the review is checked
+        # to belong to the title by its primary key beforehand.
+        if not self.get_parent().exists():
+            raise NotFound
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, review_id=review_id)
+        except IntegrityError:
+            # The review was deleted after the check.
+            raise NotFound
+
+
+class ReferenceMixin:
+    """
+    Genres or categories listed from ``api.reference`` unless searched,
+    created with the unique slug index as the final check.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(filters.SearchFilter.search_param):
+            return super().list(request, *args, **kwargs)
+        rows = references.get(self.queryset.model).instances()
+        page = self.paginate_queryset(rows)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'slug': ['This field must be unique.']})
 
 
 class GenreViewSet(
+    ReferenceMixin,
+    SparseQuerysetMixin,
+    SurrogateKeyMixin,
     viewsets.mixins.CreateModelMixin,
     viewsets.mixins.ListModelMixin,
     viewsets.mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
+    replica_reads = True
+    surrogate_collection = 'genres'
     serializer_class = GenreSerializer
     queryset = Genre.objects.all()
     lookup_field = 'slug'
@@ -157,27 +444,99 @@ class GenreViewSet(
     search_fields = ('name',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all()
+class TitleViewSet(
+    BackgroundDeleteMixin,
+    SparseQuerysetMixin,
+    SurrogateKeyMixin,
+    viewsets.ModelViewSet,
+):
+    replica_reads = True
+    surrogate_collection = 'titles'
+    deletion_job = 'delete_title'
+    queryset = Title.visible.all()
+    # A correlated subquery is computed for the page only, unlike a grouped
+    # join over every title.
+    sparse_annotations = {
+        'rating': Subquery(
+            Review.objects.filter(title=OuterRef('pk'), hidden_at__isnull=True)
+            .order_by()
+            .values('title')
+            .annotate(rating=Avg('score'))
+            .values('rating'),
+            output_field=FloatField(),
+        )
+    }
     pagination_class = LimitOffsetPagination
+    count_strategy = CACHED
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitlesFilter
 
+    def get_surrogate_keys(self, instance):
+        return title_keys(
+            instance,
+            category=self.wants('category'),
+            genres=self.wants('genre'),
+        )
+
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return TitleReadSerializer
         return TitleSerializer
 
+    def perform_create(self, serializer):
+        self.save_title(serializer)
+
+    def perform_update(self, serializer):
+        self.save_title(serializer)
+
+    @staticmethod
+    def save_title(serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            # Slugs resolved by api.reference just before their deletion.
+            raise ValidationError(
+                {'detail': ['Genre or category does not exist.']}
+            )
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Stored nearest neighbours, see ``api.similarity``."""
+        try:
+            title_id = int(pk)
+        except ValueError:
+            raise NotFound
+        # Hidden titles are dropped at the next refresh, and until then.
+        neighbours = list(
+            SimilarTitle.objects.filter(
+                title_id=title_id,
+                title__deleted_at__isnull=True,
+                similar__deleted_at__isnull=True,
+            )
+            .select_related('similar')
+            .order_by('rank')
+        )
+        if not neighbours and not Title.visible.filter(pk=title_id).exists():
+            raise NotFound
+        self.surrogate_keys.add(f'title-{title_id}-similar')
+        return Response(SimilarTitleSerializer(neighbours, many=True).data)
+
 
 class CategoryViewSet(
+    ReferenceMixin,
+    SparseQuerysetMixin,
+    SurrogateKeyMixin,
     viewsets.mixins.CreateModelMixin,
     viewsets.mixins.ListModelMixin,
     viewsets.mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
+    replica_reads = True
+    surrogate_collection = 'categories'
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
     lookup_field = 'slug'
@@ -1,7 +1,18 @@
+"""
+ASGI config for YaMDb project.
+
+Serves the read-only catalog endpoints from a wide thread pool behind an
+event loop, e.g. ``gunicorn api_yamdb.asgi:application -k
+uvicorn.workers.UvicornWorker``. Writes are expected to keep going to the
+WSGI workers (see ``infra/nginx/default.conf``).
+"""
+
 import os
 
-from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+
+from .handlers import ReadPathHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+application = ReadPathHandler(get_wsgi_application())
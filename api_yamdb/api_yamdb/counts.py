@@ -0,0 +1,62 @@
+"""
+Row counts of large tables without a full scan on every page: the planner's
+estimate of a whole table, and exact counts cached for a while.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connections
+
+
+def table_estimate(model, using='default'):
+    """
+    Rows in the table of ``model`` according to the statistics of the
+    planner, or None where there are none (never analysed, not PostgreSQL).
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+def query_estimate(queryset):
+    """
+    Rows ``queryset`` returns according to the plan of the planner, or
+    None where there is no such estimate (not PostgreSQL).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    # psycopg2 decodes the json column itself.
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_key(queryset, prefix='count'):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql} {params!r}'.encode()).hexdigest()
+    return f'{prefix}:{queryset.db}:{digest}'
+
+
+def cached_count(queryset, timeout, prefix='count'):
+    """``queryset.count()``, reused for ``timeout`` seconds."""
+    key = count_key(queryset, prefix)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
@@ -0,0 +1,62 @@
+"""
+PostgreSQL backend drawing its connections from a per-process pool.
+
+Enable with ``DB_ENGINE=api_yamdb.db.backends.postgresql_pool`` and tune it
+with the ``DB_POOL_*`` variables (see ``settings.DATABASES``). Keep
+``CONN_MAX_AGE`` at 0: Django then hands the connection back to the pool at
+the end of every request instead of closing it.
+"""
+import functools
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from ... import pool
+
+Database = base.Database
+
+
+def reset(connection):
+    status = connection.get_transaction_status()
+    if status in (extensions.TRANSACTION_STATUS_INTRANS,
+                  extensions.TRANSACTION_STATUS_INERROR):
+        connection.rollback()
+        status = connection.get_transaction_status()
+    return status == extensions.TRANSACTION_STATUS_IDLE
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        key = (
+            f'{self.alias}:{conn_params.get("database")}'
+            f'@{conn_params.get("host", "")}:{conn_params.get("port", "")}'
+        )
+        self.pool = pool.get_pool(key, lambda: pool.ConnectionPool(
+            functools.partial(Database.connect, **conn_params),
+            reset,
+            max_size=options.get('MAX_SIZE', 10),
+            max_lifetime=options.get('MAX_LIFETIME', 1800),
+            timeout=options.get('TIMEOUT', 5),
+            health_check_after=options.get('HEALTH_CHECK_AFTER', 10),
+        ))
+        try:
+            connection = self.pool.acquire()
+        except pool.PoolTimeoutError as error:
+            raise Database.OperationalError(str(error)) from error
+
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is None:
+            self.isolation_level = connection.isolation_level
+        else:
+            self.isolation_level = isolation_level
+            if connection.isolation_level != isolation_level:
+                connection.set_session(isolation_level=isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import choose_replica, read_alias
+
+PIN_COOKIE = 'db_primary_until'
+
+
+def is_pinned(request):
+    """Whether the client wrote recently and must read its own writes."""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """
+    Route safe requests of replica-enabled viewsets to a read replica.
+
+    A successful write pins the client to the primary for
+    ``DB_REPLICA_PIN_SECONDS`` through a cookie, so it reads its own writes
+    even while the replicas catch up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.set(None)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            pin_seconds = settings.DB_REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + pin_seconds),
+                max_age=pin_seconds,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and getattr(view_class, 'replica_reads', False)
+            and not is_pinned(request)
+        ):
+            read_alias.set(choose_replica())
@@ -0,0 +1,205 @@
+"""
+Per-process pool of DB-API connections.
+
+Pools are registered per process: a pool inherited through ``fork()`` is
+abandoned without closing its connections, because closing a socket shared
+with the parent would terminate the parent's database session too.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_pools = {}
+_orphans = []
+_registry_lock = threading.Lock()
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+def ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class ConnectionPool:
+    """
+    Bounded pool handing out at most ``max_size`` connections at a time.
+
+    Connections older than ``max_lifetime`` seconds are recycled, idle ones
+    are pinged on checkout when they sat unused for ``health_check_after``
+    seconds, and ``reset`` must return a connection to a reusable state (or
+    report False) when it is given back.
+    """
+
+    def __init__(self, connect, reset, max_size=10, max_lifetime=1800,
+                 timeout=5, health_check_after=10):
+        self.connect = connect
+        self.reset = reset
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.pid = os.getpid()
+        self.metrics = Counter()
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._idle = []
+        self._opened_at = {}
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            connection, idle_since = self._reserve(started + self.timeout)
+            if connection is None:
+                connection = self._open()
+                break
+            if self._usable(connection, idle_since):
+                break
+            self._discard(connection)
+        self._observe_wait(time.monotonic() - started)
+        return connection
+
+    def release(self, connection):
+        try:
+            reusable = (
+                not connection.closed
+                and not self._expired(connection)
+                and self.reset(connection)
+            )
+        except Exception:
+            reusable = False
+        if not reusable:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self):
+        """Close idle connections; checked out ones close on release."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                **self.metrics,
+                'size': self._size,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+                'wait_histogram_ms': dict(zip(
+                    [f'<={bucket}' for bucket in WAIT_BUCKETS_MS] + ['>'],
+                    self.wait_histogram,
+                )),
+            }
+
+    def _reserve(self, deadline):
+        with self._condition:
+            waited = False
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f'No database connection available in '
+                        f'{self.timeout}s (pool size {self.max_size})'
+                    )
+                if not waited:
+                    self.metrics['waits'] += 1
+                    waited = True
+                self._condition.wait(remaining)
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self._opened_at[id(connection)] = time.monotonic()
+        self.metrics['opened'] += 1
+        return connection
+
+    def _discard(self, connection):
+        self._opened_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self.metrics['closed'] += 1
+            self._condition.notify()
+
+    def _expired(self, connection):
+        opened_at = self._opened_at.get(id(connection), 0)
+        if time.monotonic() - opened_at < self.max_lifetime:
+            return False
+        self.metrics['recycled'] += 1
+        return True
+
+    def _usable(self, connection, idle_since):
+        if connection.closed or self._expired(connection):
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            ping(connection)
+        except Exception:
+            self.metrics['health_check_failures'] += 1
+            return False
+        return True
+
+    def _observe_wait(self, seconds):
+        milliseconds = seconds * 1000
+        with self._condition:
+            self.metrics['checkouts'] += 1
+            self.metrics['wait_ms_total'] += round(milliseconds, 3)
+            self.metrics['wait_ms_max'] = max(
+                self.metrics['wait_ms_max'], round(milliseconds, 3)
+            )
+            self.wait_histogram[
+                bisect.bisect_left(WAIT_BUCKETS_MS, milliseconds)
+            ] += 1
+
+
+def get_pool(key, factory):
+    """Return this process' pool for ``key``, creating it with ``factory``."""
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _orphans.append(pool)
+            _pools[key] = factory()
+        return _pools[key]
+
+
+def close_all():
+    with _registry_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    for pool in pools:
+        pool.close_all()
+
+
+def stats():
+    with _registry_lock:
+        pools = [
+            (key, pool) for key, pool in _pools.items()
+            if pool.pid == os.getpid()
+        ]
+    return {key: pool.stats() for key, pool in pools}
@@ -0,0 +1,77 @@
+"""
+Read-replica routing.
+
+``ReplicaMiddleware`` picks a replica for safe requests to viewsets that
+set ``replica_reads = True`` and ``ReplicaRouter`` sends the reads of that
+request there. Everything else, including all writes, uses ``default``.
+"""
+import contextvars
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+read_alias = contextvars.ContextVar('read_alias', default=None)
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+             OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+
+def replica_lag(alias):
+    """Replication delay of ``alias`` in seconds, None if unreachable."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0] or 0)
+    except Exception:
+        connection.close()
+        return None
+
+
+def is_healthy(alias):
+    """Whether ``alias`` is reachable and within the allowed lag."""
+    now = time.monotonic()
+    with _lag_lock:
+        checked_at, lag = _lag_cache.get(alias, (None, None))
+    if checked_at is None or (
+        now - checked_at >= settings.DB_REPLICA_LAG_CHECK_INTERVAL
+    ):
+        lag = replica_lag(alias)
+        with _lag_lock:
+            _lag_cache[alias] = (now, lag)
+    return lag is not None and lag <= settings.DB_REPLICA_MAX_LAG
+
+
+def choose_replica():
+    """A random healthy replica alias, or None to stay on the primary."""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
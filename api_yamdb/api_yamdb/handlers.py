@@ -0,0 +1,163 @@
+"""
+ASGI front end for the Django application.
+
+Django 2.2 has neither async views nor an async ORM, so the handler keeps
+socket I/O on the event loop and runs the regular middleware and DRF
+viewsets on thread pools: a wide one for the read-only catalog endpoints,
+where many requests can wait on the database at once, and a narrow one for
+everything else.
+
+The request body is read whole before the application runs, as WSGI reads
+it synchronously. The response is streamed: the pool thread hands every
+chunk to the event loop and waits until it is sent.
+"""
+import asyncio
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadPathHandler:
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+        self.read_paths = re.compile(settings.ASGI_READ_PATHS)
+        self.read_executor = ThreadPoolExecutor(
+            settings.ASGI_READ_THREADS, thread_name_prefix='asgi-read'
+        )
+        self.write_executor = ThreadPoolExecutor(
+            settings.ASGI_WRITE_THREADS, thread_name_prefix='asgi-write'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type {scope["type"]}')
+        body = await self.read_body(receive)
+        executor = (
+            self.read_executor if self.is_read(scope)
+            else self.write_executor
+        )
+        loop = asyncio.get_event_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        await loop.run_in_executor(
+            executor,
+            self.run_wsgi,
+            self.environ(scope, body),
+            send_from_thread,
+            scope['method'] == 'HEAD',
+        )
+
+    def is_read(self, scope):
+        return (
+            scope['method'] in SAFE_METHODS
+            and self.read_paths.match(scope['path']) is not None
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_executor.shutdown(wait=False)
+                self.write_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        return b''.join(body)
+
+    @staticmethod
+    def environ(scope, body):
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('ascii'),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('server'):
+            environ['SERVER_NAME'] = scope['server'][0]
+            environ['SERVER_PORT'] = str(scope['server'][1])
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+            environ['REMOTE_PORT'] = str(scope['client'][1])
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+                name = f'HTTP_{name}'
+            value = value.decode('latin-1')
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+    def run_wsgi(self, environ, send, head=False):
+        """
+        Run the WSGI application to completion on a pool thread, so the
+        request_finished signal (and connection cleanup) stays on it too.
+        ``send`` blocks until the event loop has sent each message, so a
+        slow client holds the thread rather than a buffered body.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        def start():
+            if not response.get('started'):
+                response['started'] = True
+                send({
+                    'type': 'http.response.start',
+                    'status': response['status'],
+                    'headers': response['headers'],
+                })
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                # Applications may call start_response up to the first chunk.
+                start()
+                if chunk and not head:
+                    send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            start()
+            send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
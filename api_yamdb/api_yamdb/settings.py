@@ -24,7 +24,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'django_extensions',
     'rest_framework',
     'django_filters',
     'rest_framework_simplejwt',
@@ -32,7 +31,14 @@ INSTALLED_APPS = [
     'reviews.apps.ReviewsConfig',
 ]
 
+# Development helpers (e.g. runscript for scripts/load_data.py), kept out of
+# the production import graph.
+if os.getenv('DJANGO_DEV_APPS', default='False') == 'True':
+    INSTALLED_APPS += ['django_extensions']
+
 MIDDLEWARE = [
+    'api_yamdb.startup.FirstRequestTimingMiddleware',
+    'api_yamdb.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,10 +46,21 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api_yamdb.db.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
 
+# Run in the gunicorn master after preloading the app, before forking.
+STARTUP_WARMERS = [
+    'api_yamdb.startup.warm_url_resolvers',
+    'api_yamdb.startup.warm_serializers',
+    'api_yamdb.startup.warm_content_types',
+    'api.autocomplete.warm',
+    'api.activity.warm',
+    'api.reference.warm',
+]
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
@@ -63,6 +80,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Read-only catalog endpoints served from the wide thread pool of the ASGI
+# handler (see api_yamdb/handlers.py). Every thread may hold a DB connection.
+ASGI_READ_PATHS = r'^/api/v1/(titles|genres|categories)/'
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', default=32))
+ASGI_WRITE_THREADS = int(os.getenv('ASGI_WRITE_THREADS', default=4))
+
 
 DATABASES = {
     'default': {
@@ -73,10 +96,47 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0)),
+        # Used by the api_yamdb.db.backends.postgresql_pool engine.
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'MAX_LIFETIME': int(
+                os.getenv('DB_POOL_MAX_LIFETIME', default=1800)
+            ),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=5)),
+            'HEALTH_CHECK_AFTER': float(
+                os.getenv('DB_POOL_HEALTH_CHECK_AFTER', default=10)
+            ),
+        },
     }
 }
 
+# Read replicas: comma-separated host[:port] list for PostgreSQL, database
+# files for SQLite. Safe requests of catalog viewsets are routed to them.
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(',')), start=1
+):
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if 'sqlite' in replica['ENGINE']:
+        replica['NAME'] = location.strip()
+    else:
+        host, _, port = location.strip().partition(':')
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    DATABASES[f'replica{number}'] = replica
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['api_yamdb.db.routers.ReplicaRouter']
+
+# Reads stay on the primary this long after a client's write.
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', default=5))
+# Replicas lagging more than this many seconds are skipped.
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', default=5))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(
+    os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', default=1)
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -136,3 +196,159 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=10),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=20),
 }
+
+# Anonymous catalog GETs are cached by nginx for CACHE_EDGE_TTL seconds and
+# purged by surrogate key when the objects behind them change.
+CACHE_EDGE_TTL = int(os.getenv('CACHE_EDGE_TTL', default=60))
+CACHE_PURGE_URL = os.getenv('CACHE_PURGE_URL', default='')
+CACHE_PURGE_BACKEND = os.getenv(
+    'CACHE_PURGE_BACKEND', default='api.purge.NginxBackend'
+) if CACHE_PURGE_URL else ''
+CACHE_PURGE_BATCH_WINDOW = float(
+    os.getenv('CACHE_PURGE_BATCH_WINDOW', default=0.5)
+)
+CACHE_PURGE_MAX_KEYS = int(os.getenv('CACHE_PURGE_MAX_KEYS', default=100))
+
+# Catalog snapshots nginx serves without Django, see api.snapshots. Links
+# in them point to SNAPSHOT_BASE_URL.
+SNAPSHOT_ROOT = os.getenv(
+    'SNAPSHOT_ROOT', default=os.path.join(MEDIA_ROOT, 'snapshots')
+)
+SNAPSHOT_BASE_URL = os.getenv('SNAPSHOT_BASE_URL', default='http://localhost')
+
+# Sub-requests per /api/v1/batch/ call, and threads per process running
+# their reads concurrently.
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', default=20))
+BATCH_THREADS = int(os.getenv('BATCH_THREADS', default=4))
+
+# Genres and categories are cached in every process, which checks their
+# version every REFERENCE_CHECK_INTERVAL seconds.
+REFERENCE_CHECK_INTERVAL = float(
+    os.getenv('REFERENCE_CHECK_INTERVAL', default=1)
+)
+
+# The autocomplete index indexes the first AUTOCOMPLETE_MAX_WORDS words of
+# every name. Workers check its version every AUTOCOMPLETE_CHECK_INTERVAL
+# seconds and apply the changed names over it, rebuilding it past
+# AUTOCOMPLETE_DELTA_LIMIT changes; review counts are refreshed by a rebuild
+# every AUTOCOMPLETE_MAX_AGE seconds.
+AUTOCOMPLETE_MAX_WORDS = int(os.getenv('AUTOCOMPLETE_MAX_WORDS', default=5))
+AUTOCOMPLETE_CHECK_INTERVAL = float(
+    os.getenv('AUTOCOMPLETE_CHECK_INTERVAL', default=1)
+)
+AUTOCOMPLETE_DELTA_LIMIT = int(
+    os.getenv('AUTOCOMPLETE_DELTA_LIMIT', default=1000)
+)
+AUTOCOMPLETE_MAX_AGE = float(os.getenv('AUTOCOMPLETE_MAX_AGE', default=3600))
+
+# Neighbours stored per title by `manage.py similar_titles`.
+SIMILAR_TITLES_K = int(os.getenv('SIMILAR_TITLES_K', default=10))
+
+# Every process buffers the ACTIVITY_BUFFER_SIZE newest reviews and comments
+# for /activity/, with texts cut to ACTIVITY_TEXT_LENGTH characters, and
+# picks up the writes of other processes every ACTIVITY_SYNC_INTERVAL seconds.
+ACTIVITY_BUFFER_SIZE = int(os.getenv('ACTIVITY_BUFFER_SIZE', default=1000))
+ACTIVITY_TEXT_LENGTH = int(os.getenv('ACTIVITY_TEXT_LENGTH', default=200))
+ACTIVITY_SYNC_INTERVAL = float(
+    os.getenv('ACTIVITY_SYNC_INTERVAL', default=1)
+)
+
+# /changes/ holds back changes younger than CHANGES_SETTLE_TIME seconds, the
+# longest a write transaction may take to commit. Tombstones of deletes are
+# pruned after CHANGES_TOMBSTONE_DAYS by `manage.py prune_tombstones`.
+CHANGES_SETTLE_TIME = float(os.getenv('CHANGES_SETTLE_TIME', default=5))
+CHANGES_TOMBSTONE_DAYS = int(os.getenv('CHANGES_TOMBSTONE_DAYS', default=30))
+
+# With BACKGROUND_DELETES, DELETE of a title or user hides it and leaves the
+# reviews and comments behind it to `manage.py run_jobs`, DELETION_CHUNK_SIZE
+# rows per transaction. The worker, which also runs bulk moderations, polls
+# every JOBS_POLL_INTERVAL seconds and takes over jobs whose worker has been
+# silent for JOBS_STALE_AFTER seconds.
+BACKGROUND_DELETES = (
+    os.getenv('BACKGROUND_DELETES', default='False') == 'True'
+)
+DELETION_CHUNK_SIZE = int(os.getenv('DELETION_CHUNK_SIZE', default=1000))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', default=1))
+JOBS_STALE_AFTER = float(os.getenv('JOBS_STALE_AFTER', default=300))
+
+# /api/v1/moderation/ deletes, hides or restores up to MODERATION_SYNC_LIMIT
+# reviews and comments in the request and leaves more to `manage.py run_jobs`.
+MODERATION_SYNC_LIMIT = int(
+    os.getenv('MODERATION_SYNC_LIMIT', default=1000)
+)
+
+# With COMMENT_WRITE_BEHIND comment POSTs are queued in the SQLite file
+# COMMENT_INGEST_PATH, local to the host, and answered with 202. `manage.py
+# flush_comments` inserts them COMMENT_INGEST_BATCH_SIZE per transaction and
+# polls an empty queue every COMMENT_INGEST_INTERVAL seconds.
+COMMENT_WRITE_BEHIND = (
+    os.getenv('COMMENT_WRITE_BEHIND', default='False') == 'True'
+)
+COMMENT_INGEST_PATH = os.getenv(
+    'COMMENT_INGEST_PATH',
+    default=os.path.join(BASE_DIR, 'ingest', 'comments.sqlite3'),
+)
+COMMENT_INGEST_BATCH_SIZE = int(
+    os.getenv('COMMENT_INGEST_BATCH_SIZE', default=500)
+)
+COMMENT_INGEST_INTERVAL = float(
+    os.getenv('COMMENT_INGEST_INTERVAL', default=0.2)
+)
+
+# Default count strategy of limit/offset pages, see api.pagination: exact,
+# cached (for PAGINATION_COUNT_CACHE_TTL seconds, the counts of reviews and
+# comments under one parent for PAGINATION_NESTED_COUNT_CACHE_TTL), estimated
+# (above PAGINATION_EXACT_COUNT_LIMIT rows) or none.
+PAGINATION_COUNT_STRATEGY = os.getenv(
+    'PAGINATION_COUNT_STRATEGY', default='exact'
+)
+PAGINATION_COUNT_CACHE_TTL = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TTL', default=300)
+)
+PAGINATION_NESTED_COUNT_CACHE_TTL = int(
+    os.getenv('PAGINATION_NESTED_COUNT_CACHE_TTL', default=10)
+)
+PAGINATION_EXACT_COUNT_LIMIT = int(
+    os.getenv('PAGINATION_EXACT_COUNT_LIMIT', default=1000)
+)
+
+# Admin changelists trust the planner's row estimate of tables larger than
+# ADMIN_EXACT_COUNT_LIMIT rows and cache other counts for
+# ADMIN_COUNT_CACHE_TTL seconds; texts are cut to ADMIN_TEXT_LENGTH.
+ADMIN_EXACT_COUNT_LIMIT = int(
+    os.getenv('ADMIN_EXACT_COUNT_LIMIT', default=10000)
+)
+ADMIN_COUNT_CACHE_TTL = int(os.getenv('ADMIN_COUNT_CACHE_TTL', default=60))
+ADMIN_TEXT_LENGTH = int(os.getenv('ADMIN_TEXT_LENGTH', default=80))
+
+# Genres listed in the statistics of a user.
+STATS_TOP_GENRES = int(os.getenv('STATS_TOP_GENRES', default=3))
+
+# Brotli (when installed) or gzip for responses of at least
+# COMPRESSION_MIN_SIZE bytes; compressed bodies are cached per process.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', default=6))
+COMPRESSION_BROTLI_QUALITY = int(
+    os.getenv('COMPRESSION_BROTLI_QUALITY', default=5)
+)
+COMPRESSION_CACHE_BYTES = int(
+    os.getenv('COMPRESSION_CACHE_BYTES', default=16 * 1024 * 1024)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api_yamdb': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', default='INFO'),
+        },
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', default='INFO'),
+        },
+    },
+}
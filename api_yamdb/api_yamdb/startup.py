@@ -0,0 +1,117 @@
+"""
+Warm-up of the preloaded application before gunicorn forks its workers.
+
+Whatever is built here is inherited by the workers copy-on-write, so their
+first requests do not pay for it. Database connections opened while warming
+are closed again before the fork.
+"""
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+from .db import pool
+
+logger = logging.getLogger(__name__)
+
+
+def iter_views(patterns=None):
+    """Yield ``(view class, actions)`` of every class-based view routed."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'cls', None)
+            if view_class is not None:
+                actions = getattr(pattern.callback, 'actions', None) or {}
+                yield view_class, set(actions.values()) or {None}
+
+
+def warm_url_resolvers():
+    resolver = get_resolver()
+    return len(resolver.reverse_dict)
+
+
+def warm_serializers():
+    """Build the field maps of every serializer a routed view can use."""
+    built = 0
+    for view_class, actions in iter_views():
+        if not hasattr(view_class, 'get_serializer_class'):
+            continue
+        for action in actions:
+            view = view_class(action=action, format_kwarg=None, kwargs={})
+            try:
+                serializer_class = view.get_serializer_class()
+            except AssertionError:
+                continue
+            built += len(serializer_class(context={}).fields)
+    return built
+
+
+def warm_content_types():
+    from django.contrib.contenttypes.models import ContentType
+
+    return len(ContentType.objects.get_for_models(*apps.get_models()))
+
+
+def close_connections():
+    """Drop the connections of this process before it forks."""
+    if apps.ready:
+        connections.close_all()
+    pool.close_all()
+
+
+def warm(app_load_seconds=None):
+    """Run ``settings.STARTUP_WARMERS`` and log a timing breakdown."""
+    timings = {}
+    if app_load_seconds is not None:
+        timings['app import and setup'] = app_load_seconds
+    for path in settings.STARTUP_WARMERS:
+        started = time.perf_counter()
+        try:
+            import_string(path)()
+        except Exception:
+            logger.exception('Startup warmer %s failed', path)
+        timings[path.rsplit('.', 1)[-1]] = time.perf_counter() - started
+    close_connections()
+    logger.info(
+        'Startup in pid %s: %s; total %.1f ms',
+        os.getpid(),
+        ', '.join(
+            f'{name} {seconds * 1000:.1f} ms'
+            for name, seconds in timings.items()
+        ),
+        sum(timings.values()) * 1000,
+    )
+    return timings
+
+
+class FirstRequestTimingMiddleware:
+    """Log how long the first request of every worker process takes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pid = None
+
+    def __call__(self, request):
+        if self.pid == os.getpid():
+            return self.get_response(request)
+        self.pid = os.getpid()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        logger.info(
+            'First request in pid %s: %s %s -> %s in %.1f ms',
+            self.pid,
+            request.method,
+            request.path,
+            response.status_code,
+            (time.perf_counter() - started) * 1000,
+        )
+        return response
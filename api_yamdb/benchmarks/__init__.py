@@ -0,0 +1,7 @@
+"""
+Local load-testing harness for the YaMDb API.
+
+Run from the ``api_yamdb`` directory::
+
+    python -m benchmarks.run --db sqlite --mix browse --duration 30
+"""
@@ -0,0 +1,107 @@
+"""
+Latency, queries and bytes of the admin pages over a seeded database: the
+changelists, searches and change forms of the reviews app, as a superuser
+through the test client.
+
+Example::
+
+    python -m benchmarks.admin --titles 10000 --output admin.json
+"""
+import argparse
+import json
+import time
+
+from . import run
+from .stats import PERCENTILES, percentile
+
+PAGES = (
+    '/admin/reviews/user/',
+    '/admin/reviews/user/?q=author1',
+    '/admin/reviews/title/',
+    '/admin/reviews/title/?q=1',
+    '/admin/reviews/title/{title}/change/',
+    '/admin/reviews/review/',
+    '/admin/reviews/review/?score__exact=10',
+    '/admin/reviews/review/?q=author1',
+    '/admin/reviews/review/{review}/change/',
+    '/admin/reviews/comment/',
+    '/admin/reviews/comment/?p=10',
+    '/admin/reviews/user/autocomplete/?term=author1',
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--no-seed', action='store_true')
+    parser.add_argument('--output', help='write JSON results to this file')
+    own = parser.parse_args(argv)
+    args = run.parse_args(
+        ['--no-seed'] if own.no_seed else ['--titles', str(own.titles)]
+    )
+    args.repeat, args.output = own.repeat, own.output
+    return args
+
+
+def admin_client():
+    from django.test import Client
+    from reviews.models import User
+
+    user, _ = User.objects.update_or_create(
+        username='bench-admin',
+        defaults={'email': 'bench-admin@bench.local', 'role': 'admin',
+                  'is_staff': True, 'is_superuser': True},
+    )
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def measure(client, path, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path)
+            samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} answered {response.status_code}')
+    samples.sort()
+    return {
+        'path': path,
+        'queries': len(queries),
+        'bytes': len(response.content),
+        **{
+            f'p{rank}_ms': round(percentile(samples, rank) * 1000, 2)
+            for rank in PERCENTILES
+        },
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run.configure_environment(args)
+    fixture = run.prepare_fixture(args)
+
+    client = admin_client()
+    title, review = fixture['titles'][0], fixture['reviews'][0][1]
+    results = []
+    for page in PAGES:
+        row = measure(
+            client, page.format(title=title, review=review), args.repeat
+        )
+        results.append(row)
+        print(f'{row["path"]:<48}{row["queries"]:>4} queries'
+              f'{row["bytes"]:>9} bytes{row["p50_ms"]:>9} ms p50'
+              f'{row["p95_ms"]:>9} ms p95')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Build time, memory and lookup latency of the autocomplete index over
+synthetic titles, without a database.
+
+Example::
+
+    python -m benchmarks.autocomplete --titles 1000000 --output ac.json
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from . import run
+from .stats import PERCENTILES, percentile
+
+WORDS = (
+    'stalker', 'solaris', 'mirror', 'night', 'road', 'picnic', 'shadow',
+    'river', 'winter', 'summer', 'garden', 'city', 'dream', 'star', 'war',
+    'сталкер', 'солярис', 'зеркало', 'ночь', 'дорога', 'пикник', 'обочина',
+    'тень', 'река', 'зима', 'лето', 'сад', 'город', 'сон', 'звезда', 'мир',
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--titles', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write JSON results to this file')
+    own = parser.parse_args(argv)
+    args = run.parse_args([])
+    args.titles, args.output = own.titles, own.output
+    args.lookups, args.seed = own.lookups, own.seed
+    return args
+
+
+def synthetic_rows(rng, titles):
+    for pk in range(1, titles + 1):
+        name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        yield 'title', pk, None, f'{name.title()} {pk}', rng.randint(0, 500)
+    for pk, word in enumerate(WORDS[:10], 1):
+        yield 'genre', pk, f'genre-{pk}', word.title(), rng.randint(0, 10 ** 5)
+
+
+def queries(rng, lookups):
+    """Prefixes of one to six letters, as typed keystroke by keystroke."""
+    for _ in range(lookups):
+        word = rng.choice(WORDS)
+        yield word[:rng.randint(1, min(6, len(word)))]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run.configure_environment(args)
+    import django
+    django.setup()
+
+    from api.autocomplete import PrefixIndex
+
+    rng = random.Random(args.seed)
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = PrefixIndex(synthetic_rows(rng, args.titles))
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    for prefix in queries(rng, args.lookups):
+        started = time.perf_counter()
+        index.search(prefix)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    results = {
+        'names': len(index),
+        'entries': len(index.items),
+        'build_s': round(build_seconds, 2),
+        'index_mib': round(index.nbytes / 2 ** 20, 1),
+        'build_peak_mib': round(peak / 2 ** 20, 1),
+    }
+    for rank in PERCENTILES:
+        results[f'p{rank}_ms'] = round(
+            percentile(latencies, rank) * 1000, 3
+        )
+    for name, value in results.items():
+        print(f'{name:<16}{value:>12}')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
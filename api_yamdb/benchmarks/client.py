@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class HttpClient:
+    """
+    Minimal asyncio HTTP/1.1 client with a pool of keep-alive connections.
+
+    Only what the benchmark needs: Content-Length and chunked bodies,
+    reconnecting whenever the server asks to close the connection.
+    """
+
+    def __init__(self, host, port, limit=100, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(limit)
+
+    async def request(self, method, path, body=None, headers=None):
+        payload = b''
+        request_headers = {
+            'Host': f'{self.host}:{self.port}',
+            'Accept': 'application/json',
+        }
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            request_headers['Content-Type'] = 'application/json'
+        request_headers['Content-Length'] = str(len(payload))
+        request_headers.update(headers or {})
+        head = ''.join(
+            f'{name}: {value}\r\n' for name, value in request_headers.items()
+        )
+        raw = f'{method} {path} HTTP/1.1\r\n{head}\r\n'.encode('latin-1')
+
+        async with self._slots:
+            reader, writer = await self._connect()
+            try:
+                writer.write(raw + payload)
+                response = await asyncio.wait_for(
+                    self._read_response(reader), self.timeout
+                )
+            except Exception:
+                writer.close()
+                raise
+            if response.headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return response
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _connect(self):
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by server')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked(reader)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            headers['connection'] = 'close'
+        return Response(status, headers, body)
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
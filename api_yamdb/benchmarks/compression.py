@@ -0,0 +1,119 @@
+"""
+CPU time against bytes saved for the response encodings: renders typical
+API pages from a seeded database and compresses each with gzip and brotli
+at several levels, and with a warm precompressed cache.
+
+Example::
+
+    python -m benchmarks.compression --output compression.json
+"""
+import argparse
+import json
+import time
+
+from . import run
+
+PAGES = (
+    '/api/v1/titles/?limit=10',
+    '/api/v1/titles/?limit=100',
+    '/api/v1/titles/?fields=id,name,rating&limit=100',
+    '/api/v1/titles/{title}/reviews/?limit=50',
+    '/api/v1/titles/{title}/reviews/?include=comments&limit=50',
+    '/api/v1/genres/',
+)
+SETTINGS = (
+    ('gzip', 1), ('gzip', 6), ('gzip', 9),
+    ('br', 1), ('br', 4), ('br', 5), ('br', 9), ('br', 11),
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--no-seed', action='store_true')
+    parser.add_argument('--output', help='write JSON results to this file')
+    own = parser.parse_args(argv)
+    args = run.parse_args(['--no-seed'] if own.no_seed else [])
+    args.repeat, args.output = own.repeat, own.output
+    return args
+
+
+def render_pages(fixture):
+    from django.test import Client
+
+    client = Client(HTTP_ACCEPT_ENCODING='identity')
+    title = fixture['titles'][0]
+    return {
+        path: client.get(path.format(title=title)).content for path in PAGES
+    }
+
+
+def measure(body, encoding, level, repeat):
+    from django.test import override_settings
+
+    from api_yamdb import compression
+
+    with override_settings(
+        COMPRESSION_GZIP_LEVEL=level, COMPRESSION_BROTLI_QUALITY=level
+    ):
+        started = time.process_time()
+        for _ in range(repeat):
+            compressed = compression.compress(body, encoding)
+        cpu = (time.process_time() - started) / repeat
+    return len(compressed), cpu
+
+
+def measure_cached(body, repeat):
+    """A hit in the precompressed cache at the configured level."""
+    from api_yamdb import compression
+
+    encoding = compression.ENCODINGS[0]
+    cache = compression.CompressedCache(max_bytes=len(body) * 2)
+    compressed = cache.compress(body, encoding)
+    started = time.process_time()
+    for _ in range(repeat):
+        cache.compress(body, encoding)
+    cpu = (time.process_time() - started) / repeat
+    return encoding, len(compressed), cpu
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run.configure_environment(args)
+    fixture = run.prepare_fixture(args)
+
+    from api_yamdb import compression
+
+    results = []
+    for path, body in render_pages(fixture).items():
+        rows = []
+        for encoding, level in SETTINGS:
+            if encoding not in compression.ENCODINGS:
+                continue
+            size, cpu = measure(body, encoding, level, args.repeat)
+            rows.append({
+                'encoding': f'{encoding}-{level}',
+                'bytes': size,
+                'ratio': round(size / len(body), 3),
+                'cpu_ms': round(cpu * 1000, 3),
+            })
+        encoding, size, cpu = measure_cached(body, args.repeat * 10)
+        rows.append({
+            'encoding': f'{encoding} cached',
+            'bytes': size,
+            'ratio': round(size / len(body), 3),
+            'cpu_ms': round(cpu * 1000, 3),
+        })
+        results.append({'path': path, 'identity_bytes': len(body),
+                        'encodings': rows})
+        print(f'{path} ({len(body)} bytes)')
+        for row in rows:
+            print(f'  {row["encoding"]:<14}{row["bytes"]:>9} bytes'
+                  f'{row["ratio"]:>8}{row["cpu_ms"]:>10} ms cpu')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
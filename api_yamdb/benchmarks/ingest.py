@@ -0,0 +1,125 @@
+"""
+Sustained comment ingestion, synchronous against write-behind: concurrent
+clients POST comments for the duration, then the queue is drained. Reports
+the POSTs answered per second and p95, and the comments committed to the
+database per second over the run and the drain.
+
+Example::
+
+    python -m benchmarks.ingest --concurrency 200 --output ingest.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import run
+from .scenarios import VirtualUser
+
+MODES = ('sync', 'write-behind')
+
+
+def drain(queue, timeout):
+    """Seconds until ``queue`` is empty, None past ``timeout``."""
+    started = time.monotonic()
+    while len(queue):
+        if time.monotonic() - started > timeout:
+            return None
+        time.sleep(0.1)
+    return round(time.monotonic() - started, 3)
+
+
+def measure(options, fixture, mode, directory):
+    from api import ingest
+    from reviews.models import Comment
+
+    path = os.path.join(directory, f'{mode}.sqlite3')
+    os.environ['COMMENT_WRITE_BEHIND'] = str(mode == 'write-behind')
+    os.environ['COMMENT_INGEST_PATH'] = path
+    args = run.parse_args([
+        '--mix', 'comments',
+        '--workers', str(options.workers),
+        '--concurrency', str(options.concurrency),
+        '--duration', str(options.duration),
+        # Every comment POSTed counts, none is left out as warm-up.
+        '--warmup', '0',
+        '--port', str(options.port),
+    ])
+    users = [
+        VirtualUser(index, fixture, random.Random(index), 0)
+        for index in range(options.concurrency)
+    ]
+    before = Comment.objects.count()
+    flusher = None
+    if mode == 'write-behind':
+        flusher = subprocess.Popen(
+            [sys.executable, 'manage.py', 'flush_comments'],
+            cwd=run.BASE_DIR, env=os.environ.copy(),
+        )
+    server = run.start_server(args)
+    try:
+        summary = asyncio.run(run.load(args, users))
+    finally:
+        run.stop_server(server)
+    drained = 0
+    if flusher is not None:
+        drained = drain(ingest.Queue(path), options.drain_timeout)
+        run.stop_server(flusher)
+    inserted = Comment.objects.count() - before
+    endpoint = summary['endpoints']['POST /reviews/{id}/comments/']
+    return {
+        'mode': mode,
+        'concurrency': options.concurrency,
+        'accepted_rps': endpoint['rps'],
+        'p95_ms': endpoint['p95_ms'],
+        'errors': endpoint['errors'],
+        'inserted': inserted,
+        'drain_s': drained,
+        'inserted_rps': (
+            None if drained is None
+            else round(inserted / (summary['elapsed_s'] + drained), 2)
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--drain-timeout', type=float, default=300)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output')
+    options, seed_argv = parser.parse_known_args(argv)
+    seed_args = run.parse_args(
+        [*seed_argv, '--concurrency', str(options.concurrency)]
+    )
+    run.configure_environment(seed_args)
+    fixture = run.prepare_fixture(seed_args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        rows = [
+            measure(options, fixture, mode, directory)
+            for mode in options.modes.split(',')
+        ]
+    print(f'{"mode":<14}{"accepted/s":>12}{"p95":>10}{"err":>6}'
+          f'{"inserted":>10}{"drain s":>9}{"inserted/s":>12}')
+    for row in rows:
+        print(f'{row["mode"]:<14}{row["accepted_rps"]:>12}'
+              f'{row["p95_ms"]:>10}{row["errors"]:>6}{row["inserted"]:>10}'
+              f'{str(row["drain_s"]):>9}{str(row["inserted_rps"]):>12}')
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump({'commit': run.git_commit(), 'results': rows},
+                      file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Seed a database, start the API under gunicorn and drive it with a weighted
+mix of scenarios from concurrent async clients.
+
+Examples::
+
+    python -m benchmarks.run --db sqlite --mix browse --output base.json
+    python -m benchmarks.run --db sqlite --compare base.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from .client import HttpClient
+from .scenarios import MIXES, VirtualUser, picker
+from .stats import Recorder, compare, merge_pool_stats
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', choices=('sqlite', 'postgres'),
+                        default='sqlite',
+                        help='postgres uses the DB_* variables from .env')
+    parser.add_argument('--sqlite-path',
+                        default=os.path.join(BASE_DIR, 'bench.sqlite3'))
+    parser.add_argument('--fixture',
+                        default=os.path.join(BASE_DIR, 'bench.fixture.json'),
+                        help='ids and credentials of the seeded data')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--app', default='api_yamdb.wsgi:application')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker-class', default='sync')
+    parser.add_argument('--gunicorn-arg', action='append', default=[],
+                        help='extra argument passed to gunicorn')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--external', action='store_true',
+                        help='do not start gunicorn, use a running server')
+    parser.add_argument('--no-seed', action='store_true')
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--reviews-per-title', type=int, default=10)
+    parser.add_argument('--comments-per-review', type=int, default=3)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='baseline JSON results')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed p95/rps regression, 0.1 = 10%%')
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    if args.db == 'sqlite':
+        os.environ['DB_ENGINE'] = 'django.db.backends.sqlite3'
+        os.environ['DB_NAME'] = args.sqlite_path
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    sys.path.insert(0, BASE_DIR)
+
+
+def prepare_fixture(args):
+    import django
+    django.setup()
+
+    from django.db import connections
+
+    from .seed import seed
+
+    if args.no_seed:
+        with open(args.fixture) as file:
+            return json.load(file)
+    started = time.perf_counter()
+    fixture = seed(
+        titles=args.titles,
+        reviews_per_title=args.reviews_per_title,
+        comments_per_review=args.comments_per_review,
+        bench_users=args.concurrency,
+    )
+    connections.close_all()
+    print(f'Seeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    with open(args.fixture, 'w') as file:
+        json.dump(fixture, file)
+    return fixture
+
+
+def start_server(args):
+    command = [
+        sys.executable, '-m', 'gunicorn.app.wsgiapp', args.app,
+        '--bind', f'{args.host}:{args.port}',
+        '--workers', str(args.workers),
+        '--worker-class', args.worker_class,
+        *args.gunicorn_arg,
+    ]
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=os.environ.copy())
+    url = f'http://{args.host}:{args.port}/api/v1/genres/'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not become ready in 60s')
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+async def drive(client, user, pick, recorder, deadline):
+    while time.monotonic() < deadline:
+        request = pick()(user)
+        headers = {}
+        if request.token:
+            headers['Authorization'] = f'Bearer {request.token}'
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                request.method, request.path, request.body, headers
+            )
+            status, size = response.status, len(response.body)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            status, size = 0, 0
+        recorder.add(
+            request.label,
+            time.perf_counter() - started,
+            status,
+            status in request.expected,
+            size,
+        )
+
+
+async def run_phase(client, args, users, seconds):
+    recorder = Recorder()
+    started = time.monotonic()
+    await asyncio.gather(*(
+        drive(client, user, picker(args.mix, user.rng), recorder,
+              started + seconds)
+        for user in users
+    ))
+    return recorder.summary(time.monotonic() - started)
+
+
+async def load(args, users):
+    client = HttpClient(args.host, args.port, limit=args.concurrency)
+    try:
+        if args.warmup:
+            await run_phase(client, args, users, args.warmup)
+        return await run_phase(client, args, users, args.duration)
+    finally:
+        await client.close()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BASE_DIR, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary):
+    print(f'{"endpoint":<32}{"req":>8}{"err":>6}{"rps":>10}'
+          f'{"p50":>9}{"p95":>9}{"p99":>9}{"bytes":>9}')
+    for label, item in summary['endpoints'].items():
+        print(f'{label:<32}{item["requests"]:>8}{item["errors"]:>6}'
+              f'{item["rps"]:>10}{item["p50_ms"]:>9}{item["p95_ms"]:>9}'
+              f'{item["p99_ms"]:>9}{item["mean_bytes"]:>9}')
+    print(f'total: {summary["requests"]} requests, {summary["rps"]} rps, '
+          f'{summary["errors"]} errors')
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    fixture = prepare_fixture(args)
+    run_id = int(time.time())
+    users = [
+        VirtualUser(index, fixture, random.Random(index), run_id)
+        for index in range(args.concurrency)
+    ]
+    pool_stats = tempfile.NamedTemporaryFile(suffix='.jsonl')
+    os.environ['DB_POOL_STATS_FILE'] = pool_stats.name
+    server = None if args.external else start_server(args)
+    try:
+        summary = asyncio.run(load(args, users))
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'config': vars(args),
+        },
+        'summary': summary,
+        'pool': merge_pool_stats([
+            json.loads(line) for line in pool_stats.read().splitlines()
+        ]),
+    }
+    pool_stats.close()
+    print_summary(summary)
+    if results['pool']:
+        print(f'db pool: {json.dumps(results["pool"])}')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), results, args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
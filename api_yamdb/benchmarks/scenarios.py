@@ -0,0 +1,217 @@
+import itertools
+from collections import namedtuple
+
+API = '/api/v1'
+
+Request = namedtuple(
+    'Request', ('label', 'method', 'path', 'body', 'token', 'expected')
+)
+Request.__new__.__defaults__ = (None, None, (200,))
+
+SIGNUP_COUNTER = itertools.count()
+
+
+class VirtualUser:
+    """
+    Per-connection state: which bench account it posts as and which
+    titles it has not reviewed yet.
+    """
+
+    def __init__(self, index, fixture, rng, run_id):
+        self.index = index
+        self.fixture = fixture
+        self.rng = rng
+        self.run_id = run_id
+        self.posted = 0
+
+    @property
+    def token(self):
+        tokens = self.fixture['tokens']
+        return tokens[self.index % len(tokens)]
+
+
+def title_list(user):
+    offset = user.rng.randrange(0, 50) * 10
+    return Request(
+        'GET /titles/', 'GET', f'{API}/titles/?limit=10&offset={offset}'
+    )
+
+
+def title_list_sparse(user):
+    offset = user.rng.randrange(0, 50) * 10
+    return Request(
+        'GET /titles/?fields',
+        'GET',
+        f'{API}/titles/?fields=id,name,rating&limit=10&offset={offset}',
+    )
+
+
+def title_detail(user):
+    title_id = user.rng.choice(user.fixture['titles'])
+    return Request('GET /titles/{id}/', 'GET', f'{API}/titles/{title_id}/')
+
+
+def title_filtered(user):
+    rng = user.rng
+    query = rng.choice((
+        f'genre={rng.choice(user.fixture["genres"])}',
+        f'category={rng.choice(user.fixture["categories"])}',
+        f'year={rng.randint(1950, 2022)}',
+        f'name=Title%20{rng.randint(1, 99)}',
+    ))
+    return Request(
+        'GET /titles/?filter', 'GET', f'{API}/titles/?{query}&limit=10'
+    )
+
+
+def title_name_search(user):
+    prefix = user.rng.choice(('T', 'Ti', 'Tit', 'Titl', 'Title'))
+    return Request(
+        'GET /titles/?name', 'GET', f'{API}/titles/?name={prefix}&limit=10'
+    )
+
+
+def autocomplete(user):
+    prefix = user.rng.choice(('T', 'Ti', 'Tit', 'Titl', 'Title'))
+    return Request(
+        'GET /autocomplete/', 'GET', f'{API}/autocomplete/?q={prefix}'
+    )
+
+
+def genre_list(user):
+    return Request('GET /genres/', 'GET', f'{API}/genres/')
+
+
+def category_list(user):
+    return Request('GET /categories/', 'GET', f'{API}/categories/')
+
+
+def review_list(user):
+    title_id = user.rng.choice(user.fixture['titles'])
+    return Request(
+        'GET /titles/{id}/reviews/',
+        'GET',
+        f'{API}/titles/{title_id}/reviews/?limit=10',
+    )
+
+
+def review_list_sparse(user):
+    title_id = user.rng.choice(user.fixture['titles'])
+    return Request(
+        'GET /titles/{id}/reviews/?fields',
+        'GET',
+        f'{API}/titles/{title_id}/reviews/?fields=id,score,author&limit=10',
+    )
+
+
+def comment_list(user):
+    title_id, review_id = user.rng.choice(user.fixture['reviews'])
+    return Request(
+        'GET /reviews/{id}/comments/',
+        'GET',
+        f'{API}/titles/{title_id}/reviews/{review_id}/comments/?limit=10',
+    )
+
+
+def review_create(user):
+    titles = user.fixture['titles']
+    title_id = titles[(user.index * 7919 + user.posted) % len(titles)]
+    user.posted += 1
+    return Request(
+        'POST /titles/{id}/reviews/',
+        'POST',
+        f'{API}/titles/{title_id}/reviews/',
+        {'text': 'Benchmark review', 'score': user.rng.randint(1, 10)},
+        user.token,
+        (201,),
+    )
+
+
+def comment_create(user):
+    title_id, review_id = user.rng.choice(user.fixture['reviews'])
+    return Request(
+        'POST /reviews/{id}/comments/',
+        'POST',
+        f'{API}/titles/{title_id}/reviews/{review_id}/comments/',
+        {'text': 'Benchmark comment'},
+        user.token,
+        (201, 202),
+    )
+
+
+def signup(user):
+    number = next(SIGNUP_COUNTER)
+    username = f'signup{user.run_id}x{number}'
+    return Request(
+        'POST /auth/signup/',
+        'POST',
+        f'{API}/auth/signup/',
+        {'username': username, 'email': f'{username}@bench.local'},
+    )
+
+
+def token(user):
+    usernames = user.fixture['token_users']
+    if not usernames:
+        return signup(user)
+    return Request(
+        'POST /auth/token/',
+        'POST',
+        f'{API}/auth/token/',
+        {
+            'username': user.rng.choice(usernames),
+            'confirmation_code': user.fixture['access_code'],
+        },
+    )
+
+
+BROWSE = (
+    (30, title_list),
+    (20, title_detail),
+    (15, title_filtered),
+    (15, review_list),
+    (10, comment_list),
+    (5, genre_list),
+    (5, category_list),
+)
+
+MIXES = {
+    'browse': BROWSE,
+    # Full and sparse listings side by side.
+    'sparse': (
+        (1, title_list),
+        (1, title_list_sparse),
+        (1, review_list),
+        (1, review_list_sparse),
+    ),
+    # Type-ahead through the title filter and through the prefix index.
+    'typeahead': (
+        (1, title_name_search),
+        (1, autocomplete),
+    ),
+    'mixed': BROWSE + (
+        (6, review_create),
+        (2, signup),
+        (1, token),
+    ),
+    'write': (
+        (70, review_create),
+        (20, signup),
+        (10, token),
+    ),
+    # Comment bursts, see benchmarks.ingest.
+    'comments': (
+        (1, comment_create),
+    ),
+}
+
+
+def picker(mix, rng):
+    """Return a callable drawing scenarios from ``mix`` by weight."""
+    weights, scenarios = zip(*MIXES[mix])
+    cumulative = list(itertools.accumulate(weights))
+
+    def pick():
+        return rng.choices(scenarios, cum_weights=cumulative)[0]
+
+    return pick
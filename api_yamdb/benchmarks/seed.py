@@ -0,0 +1,150 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+BENCH_ACCESS_CODE = 'bench'
+BATCH_SIZE = 2000
+
+
+def _bulk(model, objects):
+    # SQLite caps the number of query parameters, Django sizes its batches.
+    batch_size = None if connection.vendor == 'sqlite' else BATCH_SIZE
+    model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+def _reset_sequences(models):
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _access_code():
+    """
+    Hashed access code for the token flow, or None when the column
+    cannot hold a hash (``access_code`` is a short CharField and only
+    SQLite ignores its length).
+    """
+    code = make_password(BENCH_ACCESS_CODE)
+    max_length = User._meta.get_field('access_code').max_length
+    if connection.vendor != 'sqlite' and len(code) > max_length:
+        return None
+    return code
+
+
+def _seed_catalog(rng, titles):
+    categories = [
+        Category(id=i, name=f'Category {i}', slug=f'category-{i}')
+        for i in range(1, 11)
+    ]
+    genres = [
+        Genre(id=i, name=f'Genre {i}', slug=f'genre-{i}')
+        for i in range(1, 31)
+    ]
+    _bulk(Category, categories)
+    _bulk(Genre, genres)
+    _bulk(Title, [
+        Title(
+            id=i,
+            name=f'Title {i}',
+            year=rng.randint(1950, 2022),
+            description=f'Description of title {i}',
+            category_id=rng.randint(1, len(categories)),
+        )
+        for i in range(1, titles + 1)
+    ])
+    through = Title.genre.through
+    _bulk(through, [
+        through(title_id=title_id, genre_id=genre_id)
+        for title_id in range(1, titles + 1)
+        for genre_id in rng.sample(range(1, len(genres) + 1), 2)
+    ])
+    return [category.slug for category in categories], [
+        genre.slug for genre in genres
+    ]
+
+
+def _seed_users(authors, bench_users):
+    access_code = _access_code()
+    _bulk(User, [
+        User(id=i, username=f'author{i}', email=f'author{i}@bench.local')
+        for i in range(1, authors + 1)
+    ] + [
+        User(
+            id=authors + i,
+            username=f'bench{i}',
+            email=f'bench{i}@bench.local',
+            access_code=access_code,
+        )
+        for i in range(1, bench_users + 1)
+    ])
+    return access_code is not None
+
+
+def _seed_reviews(rng, titles, authors, reviews_per_title, comments):
+    reviews = []
+    review_comments = []
+    for title_id in range(1, titles + 1):
+        for author_id in rng.sample(range(1, authors + 1), reviews_per_title):
+            review_id = len(reviews) + 1
+            reviews.append(Review(
+                id=review_id,
+                title_id=title_id,
+                author_id=author_id,
+                text=f'Review {review_id} of title {title_id}',
+                score=rng.randint(1, 10),
+            ))
+            first_comment_id = len(review_comments) + 1
+            review_comments.extend(
+                Comment(
+                    id=first_comment_id + i,
+                    review_id=review_id,
+                    author_id=rng.randint(1, authors),
+                    text=f'Comment on review {review_id}',
+                )
+                for i in range(comments)
+            )
+    _bulk(Review, reviews)
+    _bulk(Comment, review_comments)
+    return [(review.title_id, review.id) for review in reviews]
+
+
+def seed(titles=1000, reviews_per_title=10, comments_per_review=3,
+         bench_users=200, random_seed=0):
+    """
+    Migrate the configured database and fill it with a synthetic catalog.
+
+    Returns the fixture the scenarios draw their ids and credentials from.
+    """
+    rng = random.Random(random_seed)
+    authors = max(reviews_per_title * 5, titles // 10)
+    call_command('migrate', verbosity=0, interactive=False)
+    for model in (Comment, Review, Title, Genre, Category, User):
+        model.objects.all().delete()
+
+    categories, genres = _seed_catalog(rng, titles)
+    token_flow = _seed_users(authors, bench_users)
+    reviews = _seed_reviews(
+        rng, titles, authors, reviews_per_title, comments_per_review
+    )
+    _reset_sequences([User, Category, Genre, Title, Review, Comment])
+
+    users = User.objects.filter(username__startswith='bench').order_by('id')
+    return {
+        'titles': list(range(1, titles + 1)),
+        'reviews': reviews,
+        'genres': genres,
+        'categories': categories,
+        'tokens': [
+            str(RefreshToken.for_user(user).access_token) for user in users
+        ],
+        'token_users': (
+            [user.username for user in users] if token_flow else []
+        ),
+        'access_code': BENCH_ACCESS_CODE,
+    }
@@ -0,0 +1,145 @@
+"""
+Compare WSGI (sync gunicorn workers) and ASGI (uvicorn workers running the
+read-path handler) on the read-only catalog mix: throughput, p95 latency and
+peak memory of the whole gunicorn process tree per concurrency level.
+
+Example::
+
+    python -m benchmarks.serving --levels 10,50,200 --output serving.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+
+from . import run
+from .scenarios import VirtualUser
+
+MODES = {
+    'wsgi': ('api_yamdb.wsgi:application', 'sync'),
+    'asgi': ('api_yamdb.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+
+
+def process_tree(root):
+    pids = [root]
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                parent = int(file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == root:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_kb(pid):
+    """Proportional set size of a process, RSS where PSS is unavailable."""
+    for path, key in ((f'/proc/{pid}/smaps_rollup', 'Pss:'),
+                      (f'/proc/{pid}/status', 'VmRSS:')):
+        try:
+            with open(path) as file:
+                for line in file:
+                    if line.startswith(key):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, root, interval=0.2):
+        super().__init__(daemon=True)
+        self.root = root
+        self.interval = interval
+        self.peak_kb = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            total = sum(memory_kb(pid) for pid in process_tree(self.root))
+            self.peak_kb = max(self.peak_kb, total)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return round(self.peak_kb / 1024, 1)
+
+
+def measure(options, fixture, mode, level):
+    app, worker_class = MODES[mode]
+    args = run.parse_args([
+        '--mix', 'browse',
+        '--app', app,
+        '--worker-class', worker_class,
+        '--workers', str(options.workers),
+        '--concurrency', str(level),
+        '--duration', str(options.duration),
+        '--warmup', str(options.warmup),
+        '--port', str(options.port),
+    ])
+    users = [
+        VirtualUser(index, fixture, random.Random(index), 0)
+        for index in range(level)
+    ]
+    server = run.start_server(args)
+    sampler = MemorySampler(server.pid)
+    sampler.start()
+    try:
+        summary = asyncio.run(run.load(args, users))
+    finally:
+        peak_mb = sampler.stop()
+        run.stop_server(server)
+    return {
+        'mode': mode,
+        'concurrency': level,
+        'rps': summary['rps'],
+        'errors': summary['errors'],
+        'p95_ms': max(
+            item['p95_ms'] for item in summary['endpoints'].values()
+        ),
+        'peak_memory_mb': peak_mb,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--levels', default='10,50,100,200')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output')
+    options, seed_argv = parser.parse_known_args(argv)
+    seed_args = run.parse_args(seed_argv)
+    run.configure_environment(seed_args)
+    fixture = run.prepare_fixture(seed_args)
+
+    rows = [
+        measure(options, fixture, mode, int(level))
+        for mode in options.modes.split(',')
+        for level in options.levels.split(',')
+    ]
+    print(f'{"mode":<6}{"conc":>6}{"rps":>10}{"p95":>10}{"err":>6}'
+          f'{"peak MB":>10}')
+    for row in rows:
+        print(f'{row["mode"]:<6}{row["concurrency"]:>6}{row["rps"]:>10}'
+              f'{row["p95_ms"]:>10}{row["errors"]:>6}'
+              f'{row["peak_memory_mb"]:>10}')
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump({'commit': run.git_commit(), 'results': rows},
+                      file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import math
+from collections import Counter, defaultdict
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples, rank):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    index = max(0, math.ceil(rank / 100 * len(samples)) - 1)
+    return samples[index]
+
+
+class Recorder:
+    """
+    Collects latencies (seconds), statuses and response body sizes per
+    endpoint label.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.sizes = Counter()
+
+    def add(self, label, latency, status, ok, size=0):
+        self.latencies[label].append(latency)
+        self.statuses[label][status] += 1
+        self.sizes[label] += size
+        if not ok:
+            self.errors[label] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for label, samples in sorted(self.latencies.items()):
+            samples.sort()
+            endpoints[label] = {
+                'requests': len(samples),
+                'errors': self.errors[label],
+                'statuses': {
+                    str(status): count
+                    for status, count in self.statuses[label].items()
+                },
+                'rps': round(len(samples) / elapsed, 2),
+                'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+                'mean_bytes': round(self.sizes[label] / len(samples)),
+                **{
+                    f'p{rank}_ms': round(percentile(samples, rank) * 1000, 3)
+                    for rank in PERCENTILES
+                },
+            }
+        total = sum(item['requests'] for item in endpoints.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'rps': round(total / elapsed, 2) if elapsed else 0,
+            'endpoints': endpoints,
+        }
+
+
+def compare(baseline, current, threshold):
+    """
+    Regressions of ``current`` against ``baseline`` results.
+
+    An endpoint regresses when its p95 latency grows, or its throughput
+    drops, by more than ``threshold`` (a fraction, 0.1 = 10%).
+    """
+    regressions = []
+    for label, before in baseline['summary']['endpoints'].items():
+        after = current['summary']['endpoints'].get(label)
+        if after is None:
+            continue
+        if after['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(
+                f'{label}: p95 {before["p95_ms"]}ms -> {after["p95_ms"]}ms'
+            )
+        if after['rps'] < before['rps'] * (1 - threshold):
+            regressions.append(
+                f'{label}: rps {before["rps"]} -> {after["rps"]}'
+            )
+    return regressions
+
+
+def merge_pool_stats(records):
+    """
+    Combine the connection pool metrics every gunicorn worker reports on
+    exit (see gunicorn.conf.py) into one set of counters.
+    """
+    merged = Counter()
+    histogram = Counter()
+    for record in records:
+        for pool in record['pools'].values():
+            for key, value in pool.items():
+                if key == 'wait_histogram_ms':
+                    histogram.update(value)
+                elif key in ('wait_ms_max', 'max_size'):
+                    merged[key] = max(merged[key], value)
+                else:
+                    merged[key] += value
+    if not merged:
+        return None
+    merged['workers'] = len(records)
+    if merged['checkouts']:
+        merged['wait_ms_mean'] = round(
+            merged['wait_ms_total'] / merged['checkouts'], 3
+        )
+    return {**merged, 'wait_histogram_ms': dict(histogram)}
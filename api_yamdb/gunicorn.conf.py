@@ -0,0 +1,37 @@
+"""
+Gunicorn settings and server hooks, loaded from the working directory by
+default.
+"""
+import json
+import os
+import time
+
+from api_yamdb import startup
+from api_yamdb.db import pool
+
+CONFIG_LOADED_AT = time.perf_counter()
+
+# Import and warm the application once in the master, then fork.
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+
+
+def when_ready(server):
+    if preload_app:
+        startup.warm(time.perf_counter() - CONFIG_LOADED_AT)
+
+
+def pre_fork(server, worker):
+    # Connections opened by the master must not be shared by workers.
+    startup.close_connections()
+
+
+def worker_exit(server, worker):
+    stats = pool.stats()
+    if not stats:
+        return
+    line = json.dumps({'pid': worker.pid, 'pools': stats})
+    server.log.info('db pool stats %s', line)
+    stats_file = os.getenv('DB_POOL_STATS_FILE')
+    if stats_file:
+        with open(stats_file, 'a') as file:
+            file.write(line + '\n')
@@ -1,16 +1,71 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
+
+from api_yamdb import counts
 
 from .models import Category, Comment, Genre, Review, Title, User
 
 EMPTY_VALUE = '-пусто-'
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    The planner's estimate for an unfiltered changelist of a large table,
+    an exact count cached for ``ADMIN_COUNT_CACHE_TTL`` seconds otherwise.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = counts.table_estimate(queryset.model, queryset.db)
+            if estimate is not None and (
+                estimate > settings.ADMIN_EXACT_COUNT_LIMIT
+            ):
+                return estimate
+        return counts.cached_count(queryset, settings.ADMIN_COUNT_CACHE_TTL)
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Changelists of tables with millions of rows: counted by
+    ``EstimatedCountPaginator`` without the extra unfiltered count, and
+    searched by primary key or by a case-sensitive prefix of the
+    ``search_fields``, which their indexes answer.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = EMPTY_VALUE
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        condition = Q()
+        for field in self.search_fields:
+            condition |= Q(**{f'{field.lstrip("^")}__startswith': term})
+        return queryset.filter(condition), False
+
+
+def short_text(obj):
+    return Truncator(obj.text).chars(settings.ADMIN_TEXT_LENGTH)
+
+
+short_text.short_description = 'Текст'
+
+
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'username', 'email', 'bio', 'role')
-    search_fields = ('username',)
+class UserAdmin(ScalableAdmin):
+    list_display = ('id', 'username', 'email', 'role')
+    search_fields = ('^username',)
     list_filter = ('role',)
-    empty_value_display = EMPTY_VALUE
 
 
 @admin.register(Category)
@@ -30,24 +85,27 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 @admin.register(Title)
-class TitleAdmin(admin.ModelAdmin):
-    list_display = ('id', 'category', 'name', 'year', 'description')
-    search_fields = ('name',)
-    list_filter = ('year', 'category', 'genre')
-    empty_value_display = EMPTY_VALUE
+class TitleAdmin(ScalableAdmin):
+    list_display = ('id', 'category', 'name', 'year')
+    list_select_related = ('category',)
+    search_fields = ('^name',)
+    list_filter = ('category', 'genre')
+    autocomplete_fields = ('category', 'genre')
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
-    list_display = ('id', 'text', 'author', 'score', 'pub_date', 'title')
-    search_fields = ('text',)
-    list_filter = ('author', 'score')
-    empty_value_display = EMPTY_VALUE
+class ReviewAdmin(ScalableAdmin):
+    list_display = ('id', short_text, 'author', 'score', 'pub_date', 'title')
+    list_select_related = ('author', 'title')
+    search_fields = ('^author__username',)
+    list_filter = ('score',)
+    autocomplete_fields = ('author', 'title')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('id', 'text', 'author', 'pub_date', 'review')
-    search_fields = ('text',)
-    list_filter = ('review', 'author')
-    empty_value_display = EMPTY_VALUE
+class CommentAdmin(ScalableAdmin):
+    list_display = ('id', short_text, 'author', 'pub_date', 'review_id')
+    list_select_related = ('author',)
+    search_fields = ('^author__username',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('review',)
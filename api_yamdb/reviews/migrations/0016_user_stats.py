@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_similar_titles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('reviews_count', models.IntegerField(default=0)),
+                ('score_sum', models.IntegerField(default=0)),
+                ('comments_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserGenreStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reviews_count', models.IntegerField(default=0)),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Genre')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Жанр пользователя',
+                'verbose_name_plural': 'Жанры пользователей',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usergenrestats',
+            constraint=models.UniqueConstraint(fields=('user', 'genre'), name='unique_user_genre_stats'),
+        ),
+    ]
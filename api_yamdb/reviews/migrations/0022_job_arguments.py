@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0021_unique_reference_slugs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='arguments',
+            field=models.TextField(blank=True),
+        ),
+    ]
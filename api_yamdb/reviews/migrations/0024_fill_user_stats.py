@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def fill_user_stats(apps, schema_editor):
+    # The signals keep the rows current from 0016 on, the rows of what was
+    # written before are computed here, as api.stats.rebuild does.
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    UserStats = apps.get_model('reviews', 'UserStats')
+    UserGenreStats = apps.get_model('reviews', 'UserGenreStats')
+    totals = defaultdict(dict)
+    for row in Review.objects.filter(
+        hidden_at__isnull=True
+    ).order_by().values('author_id').annotate(
+        reviews_count=Count('id'), score_sum=Sum('score')
+    ):
+        totals[row.pop('author_id')].update(row)
+    for row in Comment.objects.filter(
+        hidden_at__isnull=True
+    ).order_by().values('author_id').annotate(comments_count=Count('id')):
+        totals[row.pop('author_id')].update(row)
+    genres = list(
+        Review.objects.filter(
+            title__genre__isnull=False, hidden_at__isnull=True
+        )
+        .order_by()
+        .values_list('author_id', 'title__genre')
+        .annotate(reviews_count=Count('id'))
+    )
+    UserGenreStats.objects.all().delete()
+    UserStats.objects.all().delete()
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id, **fields)
+            for user_id, fields in totals.items()
+        ),
+        batch_size=2000,
+    )
+    UserGenreStats.objects.bulk_create(
+        (
+            UserGenreStats(
+                user_id=user_id, genre_id=genre_id, reviews_count=count
+            )
+            for user_id, genre_id, count in genres
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0023_moderation_hide_and_job_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
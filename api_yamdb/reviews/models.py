@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import F
 from django.utils.text import Truncator
 
 MAX_LENGTH_SHORT = 50
@@ -34,11 +35,21 @@ class User(AbstractUser):
     access_code = models.CharField(
         max_length=8, default=None, blank=True, null=True
     )
+    # Set when the user is hidden until a background job deletes it.
+    deleted_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         ordering = ('username',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            # Prefix search in the admin, LIKE 'x%' on PostgreSQL.
+            models.Index(
+                fields=['username'],
+                name='user_username_prefix_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
 
     @property
     def is_user(self):
@@ -55,12 +66,18 @@ class User(AbstractUser):
 
 class Category(models.Model):
     name = models.CharField('Category', max_length=MAX_LENGTH_SHORT)
-    slug = models.SlugField('Slug', max_length=MAX_LENGTH_SHORT)
+    slug = models.SlugField('Slug', max_length=MAX_LENGTH_SHORT, unique=True)
+    updated_at = models.DateTimeField('Date of change', auto_now=True)
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='category_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -68,17 +85,30 @@ class Category(models.Model):
 
 class Genre(models.Model):
     name = models.CharField('Genre', max_length=MAX_LENGTH_SHORT)
-    slug = models.SlugField('Slug', max_length=MAX_LENGTH_SHORT)
+    slug = models.SlugField('Slug', max_length=MAX_LENGTH_SHORT, unique=True)
+    updated_at = models.DateTimeField('Date of change', auto_now=True)
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Жанр'
         verbose_name_plural = 'Жанры'
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='genre_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class VisibleTitleManager(models.Manager):
+    """Titles that are not waiting for a background deletion."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Title(models.Model):
     name = models.CharField('Title', max_length=MAX_LENGTH_MED)
     year = models.PositiveSmallIntegerField('Year of release')
@@ -93,11 +123,29 @@ class Title(models.Model):
         related_name='titles_category',
     )
     genre = models.ManyToManyField(Genre, blank=True)
+    updated_at = models.DateTimeField('Date of change', auto_now=True)
+    # Set when the title is hidden until a background job deletes it.
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = models.Manager()
+    # What the API shows: titles not waiting for a background deletion.
+    visible = VisibleTitleManager()
 
     class Meta:
         ordering = ('year',)
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(
+                fields=['updated_at', 'id'], name='title_updated_idx'
+            ),
+            models.Index(
+                fields=['name'],
+                name='title_name_prefix_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -120,11 +168,25 @@ class Review(models.Model):
         verbose_name='Оценка'
     )
     pub_date = models.DateTimeField('Date of publishing', auto_now_add=True)
+    updated_at = models.DateTimeField('Date of change', auto_now=True)
+    # Set while the row is hidden by a moderator, who may restore it.
+    hidden_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date'], name='review_title_pub_date_idx'
+            ),
+            # The site-wide activity feed.
+            models.Index(fields=['-pub_date'], name='review_pub_date_idx'),
+            models.Index(
+                fields=['updated_at', 'id'], name='review_updated_idx'
+            ),
+        ]
+        # Also serves the author + title duplicate check.
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'], name='unique_review'
@@ -144,11 +206,208 @@ class Comment(models.Model):
         User, on_delete=models.CASCADE, related_name='comments_authors'
     )
     pub_date = models.DateTimeField('Date of publishing', auto_now_add=True)
+    updated_at = models.DateTimeField('Date of change', auto_now=True)
+    # Set while the row is hidden by a moderator, who may restore it.
+    hidden_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date'],
+                name='comment_review_pub_date_idx',
+            ),
+            models.Index(fields=['-pub_date'], name='comment_pub_date_idx'),
+            models.Index(
+                fields=['updated_at', 'id'], name='comment_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return Truncator(self.text).words(MAX_LEN_TEXT)
+
+
+class UserStats(models.Model):
+    """Review and comment totals of a user, kept current on every write."""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='stats'
+    )
+    reviews_count = models.IntegerField(default=0)
+    score_sum = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.reviews_count} / {self.comments_count}'
+
+    @property
+    def average_score(self):
+        if not self.reviews_count:
+            return None
+        return round(self.score_sum / self.reviews_count, 2)
+
+
+class UserGenreStats(models.Model):
+    """Number of reviews a user wrote on titles of a genre."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='genre_stats'
+    )
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, related_name='+'
+    )
+    reviews_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Жанр пользователя'
+        verbose_name_plural = 'Жанры пользователей'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'genre'], name='unique_user_genre_stats'
+            )
+        ]
+
+
+class SimilarTitle(models.Model):
+    """One of the nearest neighbours of a title by review scores."""
+
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='similar_titles'
+    )
+    similar = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ('title', 'rank')
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        # Also serves the neighbours of a title in rank order.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'rank'], name='unique_similar_rank'
+            )
+        ]
+
+
+class SimilarityState(models.Model):
+    """Review fingerprint of a title when its neighbours were stored."""
+
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE, primary_key=True, related_name='+'
+    )
+    fingerprint = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = 'Состояние похожих произведений'
+        verbose_name_plural = 'Состояния похожих произведений'
+
+
+class Tombstone(models.Model):
+    """A deleted title, genre, category, review or comment."""
+
+    kind = models.CharField(max_length=MAX_LENGTH_SHORT)
+    object_id = models.PositiveIntegerField()
+    # Genres and categories are addressed by slug.
+    slug = models.SlugField(max_length=MAX_LENGTH_SHORT, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Удалённый объект'
+        verbose_name_plural = 'Удалённые объекты'
+        indexes = [
+            models.Index(
+                fields=['deleted_at', 'id'], name='tombstone_deleted_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class Job(models.Model):
+    """A unit of background work run by `manage.py run_jobs`."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, PENDING),
+        (RUNNING, RUNNING),
+        (DONE, DONE),
+        (FAILED, FAILED),
+    ]
+
+    kind = models.CharField(max_length=MAX_LENGTH_SHORT)
+    # Who asked for the job, followed by them in /api/v1/jobs/.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+    )
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    # JSON arguments of jobs acting on more than one object.
+    arguments = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=14, choices=STATUS_CHOICES, default=PENDING
+    )
+    # Rows processed so far out of the total counted at the start.
+    done = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Doubles as the heartbeat of the worker running the job.
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.status}'
+
+
+class IndexVersionManager(models.Manager):
+    def current(self, name):
+        return self.filter(name=name).values_list(
+            'version', flat=True
+        ).first() or 0
+
+    def bump(self, name):
+        updated = self.filter(name=name).update(version=F('version') + 1)
+        if not updated:
+            self.get_or_create(name=name, defaults={'version': 1})
+
+
+class IndexVersion(models.Model):
+    """
+    Version of an index every worker keeps in memory, bumped when the data
+    behind it changes so the other workers know to rebuild theirs.
+    """
+
+    name = models.CharField(max_length=MAX_LENGTH_SHORT, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = IndexVersionManager()
+
+    class Meta:
+        verbose_name = 'Версия индекса'
+        verbose_name_plural = 'Версии индексов'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
@@ -1,9 +1,20 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """What one test cached must not answer the next."""
+    from api.reference import references
+    from django.core.cache import cache
+    cache.clear()
+    references.clear()
@@ -0,0 +1,158 @@
+import pytest
+from api import activity
+from api.deletion import hide
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Comment, IndexVersion, Review, Title, User
+
+ACTIVITY_URL = '/api/v1/activity/'
+
+
+@pytest.fixture
+def feed():
+    activity.feed.__init__()
+    yield activity.feed
+    activity.feed.__init__()
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='critic', email='critic@yamdb.fake')
+
+
+@pytest.fixture
+def events(author):
+    """Five events, oldest first."""
+    title = Title.objects.create(name='Сталкер', year=1979)
+    reader = User.objects.create(username='reader', email='r@yamdb.fake')
+    first = Review.objects.create(
+        title=title, author=author, text='Шедевр', score=10
+    )
+    Comment.objects.create(review=first, author=reader, text='Согласен')
+    second = Review.objects.create(
+        title=title, author=reader, text='Скучно', score=4
+    )
+    Comment.objects.create(review=second, author=author, text='Нет')
+    Comment.objects.create(review=first, author=author, text='Спасибо')
+    return title
+
+
+def get(url=ACTIVITY_URL, **params):
+    response = APIClient().get(url, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def texts(data):
+    return [event['text'] for event in data['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestActivity:
+
+    def test_newest_first(self, events, feed):
+        data = get()
+        assert texts(data) == [
+            'Спасибо', 'Нет', 'Скучно', 'Согласен', 'Шедевр'
+        ]
+        assert data['next'] is None
+        comment, review = data['results'][0], data['results'][2]
+        assert comment['type'] == 'comment'
+        assert comment['title_id'] == events.pk
+        assert comment['author'] == 'critic'
+        assert 'score' not in comment
+        assert review['type'] == 'review'
+        assert review['score'] == 4
+        assert 'review_id' not in review
+
+    @override_settings(ACTIVITY_SYNC_INTERVAL=3600)
+    def test_hot_window_without_queries(self, events, feed,
+                                        django_assert_num_queries):
+        activity.warm()
+        with django_assert_num_queries(0):
+            first = get(limit=2)
+            second = get(first['next'])
+        assert texts(first) + texts(second) == [
+            'Спасибо', 'Нет', 'Скучно', 'Согласен'
+        ]
+
+    @override_settings(ACTIVITY_BUFFER_SIZE=2, ACTIVITY_SYNC_INTERVAL=3600)
+    def test_cursor_reads_past_the_buffer(self, events, feed,
+                                          django_assert_num_queries):
+        activity.warm()
+        with django_assert_num_queries(0):
+            page = get(limit=2)
+        seen = texts(page)
+        while page['next']:
+            page = get(page['next'])
+            seen += texts(page)
+        assert seen == ['Спасибо', 'Нет', 'Скучно', 'Согласен', 'Шедевр']
+
+    @override_settings(ACTIVITY_SYNC_INTERVAL=3600)
+    def test_writes_reach_the_buffer(self, author, events, feed):
+        activity.warm()
+        client = APIClient()
+        client.force_authenticate(author)
+        review = Review.objects.get(text='Скучно')
+        response = client.post(
+            f'/api/v1/titles/{events.pk}/reviews/{review.pk}/comments/',
+            {'text': 'Новый'},
+        )
+        assert response.status_code == 201
+        assert get(limit=1)['results'] == [{
+            'type': 'comment',
+            'id': response.json()['id'],
+            'title_id': events.pk,
+            'review_id': review.pk,
+            'author': 'critic',
+            'text': 'Новый',
+            'pub_date': response.json()['pub_date'],
+        }]
+
+    @override_settings(ACTIVITY_SYNC_INTERVAL=3600)
+    def test_edits_and_deletes_patch_the_buffer(self, events, feed,
+                                                django_assert_num_queries):
+        activity.warm()
+        version = IndexVersion.objects.current('activity')
+        Comment.objects.get(text='Нет').delete()
+        review = Review.objects.get(text='Скучно')
+        review.text = 'Скучновато'
+        review.save()
+        assert IndexVersion.objects.current('activity') == version
+        with django_assert_num_queries(0):
+            data = get()
+        assert texts(data) == ['Спасибо', 'Скучновато', 'Согласен', 'Шедевр']
+
+    @override_settings(ACTIVITY_SYNC_INTERVAL=0)
+    def test_other_processes_sync_changes(self, events, feed):
+        other = activity.ActivityFeed()
+        other.backfill()
+        Comment.objects.get(text='Нет').delete()
+        Review.objects.filter(text='Скучно').update(
+            text='Скучновато', updated_at=timezone.now()
+        )
+        version = other.version
+        other.sync()
+        assert other.version == version
+        assert [data['text'] for _, data in other.events] == [
+            'Спасибо', 'Скучновато', 'Согласен', 'Шедевр'
+        ]
+
+    @override_settings(ACTIVITY_SYNC_INTERVAL=0)
+    def test_hidden_titles_and_users_are_left_out(self, author, events,
+                                                  feed):
+        activity.warm()
+        other = Title.objects.create(name='Солярис', year=1972)
+        Review.objects.create(
+            title=other, author=author, text='Космос', score=9
+        )
+        assert texts(get())[0] == 'Космос'
+        hide(other)
+        assert 'Космос' not in texts(get())
+        hide(User.objects.get(username='reader'))
+        assert texts(get()) == ['Спасибо', 'Шедевр']
+
+    def test_invalid_cursor(self, feed, db):
+        response = APIClient().get(ACTIVITY_URL, {'cursor': 'nonsense'})
+        assert response.status_code == 404
@@ -0,0 +1,108 @@
+import re
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from reviews.models import Comment, Review, Title, User
+
+
+@pytest.fixture
+def client(db):
+    cache.clear()
+    user = User.objects.create(
+        username='root', email='root@yamdb.fake', role='admin',
+        is_staff=True, is_superuser=True,
+    )
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def populate(count, start=0):
+    numbers = range(start, start + count)
+    User.objects.bulk_create(
+        User(username=f'critic{number}', email=f'critic{number}@yamdb.fake')
+        for number in numbers
+    )
+    title = Title.objects.create(name=f'Сталкер {start}', year=1979)
+    for author in User.objects.filter(
+        username__in=[f'critic{number}' for number in numbers]
+    ):
+        review = Review.objects.create(
+            title=title, author=author, text='Отзыв ' * 100, score=7
+        )
+        Comment.objects.create(review=review, author=author, text='Да')
+
+
+def queries(client, path):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(path)
+    assert response.status_code == 200
+    return [query['sql'] for query in captured]
+
+
+@pytest.mark.django_db
+class TestAdmin:
+
+    @pytest.mark.parametrize('model', ['user', 'title', 'review', 'comment'])
+    def test_changelist_queries_do_not_grow_with_rows(self, client, model):
+        populate(2)
+        path = f'/admin/reviews/{model}/'
+        few = len(queries(client, path))
+        cache.clear()
+        populate(30, start=2)
+        assert len(queries(client, path)) == few
+
+    def test_titles_waiting_for_deletion_are_listed(self, client):
+        populate(1)
+        Title.objects.update(deleted_at=timezone.now())
+        found = client.get('/admin/reviews/title/')
+        assert found.context['cl'].result_count == 1
+        title = Title.objects.get()
+        assert client.get(
+            f'/admin/reviews/title/{title.pk}/change/'
+        ).status_code == 200
+
+    def test_texts_are_truncated(self, client, settings):
+        settings.ADMIN_TEXT_LENGTH = 20
+        populate(1)
+        content = client.get('/admin/reviews/review/').content.decode()
+        assert 'Отзыв Отзыв Отзыв О…' in content
+        assert 'Отзыв ' * 10 not in content
+
+    def test_search_by_id_and_username_prefix(self, client):
+        populate(12)
+        critic = User.objects.get(username='critic11')
+        found = client.get(f'/admin/reviews/user/?q={critic.pk}')
+        assert found.context['cl'].result_count == 1
+        found = client.get('/admin/reviews/user/?q=critic1')
+        assert found.context['cl'].result_count == 3
+        # A prefix, not a substring.
+        found = client.get('/admin/reviews/user/?q=ritic')
+        assert found.context['cl'].result_count == 0
+        found = client.get('/admin/reviews/review/?q=critic1')
+        assert found.context['cl'].result_count == 3
+
+    def test_counts_are_cached(self, client):
+        populate(3)
+        first = queries(client, '/admin/reviews/review/')
+        assert sum('COUNT(' in sql for sql in first) == 1
+        second = queries(client, '/admin/reviews/review/')
+        assert not any('COUNT(' in sql for sql in second)
+
+    def test_change_forms_do_not_list_related_rows(self, client):
+        populate(30)
+        review = Review.objects.first()
+        content = client.get(
+            f'/admin/reviews/review/{review.pk}/change/'
+        ).content.decode()
+        # Only the selected author and title, the rest comes by autocomplete.
+        assert len(re.findall(r'<option value="\d', content)) == 2
+        comment = Comment.objects.first()
+        content = client.get(
+            f'/admin/reviews/comment/{comment.pk}/change/'
+        ).content.decode()
+        assert len(re.findall(r'<option value="\d', content)) == 1
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+
+from api_yamdb.handlers import ReadPathHandler
+
+
+def application(environ, start_response):
+    """Echoes the request and the pool thread it ran on."""
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    body = environ['wsgi.input'].read()
+    return [
+        threading.current_thread().name.encode(),
+        b'|' + environ['REQUEST_METHOD'].encode(),
+        b'|' + environ.get('CONTENT_LENGTH', '').encode(),
+        b'|' + body,
+    ]
+
+
+def serve(handler, scope, messages):
+    """The messages ``handler`` sends for ``scope`` given ``messages``."""
+    received = list(messages)
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(handler(scope, receive, send))
+    return sent
+
+
+def http(method, path, headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'headers': list(headers),
+    }
+
+
+def request(handler, method, path, body=b'', headers=()):
+    return serve(
+        handler,
+        http(method, path, headers),
+        [{'type': 'http.request', 'body': body}],
+    )
+
+
+def body(sent):
+    return b''.join(
+        message['body'] for message in sent
+        if message['type'] == 'http.response.body'
+    )
+
+
+class TestReadPathHandler:
+
+    def test_catalog_reads_run_on_the_read_pool(self):
+        handler = ReadPathHandler(application)
+        sent = request(handler, 'GET', '/api/v1/titles/')
+        assert sent[0] == {
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/plain')],
+        }
+        assert body(sent).startswith(b'asgi-read')
+        assert sent[-1] == {'type': 'http.response.body', 'body': b''}
+
+    def test_writes_and_other_paths_run_on_the_write_pool(self):
+        handler = ReadPathHandler(application)
+        assert body(
+            request(handler, 'POST', '/api/v1/titles/')
+        ).startswith(b'asgi-write')
+        assert body(
+            request(handler, 'GET', '/api/v1/users/me/')
+        ).startswith(b'asgi-write')
+
+    def test_head_has_no_body(self):
+        sent = request(ReadPathHandler(application), 'HEAD', '/api/v1/titles/')
+        assert sent[0]['status'] == 200
+        assert body(sent) == b''
+
+    def test_request_body_in_parts(self):
+        sent = serve(
+            ReadPathHandler(application),
+            http('POST', '/api/v1/auth/token/', [(b'content-length', b'6')]),
+            [
+                {'type': 'http.request', 'body': b'abc', 'more_body': True},
+                {'type': 'http.request', 'body': b'def'},
+            ],
+        )
+        assert body(sent).endswith(b'|POST|6|abcdef')
+
+    def test_response_is_streamed(self):
+        sent = []
+
+        def streaming(environ, start_response):
+            start_response('200 OK', [])
+            yield b'first'
+            # The first chunk is out before the application goes on.
+            yield str(len(sent)).encode()
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(ReadPathHandler(streaming)(
+            http('GET', '/api/v1/titles/'), receive, send
+        ))
+        assert [message.get('body') for message in sent] == [
+            None, b'first', b'2', b'',
+        ]
+
+    def test_lifespan(self):
+        sent = serve(
+            ReadPathHandler(application),
+            {'type': 'lifespan'},
+            [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}],
+        )
+        assert sent == [
+            {'type': 'lifespan.startup.complete'},
+            {'type': 'lifespan.shutdown.complete'},
+        ]
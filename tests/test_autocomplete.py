@@ -0,0 +1,158 @@
+import pytest
+from api.autocomplete import PrefixIndex, autocomplete, normalize
+from django.test import override_settings
+from rest_framework.test import APIClient
+from reviews.models import (Category, Genre, IndexVersion, Review, Title,
+                            User)
+
+ROWS = (
+    ('title', 1, None, 'Сталкер', 12),
+    ('title', 2, None, 'Стальной гигант', 30),
+    ('title', 3, None, 'Пикник на обочине', 5),
+    ('title', 4, None, 'Старик и море', 0),
+    ('title', 5, None, 'Стол стоит', 1),
+    ('genre', 1, 'drama', 'Драма', 100),
+    ('category', 1, 'movie', 'Фильм', 40),
+)
+
+
+def names(results):
+    return [result['name'] for result in results]
+
+
+class TestPrefixIndex:
+
+    def test_ranked_by_popularity(self):
+        index = PrefixIndex(ROWS)
+        assert names(index.search('ст')) == [
+            'Стальной гигант', 'Сталкер', 'Стол стоит', 'Старик и море'
+        ]
+        assert names(index.search('стал', limit=1)) == ['Стальной гигант']
+
+    def test_matches_any_word_start(self):
+        index = PrefixIndex(ROWS)
+        assert names(index.search('обоч')) == ['Пикник на обочине']
+        assert names(index.search('на обоч')) == ['Пикник на обочине']
+        assert index.search('кник') == []
+
+    def test_max_words(self):
+        index = PrefixIndex(ROWS, max_words=2)
+        assert names(index.search('на')) == ['Пикник на обочине']
+        assert index.search('обоч') == []
+
+    def test_normalization(self):
+        assert normalize('  Ёжик в ТУМАНЕ… ') == 'ежик в тумане'
+        assert normalize('Amélie_Poulain') == 'amelie poulain'
+        index = PrefixIndex(ROWS)
+        assert names(index.search('ДРАМ')) == ['Драма']
+
+    def test_describe(self):
+        index = PrefixIndex(ROWS)
+        assert index.search('фил') == [
+            {'type': 'category', 'slug': 'movie', 'name': 'Фильм',
+             'reviews': 40}
+        ]
+        assert index.search('сталк') == [
+            {'type': 'title', 'id': 1, 'name': 'Сталкер', 'reviews': 12}
+        ]
+
+    def test_empty(self):
+        assert PrefixIndex(()).search('ст') == []
+        assert PrefixIndex(ROWS).search(' !') == []
+
+
+@pytest.fixture
+def fresh_index():
+    autocomplete.index = None
+    yield autocomplete
+    if autocomplete.thread is not None:
+        autocomplete.thread.join()
+    autocomplete.index = None
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    popular = Title.objects.create(
+        name='Сталкер', year=1979, category=category
+    )
+    popular.genre.add(genre)
+    Title.objects.create(name='Солярис', year=1972, category=category)
+    for number in range(2):
+        Review.objects.create(
+            title=popular,
+            author=User.objects.create(
+                username=f'critic{number}', email=f'critic{number}@yamdb.fake'
+            ),
+            text='Отзыв',
+            score=9,
+        )
+    return popular
+
+
+def autocomplete_request(query):
+    response = APIClient().get('/api/v1/autocomplete/', {'q': query})
+    assert response.status_code == 200
+    return response.json()['results']
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAutocompleteEndpoint:
+
+    def test_search(self, catalog, fresh_index):
+        assert autocomplete_request('с') == [
+            {'type': 'title', 'id': catalog.pk, 'name': 'Сталкер',
+             'reviews': 2},
+            {'type': 'title', 'id': catalog.pk + 1, 'name': 'Солярис',
+             'reviews': 0},
+        ]
+        assert autocomplete_request('фи')[0]['reviews'] == 2
+        assert autocomplete_request('') == []
+
+    def test_writes_bump_the_version(self, catalog):
+        version = IndexVersion.objects.get(name='autocomplete').version
+        Genre.objects.create(name='Комедия', slug='comedy')
+        assert IndexVersion.objects.get(
+            name='autocomplete'
+        ).version == version + 1
+
+    @override_settings(AUTOCOMPLETE_CHECK_INTERVAL=0)
+    def test_changes_are_applied_without_a_rebuild(self, catalog,
+                                                   fresh_index):
+        assert autocomplete_request('зер') == []
+        thread = fresh_index.thread
+        mirror = Title.objects.create(name='Зеркало', year=1974)
+        assert names(autocomplete_request('зер')) == ['Зеркало']
+        catalog.name = 'Пикник'
+        catalog.save()
+        assert autocomplete_request('стал') == []
+        assert names(autocomplete_request('пик')) == ['Пикник']
+        mirror.delete()
+        assert autocomplete_request('зер') == []
+        assert fresh_index.thread is thread
+
+    @override_settings(AUTOCOMPLETE_CHECK_INTERVAL=0)
+    def test_hidden_titles_are_dropped(self, catalog, fresh_index,
+                                       settings):
+        settings.BACKGROUND_DELETES = True
+        autocomplete_request('с')
+        admin = User.objects.create(
+            username='admin', email='admin@yamdb.fake', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        client.delete(f'/api/v1/titles/{catalog.pk}/')
+        assert names(autocomplete_request('с')) == ['Солярис']
+
+    @override_settings(
+        AUTOCOMPLETE_CHECK_INTERVAL=0, AUTOCOMPLETE_DELTA_LIMIT=1
+    )
+    def test_many_changes_rebuild_the_index(self, catalog, fresh_index):
+        autocomplete_request('зер')
+        Title.objects.create(name='Зеркало', year=1974)
+        Title.objects.create(name='Зеркальце', year=1975)
+        # The previous index is served while the new one is built.
+        autocomplete_request('зер')
+        fresh_index.thread.join()
+        assert names(autocomplete_request('зер')) == ['Зеркало', 'Зеркальце']
@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+import pytest
+from api import jobs
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import (Comment, Genre, Job, Review, Title, Tombstone,
+                            User, UserGenreStats, UserStats)
+
+
+@pytest.fixture(autouse=True)
+def background_deletes(settings):
+    settings.BACKGROUND_DELETES = True
+
+
+@pytest.fixture
+def admin(db):
+    return User.objects.create(
+        username='admin', email='admin@yamdb.fake', role='admin'
+    )
+
+
+@pytest.fixture
+def client(admin):
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def catalog(db):
+    """Two titles reviewed by three critics, with comments."""
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    critics = [
+        User.objects.create(username=f'critic{number}',
+                            email=f'critic{number}@yamdb.fake')
+        for number in range(3)
+    ]
+    titles = []
+    for name in ('Сталкер', 'Солярис'):
+        title = Title.objects.create(name=name, year=1979)
+        title.genre.add(genre)
+        for score, critic in enumerate(critics, start=5):
+            review = Review.objects.create(
+                title=title, author=critic, text='Отзыв', score=score
+            )
+            for reader in critics:
+                Comment.objects.create(
+                    review=review, author=reader, text='Комментарий'
+                )
+        titles.append(title)
+    return titles
+
+
+def all_stats():
+    return (
+        sorted(UserStats.objects.values_list(
+            'user_id', 'reviews_count', 'score_sum', 'comments_count'
+        )),
+        sorted(UserGenreStats.objects.filter(reviews_count__gt=0)
+               .values_list('user_id', 'genre_id', 'reviews_count')),
+    )
+
+
+def assert_stats_consistent():
+    incremental = all_stats()
+    call_command('rebuild_user_stats')
+    assert all_stats() == incremental
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBackgroundDeletion:
+
+    def test_title_is_hidden_at_once(self, client, catalog):
+        title = catalog[0]
+        response = client.delete(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 202
+        job = response.json()
+        assert job['kind'] == 'delete_title'
+        assert job['status'] == 'pending'
+        assert response['Location'].endswith(f'/api/v1/jobs/{job["id"]}/')
+        assert client.get(f'/api/v1/titles/{title.pk}/').status_code == 404
+        listing = client.get('/api/v1/titles/').json()['results']
+        assert [item['id'] for item in listing] == [catalog[1].pk]
+        assert Review.objects.filter(title=title).count() == 3
+
+    def test_nested_routes_of_a_hidden_title(self, client, catalog):
+        title = catalog[0]
+        review = Review.objects.filter(title=title).first()
+        reviews = f'/api/v1/titles/{title.pk}/reviews/'
+        comments = f'{reviews}{review.pk}/comments/'
+        client.delete(f'/api/v1/titles/{title.pk}/')
+        assert client.get(reviews).status_code == 404
+        assert client.get(f'{reviews}{review.pk}/').status_code == 404
+        assert client.get(comments).status_code == 404
+        assert client.post(
+            reviews, {'text': 'Поздно', 'score': 7}
+        ).status_code == 404
+        assert client.post(comments, {'text': 'Поздно'}).status_code == 404
+        assert Review.objects.filter(title=title).count() == 3
+        assert Comment.objects.filter(review=review).count() == 3
+
+    def test_worker_deletes_in_chunks(self, client, catalog, settings):
+        settings.DELETION_CHUNK_SIZE = 2
+        title = catalog[0]
+        job_id = client.delete(f'/api/v1/titles/{title.pk}/').json()['id']
+        call_command('run_jobs', '--once')
+
+        assert not Title.objects.filter(pk=title.pk).exists()
+        assert Review.objects.count() == 3
+        assert Comment.objects.count() == 9
+        job = client.get(f'/api/v1/jobs/{job_id}/').json()
+        assert job['status'] == 'done'
+        assert job['done'] == job['total'] == 13
+        assert Tombstone.objects.filter(kind='comment').count() == 9
+        assert Tombstone.objects.filter(kind='review').count() == 3
+        assert Tombstone.objects.filter(kind='title').count() == 1
+        critic = UserStats.objects.get(user__username='critic0')
+        assert critic.comments_count == 3
+        assert_stats_consistent()
+
+    def test_user_is_deleted_with_comments_on_their_reviews(self, client,
+                                                            catalog):
+        critic = User.objects.get(username='critic0')
+        response = client.delete('/api/v1/users/critic0/')
+        assert response.status_code == 202
+        critic.refresh_from_db()
+        assert not critic.is_active
+        assert client.get('/api/v1/users/critic0/').status_code == 404
+
+        call_command('run_jobs', '--once')
+        assert not User.objects.filter(username='critic0').exists()
+        assert Review.objects.count() == 4
+        # Their own comments and the comments on their two reviews.
+        assert Comment.objects.count() == 18 - 6 - 4
+        assert Job.objects.get().status == Job.DONE
+        assert_stats_consistent()
+
+    def test_inline_mode(self, client, catalog, settings):
+        settings.BACKGROUND_DELETES = False
+        response = client.delete(f'/api/v1/titles/{catalog[0].pk}/')
+        assert response.status_code == 204
+        assert not Job.objects.exists()
+        assert Review.objects.count() == 3
+
+    def test_stale_jobs_are_claimed_again(self, db):
+        job = jobs.enqueue('delete_title', 0)
+        assert jobs.claim() == job
+        assert jobs.claim() is None
+        Job.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        assert jobs.claim() == job
+
+    def test_jobs_are_admin_only(self, catalog):
+        assert APIClient().get('/api/v1/jobs/').status_code == 401
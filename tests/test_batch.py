@@ -0,0 +1,151 @@
+import time
+
+import pytest
+from api import batch as batch_module
+from api_yamdb.db import middleware
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Genre, Review, Title, User
+
+BATCH_URL = '/api/v1/batch/'
+
+
+@pytest.fixture
+def title(db):
+    title = Title.objects.create(
+        name='Сталкер',
+        year=1979,
+        category=Category.objects.create(name='Фильм', slug='movie'),
+    )
+    title.genre.add(Genre.objects.create(name='Драма', slug='drama'))
+    return title
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='critic', email='critic@yamdb.fake')
+
+
+def jwt_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}'
+    )
+    return client
+
+
+def batch(client, *requests):
+    return client.post(BATCH_URL, {'requests': list(requests)}, format='json')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBatch:
+
+    def test_title_page_in_one_round_trip(self, title):
+        response = batch(
+            APIClient(),
+            {'method': 'GET', 'path': f'/api/v1/titles/{title.pk}/'},
+            {'method': 'GET', 'path': f'/api/v1/titles/{title.pk}/reviews/'},
+            {'method': 'GET', 'path': '/api/v1/genres/'},
+            # ?search=Фил
+            {'method': 'GET',
+             'path': '/api/v1/categories/?search=%D0%A4%D0%B8%D0%BB'},
+            {'method': 'GET', 'path': '/api/v1/titles/0/'},
+        )
+        assert response.status_code == 200
+        responses = response.json()['responses']
+        assert [item['status'] for item in responses] == [
+            200, 200, 200, 200, 404
+        ]
+        assert responses[0]['body']['name'] == 'Сталкер'
+        assert responses[2]['body']['results'] == [
+            {'name': 'Драма', 'slug': 'drama'}
+        ]
+        assert responses[3]['body']['count'] == 1
+
+    def test_sub_requests_use_callers_credentials(self, title, author):
+        path = f'/api/v1/titles/{title.pk}/reviews/'
+        review = {'method': 'POST', 'path': path,
+                  'body': {'text': 'Шедевр', 'score': 10}}
+
+        anonymous = batch(APIClient(), review).json()['responses']
+        assert anonymous[0]['status'] == 401
+
+        responses = batch(
+            jwt_client(author), review, {'method': 'GET', 'path': path}
+        ).json()['responses']
+        assert responses[0]['status'] == 201
+        assert responses[0]['body']['author'] == 'critic'
+        # Reads after a write see its result.
+        assert responses[1]['body']['count'] == 1
+        assert Review.objects.get().author == author
+
+    def test_writes_keep_their_order(self, title, author):
+        path = f'/api/v1/titles/{title.pk}/reviews/'
+        responses = batch(
+            jwt_client(author),
+            {'method': 'POST', 'path': path,
+             'body': {'text': 'Первый', 'score': 9}},
+            {'method': 'POST', 'path': path,
+             'body': {'text': 'Второй', 'score': 1}},
+        ).json()['responses']
+        assert [item['status'] for item in responses] == [201, 400]
+        assert Review.objects.get().text == 'Первый'
+
+    def test_cookies_of_writes_are_kept(self, title, author, settings,
+                                        monkeypatch):
+        settings.DATABASE_REPLICAS = ['replica1']
+        replica_reads = []
+
+        def choose_replica():
+            replica_reads.append(True)
+
+        monkeypatch.setattr(middleware, 'choose_replica', choose_replica)
+        path = f'/api/v1/titles/{title.pk}/reviews/'
+        response = batch(
+            jwt_client(author),
+            {'method': 'POST', 'path': path,
+             'body': {'text': 'Шедевр', 'score': 10}},
+            {'method': 'GET', 'path': path},
+        )
+        assert [item['status'] for item in response.json()['responses']] == [
+            201, 200,
+        ]
+        # The read after the write is pinned to the primary like it.
+        assert replica_reads == []
+        pin = response.cookies[middleware.PIN_COOKIE]
+        assert float(pin.value) > time.time()
+
+    def test_streaming_sub_responses(self, monkeypatch):
+        class Handler:
+            @staticmethod
+            def get_response(request):
+                return StreamingHttpResponse(
+                    iter([b'{"a": ', b'1}']),
+                    content_type='application/json',
+                )
+
+        monkeypatch.setattr(batch_module, 'get_handler', Handler)
+        item = {'method': 'GET', 'path': '/api/v1/genres/'}
+        assert batch(APIClient(), item).json()['responses'] == [
+            {'status': 200, 'body': {'a': 1}},
+        ]
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_size_limit(self):
+        item = {'method': 'GET', 'path': '/api/v1/genres/'}
+        assert batch(APIClient(), item, item).status_code == 200
+        assert batch(APIClient(), item, item, item).status_code == 400
+
+    @pytest.mark.parametrize('item', [
+        {'method': 'GET', 'path': '/api/v1/batch/'},
+        {'method': 'GET', 'path': '/admin/'},
+        {'method': 'TRACE', 'path': '/api/v1/genres/'},
+    ])
+    def test_invalid_items_are_rejected(self, item):
+        assert batch(APIClient(), item).status_code == 400
+
+    def test_empty_batch_is_rejected(self):
+        assert batch(APIClient()).status_code == 400
@@ -0,0 +1,34 @@
+from benchmarks.stats import Recorder, compare, percentile
+
+
+class TestBenchmarkStats:
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 95) == 95
+        assert percentile(samples, 99) == 99
+        assert percentile([], 50) is None
+
+    def test_summary(self):
+        recorder = Recorder()
+        for latency in (0.01, 0.02, 0.03, 0.04):
+            recorder.add('GET /titles/', latency, 200, True)
+        recorder.add('GET /titles/', 0.05, 500, False)
+        summary = recorder.summary(elapsed=1.0)
+        endpoint = summary['endpoints']['GET /titles/']
+        assert summary['requests'] == 5
+        assert endpoint['errors'] == 1
+        assert endpoint['statuses'] == {'200': 4, '500': 1}
+        assert endpoint['p50_ms'] == 30.0
+        assert endpoint['rps'] == 5.0
+
+    def test_compare_flags_regressions(self):
+        def results(p95, rps):
+            return {'summary': {'endpoints': {
+                'GET /titles/': {'p95_ms': p95, 'rps': rps},
+            }}}
+
+        assert compare(results(10, 100), results(10.5, 95), 0.1) == []
+        regressions = compare(results(10, 100), results(12, 80), 0.1)
+        assert len(regressions) == 2
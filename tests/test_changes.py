@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+import pytest
+from api import cursors
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            Tombstone, User)
+
+CHANGES_URL = '/api/v1/changes/'
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Сталкер', year=1979, category=category)
+    title.genre.add(genre)
+    review = Review.objects.create(
+        title=title,
+        author=User.objects.create(username='critic', email='c@yamdb.fake'),
+        text='Шедевр',
+        score=10,
+    )
+    Comment.objects.create(review=review, author=review.author, text='Да')
+    return title
+
+
+def get(cursor=None, **params):
+    if cursor:
+        params['cursor'] = cursor
+    response = APIClient().get(CHANGES_URL, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def sync(cursor=None, limit=2):
+    """Every change after ``cursor`` and the cursor to resume from."""
+    results = []
+    while True:
+        data = get(cursor, limit=limit)
+        results += data['results']
+        cursor = data['cursor']
+        if not data['next']:
+            return results, cursor
+
+
+def ops(results):
+    return [(item['op'], item['type']) for item in results]
+
+
+@pytest.fixture(autouse=True)
+def settled(settings):
+    settings.CHANGES_SETTLE_TIME = 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChanges:
+
+    def test_full_sync_in_pages(self, catalog):
+        results, cursor = sync()
+        assert ops(results) == [
+            ('upsert', 'category'), ('upsert', 'genre'), ('upsert', 'title'),
+            ('upsert', 'review'), ('upsert', 'comment'),
+        ]
+        title = results[2]
+        assert title['id'] == catalog.pk
+        assert title['data'] == {
+            'name': 'Сталкер', 'year': 1979, 'description': '',
+            'category': 'movie', 'genre': ['drama'],
+        }
+        assert results[4]['data']['title_id'] == catalog.pk
+        assert results[4]['data']['author'] == 'critic'
+        data = get(cursor)
+        assert data['results'] == []
+        assert data['next'] is None
+        assert get(data['cursor'])['results'] == []
+
+    def test_idle_cursor_moves_on(self, catalog, monkeypatch):
+        _, cursor = sync()
+        now = timezone.now()
+        # A mirror of a catalog that stays quiet syncs every 20 days.
+        for days in (20, 40, 60):
+            monkeypatch.setattr(
+                timezone, 'now', lambda days=days: now + timedelta(days=days)
+            )
+            data = get(cursor)
+            assert data['results'] == []
+            cursor = data['cursor']
+        Genre.objects.update(updated_at=now + timedelta(days=61))
+        monkeypatch.setattr(timezone, 'now', lambda: now + timedelta(days=62))
+        assert ops(get(cursor)['results']) == [('upsert', 'genre')]
+
+    def test_resume_reads_only_new_changes(self, catalog,
+                                           django_assert_num_queries):
+        _, cursor = sync()
+        review = Review.objects.get()
+        review.score = 7
+        review.save()
+        Comment.objects.get().delete()
+        # One keyset query per table.
+        with django_assert_num_queries(6):
+            data = get(cursor)
+        assert ops(data['results']) == [
+            ('upsert', 'review'), ('delete', 'comment')
+        ]
+        assert data['results'][0]['data']['score'] == 7
+
+    def test_deleted_genre_touches_its_titles(self, catalog):
+        _, cursor = sync()
+        Genre.objects.get().delete()
+        results, _ = sync(cursor)
+        assert ops(results) == [('upsert', 'title'), ('delete', 'genre')]
+        assert results[0]['data']['genre'] == []
+        assert results[1]['data'] == {'slug': 'drama'}
+
+    def test_deleted_title_leaves_tombstones(self, catalog):
+        _, cursor = sync()
+        catalog.delete()
+        results, _ = sync(cursor)
+        assert sorted(ops(results)) == [
+            ('delete', 'comment'), ('delete', 'review'), ('delete', 'title')
+        ]
+
+    def test_hidden_title_leaves_a_tombstone(self, catalog, settings):
+        settings.BACKGROUND_DELETES = True
+        _, cursor = sync()
+        admin = User.objects.create(username='admin', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.delete(f'/api/v1/titles/{catalog.pk}/')
+        assert response.status_code == 202
+        Comment.objects.update(text='Нет', updated_at=timezone.now())
+        results, cursor = sync(cursor)
+        assert ops(results) == [('delete', 'title')]
+        call_command('run_jobs', '--once')
+        results, _ = sync(cursor)
+        assert sorted(ops(results)) == [
+            ('delete', 'comment'), ('delete', 'review')
+        ]
+
+    def test_recent_changes_are_held_back(self, catalog, settings):
+        settings.CHANGES_SETTLE_TIME = 60
+        assert get()['results'] == []
+
+    def test_cursors(self, catalog):
+        expired = cursors.encode(
+            (timezone.now() - timedelta(days=60), 'title', 1)
+        )
+        assert APIClient().get(
+            CHANGES_URL, {'cursor': expired}
+        ).status_code == 410
+        assert APIClient().get(
+            CHANGES_URL, {'cursor': 'nonsense'}
+        ).status_code == 404
+
+    def test_prune_tombstones(self, catalog):
+        Comment.objects.get().delete()
+        Tombstone.objects.update(
+            deleted_at=timezone.now() - timedelta(days=60)
+        )
+        Review.objects.get().delete()
+        call_command('prune_tombstones')
+        assert list(Tombstone.objects.values_list('kind', flat=True)) == [
+            'review'
+        ]
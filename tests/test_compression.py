@@ -0,0 +1,106 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from api_yamdb import compression
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+BODY = json.dumps(
+    [{'id': i, 'name': f'Title {i}', 'year': 1979} for i in range(200)]
+).encode()
+
+
+def json_response(body=BODY):
+    return HttpResponse(body, content_type='application/json')
+
+
+def run(response, accept_encoding, middleware=None):
+    middleware = middleware or compression.CompressionMiddleware(
+        lambda request: response
+    )
+    request = RequestFactory().get(
+        '/api/v1/titles/', HTTP_ACCEPT_ENCODING=accept_encoding
+    )
+    return middleware(request)
+
+
+class TestNegotiation:
+
+    @pytest.mark.parametrize('header, expected', [
+        ('gzip, deflate, br', 'br'),
+        ('gzip;q=1.0, br;q=0.5', 'gzip'),
+        ('br;q=0, gzip', 'gzip'),
+        ('identity', None),
+        ('*', 'br'),
+        ('', None),
+    ])
+    def test_negotiate(self, header, expected, monkeypatch):
+        monkeypatch.setattr(compression, 'ENCODINGS', ('br', 'gzip'))
+        assert compression.negotiate(header) == expected
+
+
+class TestCompressionMiddleware:
+
+    def test_gzip(self, monkeypatch):
+        monkeypatch.setattr(compression, 'ENCODINGS', ('gzip',))
+        response = run(json_response(), 'gzip, br')
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content)
+        assert gzip.decompress(response.content) == BODY
+
+    @pytest.mark.skipif(compression.brotli is None, reason='no brotli')
+    def test_brotli(self):
+        response = run(json_response(), 'gzip, br')
+        assert response['Content-Encoding'] == 'br'
+        assert compression.brotli.decompress(response.content) == BODY
+
+    def test_small_responses_are_sent_as_is(self):
+        response = run(json_response(b'{"count": 0}'), 'gzip')
+        assert not response.has_header('Content-Encoding')
+
+    def test_binary_responses_are_sent_as_is(self):
+        response = run(
+            HttpResponse(BODY, content_type='image/png'), 'gzip'
+        )
+        assert not response.has_header('Content-Encoding')
+
+    def test_streaming(self, monkeypatch):
+        monkeypatch.setattr(compression, 'ENCODINGS', ('gzip',))
+        chunks = [BODY[i:i + 1000] for i in range(0, len(BODY), 1000)]
+        response = run(
+            StreamingHttpResponse(
+                iter(chunks), content_type='application/json'
+            ),
+            'gzip',
+        )
+        assert response['Content-Encoding'] == 'gzip'
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = next(iter(response.streaming_content))
+        # Every chunk is flushed as soon as it is compressed.
+        assert decompressor.decompress(first) == chunks[0]
+
+    def test_repeated_bodies_are_compressed_once(self):
+        middleware = compression.CompressionMiddleware(
+            lambda request: json_response()
+        )
+        first = run(None, 'gzip', middleware)
+        second = run(None, 'gzip', middleware)
+        assert first.content == second.content
+        assert (middleware.cache.misses, middleware.cache.hits) == (1, 1)
+
+
+class TestCompressedCache:
+
+    def test_evicts_least_recently_used(self):
+        cache = compression.CompressedCache(max_bytes=100)
+        bodies = [bytes([i]) * 10000 for i in range(4)]
+        for body in bodies:
+            cache.compress(body, 'gzip')
+        assert cache.size <= 100
+        cache.compress(bodies[-1], 'gzip')
+        cache.compress(bodies[0], 'gzip')
+        assert cache.hits == 1
+        assert cache.misses == 5
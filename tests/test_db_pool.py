@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from api_yamdb.db import pool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.pings = 0
+        self.broken = False
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql):
+                connection.pings += 1
+                if connection.broken:
+                    raise RuntimeError('server closed the connection')
+
+        return Cursor()
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**options):
+    options.setdefault('timeout', 0.05)
+    return pool.ConnectionPool(FakeConnection, lambda conn: True, **options)
+
+
+class TestConnectionPool:
+
+    def test_reuses_released_connections(self):
+        connections = make_pool(max_size=2)
+        first = connections.acquire()
+        connections.release(first)
+        assert connections.acquire() is first
+        assert connections.stats()['opened'] == 1
+
+    def test_size_is_capped(self):
+        connections = make_pool(max_size=1)
+        held = connections.acquire()
+        with pytest.raises(pool.PoolTimeoutError):
+            connections.acquire()
+        assert connections.stats()['timeouts'] == 1
+
+        threading.Timer(0.01, connections.release, [held]).start()
+        connections.timeout = 1
+        assert connections.acquire() is held
+        assert connections.stats()['waits'] == 2
+
+    def test_recycles_old_connections(self):
+        connections = make_pool(max_lifetime=0)
+        first = connections.acquire()
+        connections.release(first)
+        assert first.closed
+        assert connections.acquire() is not first
+        assert connections.stats()['recycled'] >= 1
+
+    def test_health_check_on_checkout(self):
+        connections = make_pool(health_check_after=0)
+        first = connections.acquire()
+        connections.release(first)
+        first.broken = True
+        second = connections.acquire()
+        assert second is not first
+        assert first.closed
+        assert connections.stats()['health_check_failures'] == 1
+
+    def test_unresettable_connections_are_discarded(self):
+        connections = pool.ConnectionPool(
+            FakeConnection, lambda conn: False, timeout=0.05
+        )
+        first = connections.acquire()
+        connections.release(first)
+        assert first.closed
+        assert connections.stats()['size'] == 0
+
+    def test_pool_inherited_through_fork_is_abandoned(self):
+        inherited = pool.get_pool('test-fork', make_pool)
+        connection = inherited.acquire()
+        inherited.release(connection)
+        inherited.pid = -1
+        fresh = pool.get_pool('test-fork', make_pool)
+        assert fresh is not inherited
+        assert not connection.closed
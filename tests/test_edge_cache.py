@@ -0,0 +1,187 @@
+import time
+
+import pytest
+from api import purge
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Review, Title, User
+
+
+@pytest.fixture
+def purged(settings):
+    settings.CACHE_PURGE_BACKEND = 'api.purge.LocMemBackend'
+    # Flushed by the tests themselves, not by the background thread.
+    settings.CACHE_PURGE_BATCH_WINDOW = 60
+    settings.CACHE_EDGE_TTL = 60
+    purge.dispatcher.pending.clear()
+    purge.LocMemBackend.purged.clear()
+    yield purge.LocMemBackend.purged
+    purge.dispatcher.pending.clear()
+
+
+@pytest.fixture
+def title(purged):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Сталкер', year=1979, category=category)
+    title.genre.add(genre)
+    purge.dispatcher.flush()
+    purged.clear()
+    return title
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEdgeCacheHeaders:
+
+    def test_anonymous_list_is_public_and_tagged(self, title):
+        response = APIClient().get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert 'public' in response['Cache-Control']
+        assert 's-maxage=60' in response['Cache-Control']
+        assert response['X-Accel-Expires'] == '60'
+        assert 'Authorization' in response['Vary']
+        keys = set(response['Surrogate-Key'].split())
+        assert keys == {
+            'titles',
+            f'title-{title.pk}',
+            f'category-{title.category_id}',
+            f'genre-{title.genre.get().pk}',
+        }
+        assert set(response['X-Cache-Tags'].split(',')) == keys
+
+    def test_authenticated_response_is_private(self, title):
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create(username='reader', role='admin')
+        )
+        response = client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 200
+        assert 'private' in response['Cache-Control']
+        assert not response.has_header('Surrogate-Key')
+
+    def test_errors_are_not_tagged(self, purged):
+        response = APIClient().get('/api/v1/titles/999/')
+        assert response.status_code == 404
+        assert not response.has_header('Surrogate-Key')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPurgeDispatch:
+
+    def test_writes_purge_their_keys_once(self, title, purged):
+        title.name = 'Солярис'
+        title.save()
+        title.save()
+        purge.dispatcher.flush()
+        assert purged == [{'titles', f'title-{title.pk}'}]
+
+    def test_review_purges_title_and_review_list(self, title, purged):
+        user = User.objects.create(username='critic')
+        review = Review.objects.create(
+            title=title, author=user, text='Шедевр', score=10
+        )
+        purge.dispatcher.flush()
+        assert purged == [{
+            'titles',
+            f'title-{title.pk}',
+            f'title-{title.pk}-reviews',
+            f'review-{review.pk}',
+        }]
+
+    def test_review_post_purges_title_listings(self, title, purged):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='critic'))
+        response = client.post(
+            f'/api/v1/titles/{title.pk}/reviews/', {'text': 'Да', 'score': 9}
+        )
+        assert response.status_code == 201
+        purge.dispatcher.flush()
+        # Listings, filtered by genre or category too, show the rating.
+        assert '/api/v1/titles/|' in purge.NginxBackend().prefixes(
+            purged[0]
+        )
+
+    def test_only_score_changes_purge_title_listings(self, title, purged):
+        review = Review.objects.create(
+            title=title, author=User.objects.create(username='critic'),
+            text='Шедевр', score=10,
+        )
+        purge.dispatcher.flush()
+        purged.clear()
+        review.text = 'Ещё раз: шедевр'
+        review.save()
+        review.score = 9
+        review.save(update_fields=['score'])
+        purge.dispatcher.flush()
+        assert 'titles' in purged[0]
+        review.text = 'Почти шедевр'
+        review.save()
+        purge.dispatcher.flush()
+        assert 'titles' not in purged[1]
+
+
+class TestPurgeBackends:
+
+    def test_keys_are_sent_in_batches(self, purged, settings):
+        settings.CACHE_PURGE_MAX_KEYS = 2
+        purge.dispatcher.add({'genres', 'genre-1', 'genre-2'})
+        purge.dispatcher.flush()
+        assert purged == [{'genre-1', 'genre-2'}, {'genres'}]
+
+    def test_keys_map_to_cached_urls(self):
+        paths = purge.NginxBackend().paths(
+            {'titles', 'title-3', 'title-3-reviews', 'title-3-similar',
+             'review-7'}
+        )
+        assert paths == [
+            '/api/v1/titles/',
+            '/api/v1/titles/3/',
+            '/api/v1/titles/3/reviews/',
+            '/api/v1/titles/3/similar/',
+        ]
+
+    def test_keys_map_to_cache_key_prefixes(self):
+        backend = purge.NginxBackend()
+        assert backend.prefixes(
+            {'title-3', 'title-3-reviews', 'review-7', 'review-7-comments',
+             'comment-9', 'genres'}
+        ) == [
+            '/api/v1/genres/|',
+            '/api/v1/titles/3/reviews/|',
+            '/api/v1/titles/3/|',
+            '/comments/9/|',
+            '/reviews/7/comments/|',
+            '/reviews/7/|',
+        ]
+        # Every title page renders its genres.
+        assert backend.prefixes({'titles', 'title-3', 'genre-2'}) == [
+            '/api/v1/titles/',
+        ]
+
+    def test_nginx_purges_then_refreshes_from_the_primary(self, settings,
+                                                          monkeypatch):
+        settings.CACHE_PURGE_URL = 'http://nginx:8080/'
+        sent = []
+
+        class Response:
+            status_code = 404
+
+            def close(self):
+                pass
+
+        def request(session, method, url, cookies=None, **kwargs):
+            sent.append((method, url, cookies))
+            return Response()
+
+        monkeypatch.setattr(purge.requests.Session, 'request', request)
+        purge.NginxBackend().purge({'title-3', 'comment-9'})
+        purges = [url for method, url, _ in sent if method == 'PURGE']
+        assert purges == [
+            'http://nginx:8080/purge/api/v1/titles/3/%7C*',
+            'http://nginx:8080/purge/comments/9/%7C*',
+        ]
+        refreshes = [(url, cookies) for method, url, cookies in sent
+                     if method == 'GET']
+        assert len(refreshes) == 3
+        for url, cookies in refreshes:
+            assert url == 'http://nginx:8080/api/v1/titles/3/'
+            assert float(cookies['db_primary_until']) > time.time()
@@ -0,0 +1,106 @@
+import pytest
+from api import activity, ingest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title, User, UserStats
+
+
+@pytest.fixture
+def write_behind(settings, tmp_path):
+    settings.COMMENT_WRITE_BEHIND = True
+    settings.COMMENT_INGEST_PATH = str(tmp_path / 'comments.sqlite3')
+    settings.COMMENT_INGEST_BATCH_SIZE = 2
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='critic', email='critic@yamdb.fake')
+
+
+@pytest.fixture
+def client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+@pytest.fixture
+def review(author):
+    title = Title.objects.create(name='Сталкер', year=1979)
+    return Review.objects.create(
+        title=title, author=author, text='Шедевр', score=10
+    )
+
+
+def comments_url(review):
+    return f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWriteBehind:
+
+    def test_post_is_queued_until_flushed(self, write_behind, client, review):
+        url = comments_url(review)
+        responses = [
+            client.post(url, {'text': f'Комментарий {number}'})
+            for number in range(3)
+        ]
+        assert [response.status_code for response in responses] == [202] * 3
+        data = responses[0].json()
+        assert data['id'] is None
+        assert data['author'] == 'critic'
+        assert not Comment.objects.exists()
+        assert client.get(url).json()['count'] == 0
+        assert len(ingest.queue()) == 3
+
+        # Two batches of two and one.
+        assert ingest.work(once=True) == 3
+        assert len(ingest.queue()) == 0
+        comments = client.get(url).json()
+        assert comments['count'] == 3
+        assert comments['results'][-1]['pub_date'] == data['pub_date']
+        assert UserStats.objects.get(user=review.author).comments_count == 3
+        newest = activity.load(limit=1)[0][1]
+        assert newest['text'] == 'Комментарий 2'
+        assert newest['title_id'] == review.title_id
+
+    def test_invalid_comments_are_not_queued(self, write_behind, client,
+                                             review):
+        assert client.post(comments_url(review), {}).status_code == 400
+        assert client.post(
+            f'/api/v1/titles/{review.title_id}/reviews/999/comments/',
+            {'text': 'Мимо'},
+        ).status_code == 404
+        assert len(ingest.queue()) == 0
+
+    def test_comments_of_deleted_reviews_are_dropped(self, write_behind,
+                                                     client, review):
+        client.post(comments_url(review), {'text': 'Поздно'})
+        Review.objects.filter(pk=review.pk).delete()
+        assert ingest.flush() == 1
+        assert not Comment.objects.exists()
+        assert len(ingest.queue()) == 0
+
+    def test_flusher_killed_after_commit(self, write_behind, client, review,
+                                         monkeypatch):
+        for number in range(2):
+            client.post(comments_url(review), {'text': f'Один раз {number}'})
+
+        def killed(queue, ids):
+            raise KeyboardInterrupt
+
+        with monkeypatch.context() as patch:
+            patch.setattr(ingest.Queue, 'remove', killed)
+            with pytest.raises(KeyboardInterrupt):
+                ingest.flush()
+        assert Comment.objects.count() == 2
+        assert len(ingest.queue()) == 2
+        call_command('flush_comments', '--once')
+        assert Comment.objects.count() == 2
+        assert len(ingest.queue()) == 0
+        assert UserStats.objects.get(user=review.author).comments_count == 2
+
+    def test_off_by_default(self, client, review):
+        response = client.post(comments_url(review), {'text': 'Сразу'})
+        assert response.status_code == 201
+        assert Comment.objects.get().pk == response.json()['id']
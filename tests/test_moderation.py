@@ -0,0 +1,195 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import (Comment, Genre, Job, Review, Title, Tombstone,
+                            User, UserStats)
+
+from . import test_background_deletion
+
+URL = '/api/v1/moderation/'
+
+
+def assert_stats_consistent():
+    # A rebuild has no row for the users left with nothing.
+    UserStats.objects.filter(reviews_count=0, comments_count=0).delete()
+    test_background_deletion.assert_stats_consistent()
+
+
+@pytest.fixture
+def moderator(db):
+    return User.objects.create(
+        username='moderator', email='moderator@yamdb.fake', role='moderator'
+    )
+
+
+@pytest.fixture
+def client(moderator):
+    client = APIClient()
+    client.force_authenticate(moderator)
+    return client
+
+
+@pytest.fixture
+def catalog(db):
+    """
+    Two titles reviewed by three critics, each review commented on by every
+    critic, and by the third one with spam too.
+    """
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    critics = [
+        User.objects.create(username=f'critic{number}',
+                            email=f'critic{number}@yamdb.fake')
+        for number in range(3)
+    ]
+    titles = []
+    for name in ('Сталкер', 'Солярис'):
+        title = Title.objects.create(name=name, year=1979)
+        title.genre.add(genre)
+        for score, critic in enumerate(critics, start=5):
+            review = Review.objects.create(
+                title=title, author=critic, text='Отзыв', score=score
+            )
+            for reader in critics:
+                Comment.objects.create(
+                    review=review, author=reader, text='Комментарий'
+                )
+            Comment.objects.create(
+                review=review, author=critics[2], text='Купите SPAM дёшево'
+            )
+        titles.append(title)
+    return titles
+
+
+@pytest.mark.django_db(transaction=True)
+class TestModeration:
+
+    def test_author_is_cleaned_up_in_the_request(self, client, catalog):
+        response = client.post(URL, {'author': 'critic0'})
+        assert response.status_code == 200
+        # Their own 6 comments and the 2 * 3 by others on their reviews.
+        assert response.json() == {'reviews': 2, 'comments': 12}
+        assert not Review.objects.filter(author__username='critic0').exists()
+        assert not Comment.objects.filter(
+            author__username='critic0'
+        ).exists()
+        assert Review.objects.count() == 4
+        assert Comment.objects.count() == 24 - 12
+        assert Tombstone.objects.filter(kind='review').count() == 2
+        assert not Job.objects.exists()
+        assert_stats_consistent()
+
+    def test_text_within_a_title(self, client, catalog):
+        stalker, solaris = catalog
+        response = client.post(
+            URL,
+            {'title': stalker.pk, 'text': 'spam', 'kinds': ['comments']},
+        )
+        assert response.json() == {'reviews': 0, 'comments': 3}
+        assert not Comment.objects.filter(
+            review__title=stalker, text__contains='SPAM'
+        ).exists()
+        assert Comment.objects.filter(review__title=solaris).count() == 12
+        assert Review.objects.count() == 6
+        assert_stats_consistent()
+
+    def test_large_moderations_run_in_the_background(self, client, catalog,
+                                                     settings):
+        settings.MODERATION_SYNC_LIMIT = 5
+        settings.DELETION_CHUNK_SIZE = 2
+        response = client.post(URL, {'title': catalog[0].pk})
+        assert response.status_code == 202
+        job = response.json()
+        assert job['kind'] == 'moderate'
+        assert response['Location'].endswith(f'/api/v1/jobs/{job["id"]}/')
+        assert Review.objects.count() == 6
+
+        call_command('run_jobs', '--once')
+        job = client.get(f'/api/v1/jobs/{job["id"]}/').json()
+        assert job['status'] == 'done'
+        assert job['done'] == job['total'] == 3 + 12
+        assert not Review.objects.filter(title=catalog[0]).exists()
+        assert Comment.objects.count() == 12
+        assert Title.objects.count() == 2
+        assert_stats_consistent()
+
+    def test_hide_and_restore(self, client, catalog):
+        stalker = catalog[0]
+        reviews = f'/api/v1/titles/{stalker.pk}/reviews/'
+        review = Review.objects.get(title=stalker, author__username='critic0')
+        response = client.post(URL, {'author': 'critic0', 'action': 'hide'})
+        assert response.json() == {'reviews': 2, 'comments': 12}
+        assert Review.objects.count() == 6
+        assert Comment.objects.count() == 24
+        listing = client.get(reviews).json()
+        assert listing['count'] == 2
+        assert client.get(f'{reviews}{review.pk}/').status_code == 404
+        assert client.get(
+            f'{reviews}{review.pk}/comments/'
+        ).status_code == 404
+        assert Tombstone.objects.filter(kind='review').count() == 2
+        assert_stats_consistent()
+
+        response = client.post(
+            URL, {'author': 'critic0', 'action': 'restore'}
+        )
+        assert response.json() == {'reviews': 2, 'comments': 12}
+        assert client.get(reviews).json()['count'] == 3
+        assert client.get(
+            f'{reviews}{review.pk}/comments/'
+        ).json()['count'] == 4
+        assert not Tombstone.objects.exists()
+        assert_stats_consistent()
+
+    def test_hidden_rows_are_deleted_with_their_title(self, client, catalog,
+                                                      settings):
+        settings.BACKGROUND_DELETES = True
+        admin = User.objects.create(
+            username='admin', email='admin@yamdb.fake', role='admin'
+        )
+        client.post(URL, {'author': 'critic0', 'action': 'hide'})
+        client.force_authenticate(admin)
+        client.delete(f'/api/v1/titles/{catalog[0].pk}/')
+        call_command('run_jobs', '--once')
+        assert Review.objects.count() == 3
+        assert Comment.objects.count() == 12
+        assert_stats_consistent()
+
+    def test_large_hides_run_in_the_background(self, client, catalog,
+                                               settings):
+        settings.MODERATION_SYNC_LIMIT = 5
+        settings.DELETION_CHUNK_SIZE = 2
+        response = client.post(URL, {'text': 'spam', 'action': 'hide'})
+        assert response.status_code == 202
+        call_command('run_jobs', '--once')
+        job = client.get(f'/api/v1/jobs/{response.json()["id"]}/').json()
+        assert job['status'] == 'done'
+        assert job['done'] == job['total'] == 6
+        assert Comment.objects.filter(hidden_at__isnull=False).count() == 6
+        assert_stats_consistent()
+
+    def test_moderators_see_their_jobs_only(self, client, catalog, settings):
+        settings.MODERATION_SYNC_LIMIT = 0
+        other = APIClient()
+        other.force_authenticate(User.objects.create(
+            username='other', email='other@yamdb.fake', role='moderator'
+        ))
+        job = client.post(URL, {'author': 'critic0'}).json()
+        other.post(URL, {'author': 'critic1'})
+        Job.objects.create(kind='delete_user')
+        results = client.get('/api/v1/jobs/').json()['results']
+        assert [result['id'] for result in results] == [job['id']]
+        assert other.get(f'/api/v1/jobs/{job["id"]}/').status_code == 404
+
+    def test_filters_are_required(self, client, catalog):
+        response = client.post(URL, {'kinds': ['reviews']})
+        assert response.status_code == 400
+        assert client.post(URL, {'author': 'nobody'}).status_code == 400
+        assert Review.objects.count() == 6
+
+    def test_moderators_and_admins_only(self, catalog):
+        client = APIClient()
+        assert client.post(URL, {'author': 'critic0'}).status_code == 401
+        client.force_authenticate(User.objects.get(username='critic1'))
+        assert client.post(URL, {'author': 'critic0'}).status_code == 403
+        assert client.get('/api/v1/jobs/').status_code == 403
+        assert Review.objects.count() == 6
@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title, User
+
+COMMENTS = 10000
+
+
+@pytest.fixture
+def review(db):
+    User.objects.bulk_create(
+        User(username=f'reader{i}', email=f'reader{i}@yamdb.fake')
+        for i in range(50)
+    )
+    users = list(User.objects.order_by('id'))
+    title = Title.objects.create(name='Сталкер', year=1979)
+    review = Review.objects.create(
+        title=title, author=users[0], text='Шедевр', score=10
+    )
+    Comment.objects.bulk_create(
+        Comment(review=review, author=users[i % len(users)], text=str(i))
+        for i in range(COMMENTS)
+    )
+    return review
+
+
+def get(url):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get(url)
+    return response, len(queries.captured_queries)
+
+
+@pytest.mark.django_db
+class TestNestedListing:
+
+    @pytest.mark.parametrize('offset', [0, 5000, COMMENTS - 10])
+    def test_comment_pages_cost_the_same(self, review, offset):
+        response, queries = get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+            f'?limit=10&offset={offset}'
+        )
+        assert response.status_code == 200
+        assert response.json()['count'] == COMMENTS
+        assert len(response.json()['results']) == 10
+        assert response.json()['results'][0]['author'].startswith('reader')
+        # COUNT and the page joined with the authors.
+        assert queries == 2
+        response, queries = get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+            f'?limit=10&offset={offset}'
+        )
+        assert response.json()['count'] == COMMENTS
+        # The count is cached until a comment is added or deleted.
+        assert queries == 1
+
+    def test_reviews_join_authors(self, review):
+        response, queries = get(f'/api/v1/titles/{review.title_id}/reviews/')
+        assert response.json()['results'][0]['author'] == 'reader0'
+        assert queries == 2
+
+    def test_empty_listing_of_existing_parent(self, review):
+        title = Title.objects.create(name='Солярис', year=1972)
+        response, _ = get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['results'] == []
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/999/reviews/',
+        '/api/v1/titles/999/reviews/{review}/comments/',
+        '/api/v1/titles/{title}/reviews/999/comments/',
+    ])
+    def test_missing_parent_is_not_found(self, review, url):
+        url = url.format(title=review.title_id, review=review.pk)
+        response, _ = get(url)
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestCommentPreviews:
+
+    @pytest.fixture
+    def reviews(self, review):
+        quiet = Review.objects.create(
+            title=review.title,
+            author=User.objects.get(username='reader1'),
+            text='Скучно',
+            score=3,
+        )
+        return review, quiet
+
+    def test_latest_comments_are_embedded(self, reviews):
+        review, quiet = reviews
+        response, queries = get(
+            f'/api/v1/titles/{review.title_id}/reviews/'
+            f'?include=comments&comments_limit=2'
+        )
+        results = {item['id']: item for item in response.json()['results']}
+        assert results[review.pk]['comments_count'] == COMMENTS
+        assert [c['text'] for c in results[review.pk]['comments']] == [
+            str(COMMENTS - 1), str(COMMENTS - 2)
+        ]
+        assert results[review.pk]['comments'][0]['author'] == 'reader49'
+        assert results[quiet.pk]['comments'] == []
+        assert results[quiet.pk]['comments_count'] == 0
+        # COUNT, the page of reviews and one query for all previews.
+        assert queries == 3
+
+    def test_plain_listing_has_no_comments(self, reviews):
+        review, _ = reviews
+        response, _ = get(f'/api/v1/titles/{review.title_id}/reviews/')
+        assert 'comments' not in response.json()['results'][0]
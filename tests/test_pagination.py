@@ -0,0 +1,130 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Genre, IndexVersion, Review, Title, User
+
+# Searched, so counted in the database rather than in api.reference.
+GENRES = '/api/v1/genres/?search=Жанр'
+
+
+@pytest.fixture
+def genres(db):
+    return [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(7)
+    ]
+
+
+@pytest.fixture
+def title(db):
+    title = Title.objects.create(name='Сталкер', year=1979)
+    Review.objects.bulk_create(
+        Review(
+            title=title,
+            author=User.objects.create(
+                username=f'critic{number}', email=f'critic{number}@yamdb.fake'
+            ),
+            text='Отзыв',
+            score=7,
+        )
+        for number in range(3)
+    )
+    return title
+
+
+def get(url):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get(url)
+    assert response.status_code == 200
+    return response.json(), [query['sql'] for query in queries]
+
+
+def counted(queries):
+    return sum('COUNT(' in sql for sql in queries)
+
+
+@pytest.mark.django_db
+class TestCountStrategies:
+
+    def test_exact(self, genres):
+        data, queries = get(f'{GENRES}&limit=5')
+        assert data['count'] == 7
+        assert 'offset=5' in data['next']
+        assert counted(queries) == 1
+
+    def test_none_probes_one_row_past_the_page(self, genres, settings):
+        settings.PAGINATION_COUNT_STRATEGY = 'none'
+        data, queries = get(f'{GENRES}&limit=5')
+        assert 'count' not in data
+        assert len(data['results']) == 5
+        assert 'offset=5' in data['next']
+        assert queries[0].endswith('LIMIT 6')
+        data, queries = get(f'{GENRES}&limit=5&offset=5')
+        assert len(data['results']) == 2
+        assert data['next'] is None
+        assert 'offset' not in data['previous']
+        assert counted(queries) == 0
+
+    def test_estimated_counts_small_tables_exactly(self, genres, settings):
+        settings.PAGINATION_COUNT_STRATEGY = 'estimated'
+        data, queries = get(f'{GENRES}&limit=5')
+        assert data['count'] == 7
+        assert counted(queries) == 1
+        # The last page needs no count at all.
+        data, queries = get(f'{GENRES}&limit=5&offset=5')
+        assert data['count'] == 7
+        assert data['next'] is None
+        assert counted(queries) == 0
+
+    def test_cached(self, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        data, queries = get(url)
+        assert data['count'] == 3
+        assert counted(queries) == 1
+        data, queries = get(url)
+        assert data['count'] == 3
+        assert counted(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCountVersions:
+
+    def test_writes_drop_cached_counts(self, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert get(url)[0]['count'] == 3
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create(username='reader', email='reader@yamdb.fake')
+        )
+        response = client.post(url, {'text': 'Ещё', 'score': 9})
+        assert response.status_code == 201
+        assert get(url)[0]['count'] == 4
+        assert client.delete(
+            f'{url}{response.json()["id"]}/'
+        ).status_code == 204
+        assert get(url)[0]['count'] == 3
+
+    def test_reviews_of_other_titles_keep_the_count(self, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert get(url)[0]['count'] == 3
+        other = Title.objects.create(name='Солярис', year=1972)
+        Review.objects.create(
+            title=other, author=User.objects.get(username='critic0'),
+            text='Отзыв', score=8,
+        )
+        data, queries = get(url)
+        assert data['count'] == 3
+        assert counted(queries) == 0
+        # Versioned in the cache, not in the database.
+        assert not IndexVersion.objects.filter(
+            name__startswith='count-review'
+        ).exists()
+
+    def test_genres_of_titles_drop_title_counts(self, title, genres):
+        url = f'/api/v1/titles/?genre={genres[0].slug}'
+        assert get(url)[0]['count'] == 0
+        title.genre.add(genres[0])
+        assert get(url)[0]['count'] == 1
+        Title.objects.get(pk=title.pk).delete()
+        assert get(url)[0]['count'] == 0
@@ -0,0 +1,112 @@
+import json
+import re
+
+import pytest
+from benchmarks.seed import seed
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Review
+
+# Tables large enough in production that a full scan is a regression.
+HOT_TABLES = {
+    'reviews_title',
+    'reviews_review',
+    'reviews_comment',
+    'reviews_title_genre',
+}
+# SQLite's plan line for a table read without an index.
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+# Titles hidden until their background deletion are left out of counts.
+WHOLE_TABLE_COUNT = re.compile(
+    r'^SELECT COUNT\(\*\)( AS "__count")? FROM '
+    r'("\w+"|\(SELECT "\w+"\."id" AS Col1 FROM "\w+"'
+    r'( WHERE "\w+"\."deleted_at" IS NULL)?\) subquery)$'
+)
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed(titles=20000, reviews_per_title=3, comments_per_review=2,
+             bench_users=0)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        yield Review.objects.order_by('id').first()
+        call_command('flush', verbosity=0, interactive=False)
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            return json.loads(cursor.fetchone()[0])[0]['Plan']
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk(child)
+
+
+def plan_problems(sql):
+    """
+    Full scans of hot tables, and sorts of a paginated listing that no
+    index returns in order.
+    """
+    if WHOLE_TABLE_COUNT.match(sql):
+        return []
+    paginated = ' LIMIT ' in sql
+    plan = explain(sql)
+    if connection.vendor == 'postgresql':
+        return [
+            f"{node['Node Type']} {node.get('Relation Name', '')}".strip()
+            for node in walk(plan)
+            if node['Node Type'] == 'Seq Scan'
+            and node['Relation Name'] in HOT_TABLES
+            or node['Node Type'] == 'Sort' and paginated
+        ]
+    return [
+        detail for detail in plan
+        if FULL_SCAN.match(detail)
+        and FULL_SCAN.match(detail).group(1) in HOT_TABLES
+        or 'TEMP B-TREE FOR ORDER BY' in detail and paginated
+    ]
+
+
+def endpoint_problems(method, url, user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    with CaptureQueriesContext(connection) as queries:
+        getattr(client, method)(url, {'text': 'Ещё раз', 'score': 5})
+    return {
+        query['sql']: problems
+        for query in queries.captured_queries
+        if query['sql'].startswith('SELECT')
+        for problems in [plan_problems(query['sql'])]
+        if problems
+    }
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/?limit=10&offset=100',
+        '/api/v1/titles/{title}/',
+        '/api/v1/titles/{title}/reviews/',
+        '/api/v1/titles/{title}/reviews/{review}/',
+        '/api/v1/titles/{title}/reviews/{review}/comments/',
+    ])
+    def test_reads_use_indexes(self, dataset, url):
+        url = url.format(title=dataset.title_id, review=dataset.pk)
+        assert endpoint_problems('get', url) == {}
+
+    def test_duplicate_review_check_uses_index(self, dataset):
+        url = f'/api/v1/titles/{dataset.title_id}/reviews/'
+        assert endpoint_problems('post', url, dataset.author) == {}
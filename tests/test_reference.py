@@ -0,0 +1,120 @@
+import pytest
+from api.reference import INDEX_NAME, references
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, IndexVersion, Title, User
+
+
+@pytest.fixture
+def catalog(db):
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    Category.objects.create(name='Книга', slug='book')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    Genre.objects.create(name='Комедия', slug='comedy')
+    title = Title.objects.create(name='Сталкер', year=1979, category=movie)
+    title.genre.add(drama)
+    references.load()
+    return title
+
+
+@pytest.fixture
+def admin(db):
+    client = APIClient()
+    client.force_authenticate(User.objects.create(
+        username='admin', email='admin@yamdb.fake', role='admin'
+    ))
+    return client
+
+
+def request(client, method, url, data=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(url, data)
+    return response, [query['sql'] for query in queries]
+
+
+@pytest.mark.django_db
+class TestReferenceCache:
+
+    @pytest.mark.parametrize('url, slugs', [
+        ('/api/v1/genres/', ['drama', 'comedy']),
+        ('/api/v1/categories/', ['book', 'movie']),
+    ])
+    def test_listings_make_no_query(self, catalog, url, slugs):
+        response, queries = request(APIClient(), 'get', url)
+        assert [item['slug'] for item in response.json()['results']] == slugs
+        assert response.json()['count'] == 2
+        assert queries == []
+
+    def test_search_reads_the_database(self, catalog):
+        response, queries = request(
+            APIClient(), 'get', '/api/v1/genres/?search=Ком'
+        )
+        assert [item['slug'] for item in response.json()['results']] == [
+            'comedy'
+        ]
+        assert queries
+
+    def test_titles_render_categories_from_the_cache(self, catalog):
+        response, queries = request(
+            APIClient(), 'get', f'/api/v1/titles/{catalog.pk}/'
+        )
+        assert response.json()['category'] == {
+            'name': 'Фильм', 'slug': 'movie'
+        }
+        assert not any('reviews_category' in sql for sql in queries)
+
+    def test_title_writes_resolve_slugs_without_queries(self, catalog,
+                                                         admin):
+        response, queries = request(admin, 'post', '/api/v1/titles/', {
+            'name': 'Солярис', 'year': 1972,
+            'category': 'movie', 'genre': ['drama', 'comedy'],
+        })
+        assert response.status_code == 201
+        assert response.json()['category'] == {
+            'name': 'Фильм', 'slug': 'movie'
+        }
+        title = Title.objects.get(name='Солярис')
+        assert title.category.slug == 'movie'
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+        assert not any('"slug" =' in sql or '"slug" IN' in sql
+                       for sql in queries)
+
+    def test_unknown_slug(self, catalog, admin):
+        response = admin.post('/api/v1/titles/', {
+            'name': 'Солярис', 'year': 1972, 'category': 'game',
+        })
+        assert response.status_code == 400
+        assert 'category' in response.json()
+
+    def test_duplicate_slug_is_refused_without_queries(self, catalog,
+                                                       admin):
+        response, queries = request(admin, 'post', '/api/v1/genres/', {
+            'name': 'Драма', 'slug': 'drama',
+        })
+        assert response.status_code == 400
+        assert response.json() == {'slug': ['This field must be unique.']}
+        assert queries == []
+
+    def test_writes_reload_this_process(self, catalog, admin):
+        assert admin.post('/api/v1/genres/', {
+            'name': 'Ужасы', 'slug': 'horror',
+        }).status_code == 201
+        response = APIClient().get('/api/v1/genres/')
+        assert 'horror' in [item['slug'] for item in response.json()['results']]
+
+    def test_version_reloads_other_processes(self, catalog, settings):
+        # A genre written by another process: no signal here, a new version.
+        Genre.objects.bulk_create([Genre(name='Ужасы', slug='horror')])
+        IndexVersion.objects.bump(INDEX_NAME)
+        settings.REFERENCE_CHECK_INTERVAL = 3600
+        assert references.get(Genre).by_slug('horror') is None
+        settings.REFERENCE_CHECK_INTERVAL = 0
+        assert references.get(Genre).by_slug('horror').name == 'Ужасы'
+
+    def test_unknown_ids_reload(self, catalog):
+        Category.objects.bulk_create([Category(name='Игра', slug='game')])
+        game = Category.objects.get(slug='game')
+        assert references.names(Category, game.pk) == ('Игра', 'game')
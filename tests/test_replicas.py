@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from api_yamdb.db import middleware, routers
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+
+class CatalogViewSet:
+    replica_reads = True
+
+
+def catalog_view(request):
+    return HttpResponse()
+
+
+catalog_view.cls = CatalogViewSet
+
+
+def plain_view(request):
+    return HttpResponse()
+
+
+@pytest.fixture
+def lags(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = ['replica1']
+    settings.DB_REPLICA_MAX_LAG = 5
+    lags = {'replica1': 0}
+    monkeypatch.setattr(routers, 'replica_lag', lags.get)
+    routers._lag_cache.clear()
+    return lags
+
+
+def route(request, view=catalog_view):
+    seen = {}
+
+    def get_response(request):
+        replica_middleware.process_view(request, view, (), {})
+        seen['alias'] = routers.ReplicaRouter().db_for_read(None)
+        return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+    replica_middleware = middleware.ReplicaMiddleware(get_response)
+    response = replica_middleware(request)
+    return seen['alias'], response
+
+
+class TestReplicaRouting:
+
+    def test_safe_catalog_reads_use_replica(self, lags):
+        alias, _ = route(RequestFactory().get('/api/v1/titles/'))
+        assert alias == 'replica1'
+        assert routers.read_alias.get() is None
+
+    def test_other_views_stay_on_primary(self, lags):
+        alias, _ = route(RequestFactory().get('/api/v1/users/'), plain_view)
+        assert alias is None
+
+    def test_write_pins_client_to_primary(self, lags, settings):
+        settings.DB_REPLICA_PIN_SECONDS = 5
+        alias, response = route(RequestFactory().post('/api/v1/titles/'))
+        assert alias is None
+        cookie = response.cookies[middleware.PIN_COOKIE]
+        assert float(cookie.value) > time.time()
+
+        request = RequestFactory().get('/api/v1/titles/')
+        request.COOKIES[middleware.PIN_COOKIE] = cookie.value
+        assert route(request)[0] is None
+
+    def test_expired_pin_reads_replica(self, lags):
+        request = RequestFactory().get('/api/v1/titles/')
+        request.COOKIES[middleware.PIN_COOKIE] = str(time.time() - 1)
+        assert route(request)[0] == 'replica1'
+
+    @pytest.mark.parametrize('lag', [30, None])
+    def test_lagging_or_down_replica_falls_back(self, lags, lag):
+        lags['replica1'] = lag
+        alias, _ = route(RequestFactory().get('/api/v1/titles/'))
+        assert alias is None
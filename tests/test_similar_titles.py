@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+from api import purge, similarity
+from django.core.management import call_command
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import (Review, SimilarityState, SimilarTitle, Title,
+                            User)
+
+# Author -> title number -> score. Titles 1 and 2 are liked by the same
+# authors, title 3 by the others.
+SCORES = {
+    'first': {1: 9, 2: 9, 3: 2},
+    'second': {1: 8, 2: 7, 3: 3},
+    'third': {1: 2, 2: 3, 3: 9},
+}
+
+
+def arrays(scores):
+    rows = [
+        (author, title, score)
+        for author, titles in enumerate(scores.values())
+        for title, score in titles.items()
+    ]
+    return np.array(rows).T
+
+
+class TestSimilarity:
+
+    def test_adjusted_cosine_neighbours(self):
+        matrix, title_ids = similarity.score_matrix(*arrays(SCORES))
+        rows, neighbours, scores, ranks = similarity.top_neighbours(
+            matrix, np.arange(3), k=5
+        )
+        pairs = {
+            (title_ids[row], title_ids[neighbour])
+            for row, neighbour in zip(rows, neighbours)
+        }
+        # Opposite tastes are not similar.
+        assert pairs == {(1, 2), (2, 1)}
+        assert scores.max() <= 1.0001
+        assert set(ranks) == {0}
+
+    def test_top_k_and_ranks(self):
+        scores = {
+            f'author{number}': {1: 9, 2: 8, 3: 7, 4: 1 + number % 3, 5: 2}
+            for number in range(6)
+        }
+        matrix, _ = similarity.score_matrix(*arrays(scores))
+        rows, _, values, ranks = similarity.top_neighbours(
+            matrix, np.arange(5), k=2
+        )
+        for row in set(rows):
+            assert list(ranks[rows == row]) == list(
+                range(len(ranks[rows == row]))
+            )
+            assert len(ranks[rows == row]) <= 2
+            assert list(values[rows == row]) == sorted(
+                values[rows == row], reverse=True
+            )
+
+    def test_processes_match_serial(self):
+        scores = {
+            f'author{number}': {
+                title: (number * title) % 10 + 1 for title in range(1, 30)
+                if (number + title) % 3
+            }
+            for number in range(40)
+        }
+        matrix, title_ids = similarity.score_matrix(*arrays(scores))
+        columns = np.arange(len(title_ids))
+        serial = similarity.compute(matrix, columns, 5, processes=1)
+        parallel = similarity.compute(
+            matrix, columns, 5, processes=2, chunk_size=7
+        )
+        for expected, actual in zip(serial, parallel):
+            assert np.allclose(expected, actual)
+
+
+    def test_fingerprints_follow_review_changes(self):
+        authors, titles, scores = arrays(SCORES)
+        base = similarity.fingerprints(authors, titles, scores)
+        shuffled = np.random.RandomState(1).permutation(len(titles))
+        assert list(similarity.fingerprints(
+            authors[shuffled], titles[shuffled], scores[shuffled]
+        )) == list(base)
+        scores[0] += 1
+        changed = similarity.fingerprints(authors, titles, scores)
+        assert list(changed != base) == [True, False, False]
+
+
+@pytest.fixture
+def titles(db):
+    titles = {
+        number: Title.objects.create(name=f'Title {number}', year=2000)
+        for number in range(1, 5)
+    }
+    for username, scores in SCORES.items():
+        author = User.objects.create(
+            username=username, email=f'{username}@yamdb.fake'
+        )
+        for number, score in scores.items():
+            titles[number].reviews.create(
+                author=author, text='Отзыв', score=score
+            )
+    return titles
+
+
+def similar(title):
+    response = APIClient().get(f'/api/v1/titles/{title.pk}/similar/')
+    assert response.status_code == 200
+    return [item['id'] for item in response.json()]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSimilarTitles:
+
+    def test_endpoint_serves_stored_neighbours(
+        self, titles, django_assert_num_queries
+    ):
+        call_command('similar_titles', '--full', '--processes=1')
+        with django_assert_num_queries(1):
+            response = APIClient().get(
+                f'/api/v1/titles/{titles[1].pk}/similar/'
+            )
+        assert response.status_code == 200
+        [neighbour] = response.json()
+        assert neighbour['id'] == titles[2].pk
+        assert neighbour['name'] == 'Title 2'
+        assert 0 < neighbour['score'] <= 1
+        assert similar(titles[4]) == []
+
+    def test_unknown_title(self, titles):
+        assert APIClient().get(
+            '/api/v1/titles/0/similar/'
+        ).status_code == 404
+
+    def test_incremental_refresh(self, titles, capsys):
+        call_command('similar_titles', '--full', '--processes=1')
+        assert SimilarityState.objects.count() == 3
+        call_command('similar_titles', '--processes=1')
+        assert 'of 0 titles' in capsys.readouterr().out
+
+        author = User.objects.create(username='fourth', email='4@yamdb.fake')
+        for number, score in ((4, 9), (1, 9), (3, 1)):
+            titles[number].reviews.create(
+                author=author, text='Отзыв', score=score
+            )
+        call_command('similar_titles', '--processes=1')
+        assert set(similar(titles[1])) == {titles[2].pk, titles[4].pk}
+        assert similar(titles[4]) == [titles[1].pk]
+
+        Review.objects.filter(title=titles[4]).delete()
+        call_command('similar_titles', '--processes=1')
+        assert similar(titles[1]) == [titles[2].pk]
+        assert similar(titles[4]) == []
+        assert not SimilarityState.objects.filter(title=titles[4]).exists()
+
+    def test_hidden_titles_are_no_neighbours(self, titles):
+        call_command('similar_titles', '--full', '--processes=1')
+        Title.objects.filter(pk=titles[2].pk).update(deleted_at=timezone.now())
+        assert similar(titles[1]) == []
+        assert APIClient().get(
+            f'/api/v1/titles/{titles[2].pk}/similar/'
+        ).status_code == 404
+        call_command('similar_titles', '--processes=1')
+        assert not SimilarTitle.objects.filter(
+            Q(title=titles[2]) | Q(similar=titles[2])
+        ).exists()
+
+    def test_full_refresh_purges_every_list(self, titles, settings):
+        settings.CACHE_PURGE_BACKEND = 'api.purge.LocMemBackend'
+        settings.CACHE_PURGE_BATCH_WINDOW = 60
+        call_command('similar_titles', '--full', '--processes=1')
+        Review.objects.filter(title=titles[2]).delete()
+        purge.dispatcher.pending.clear()
+        call_command('similar_titles', '--full', '--processes=1')
+        # Title 2 lost its reviews and its list with them.
+        assert purge.dispatcher.pending == {
+            f'title-{titles[number].pk}-similar' for number in (1, 2, 3)
+        }
+        purge.dispatcher.pending.clear()
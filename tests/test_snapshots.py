@@ -0,0 +1,152 @@
+import json
+import os
+
+import pytest
+from api import purge, snapshots
+from api_yamdb.db import middleware
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+
+
+@pytest.fixture
+def root(settings, tmp_path):
+    settings.SNAPSHOT_ROOT = str(tmp_path)
+    settings.SNAPSHOT_BASE_URL = 'https://yamdb.fake'
+    return tmp_path
+
+
+@pytest.fixture
+def catalog(db):
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    stalker = Title.objects.create(name='Сталкер', year=1979, category=movie)
+    stalker.genre.add(drama)
+    solaris = Title.objects.create(name='Солярис', year=1972)
+    return stalker, solaris
+
+
+def snapshot(root, path):
+    with open(os.path.join(root, path)) as file:
+        return json.load(file)
+
+
+def api(url):
+    return APIClient().get(url, HTTP_HOST='yamdb.fake', secure=True).json()
+
+
+@pytest.mark.django_db
+class TestSnapshots:
+
+    def test_whole_catalog(self, root, catalog):
+        stalker, solaris = catalog
+        call_command('publish_snapshots')
+        for path, url in (
+            ('api/v1/categories/index.json', '/api/v1/categories/'),
+            ('api/v1/genres/index.json', '/api/v1/genres/'),
+            ('api/v1/titles/index.json', '/api/v1/titles/'),
+            (f'api/v1/titles/{stalker.pk}/index.json',
+             f'/api/v1/titles/{stalker.pk}/'),
+            ('api/v1/titles/genre=drama.json', '/api/v1/titles/?genre=drama'),
+            ('api/v1/titles/category=movie.json',
+             '/api/v1/titles/?category=movie'),
+        ):
+            assert snapshot(root, path) == api(url)
+        assert snapshot(root, f'api/v1/titles/{solaris.pk}/index.json')
+        assert not [
+            name for _, _, names in os.walk(root) for name in names
+            if name.endswith('.tmp')
+        ]
+
+    def test_only_touched_files_are_rendered(self, root, catalog):
+        stalker, solaris = catalog
+        snapshots.publish_all()
+        Title.objects.filter(pk=solaris.pk).update(name='Солярис (1972)')
+        assert snapshots.publish({'titles', f'title-{solaris.pk}'}) == [
+            '/api/v1/titles/', f'/api/v1/titles/{solaris.pk}/'
+        ]
+        assert snapshot(
+            root, f'api/v1/titles/{solaris.pk}/index.json'
+        )['name'] == 'Солярис (1972)'
+
+    def test_titles_entering_a_genre(self, root, catalog):
+        stalker, solaris = catalog
+        snapshots.publish_all()
+        solaris.genre.add(Genre.objects.get(slug='drama'))
+        snapshots.publish({'titles', f'title-{solaris.pk}'})
+        page = snapshot(root, 'api/v1/titles/genre=drama.json')
+        assert {title['id'] for title in page['results']} == {
+            stalker.pk, solaris.pk
+        }
+
+    def test_genre_renamed(self, root, catalog):
+        stalker, _ = catalog
+        snapshots.publish_all()
+        genre = Genre.objects.get(slug='drama')
+        genre.name, genre.slug = 'Трагедия', 'tragedy'
+        genre.save()
+        snapshots.publish({'genres', f'genre-{genre.pk}'})
+        assert not (root / 'api/v1/titles/genre=drama.json').exists()
+        assert snapshot(root, 'api/v1/titles/genre=tragedy.json')['count'] == 1
+        title = snapshot(root, f'api/v1/titles/{stalker.pk}/index.json')
+        assert title['genre'] == [{'name': 'Трагедия', 'slug': 'tragedy'}]
+
+    def test_deleted_title_is_removed(self, root, catalog):
+        stalker, _ = catalog
+        snapshots.publish_all()
+        Title.objects.filter(pk=stalker.pk).delete()
+        snapshots.publish({'titles', f'title-{stalker.pk}'})
+        assert not (root / f'api/v1/titles/{stalker.pk}').joinpath(
+            'index.json'
+        ).exists()
+        assert snapshot(
+            root, 'api/v1/titles/genre=drama.json'
+        )['results'] == []
+
+    def test_links_use_the_public_url(self, root, catalog):
+        for year in range(2000, 2005):
+            Title.objects.create(name='Фильм', year=year)
+        snapshots.publish_all()
+        page = snapshot(root, 'api/v1/titles/index.json')
+        assert page['next'].startswith('https://yamdb.fake/api/v1/titles/')
+
+    def test_periodic_run_catches_up_with_lost_keys(self, root, catalog,
+                                                    monkeypatch):
+        stalker, _ = catalog
+        snapshots.publish_all()
+        # Renamed without a purge, as when the keys are lost.
+        Title.objects.filter(pk=stalker.pk).update(name='Пикник')
+
+        def interrupted(seconds):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(snapshots.time, 'sleep', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            call_command('publish_snapshots', '--every', '300')
+        assert snapshot(
+            root, f'api/v1/titles/{stalker.pk}/index.json'
+        )['name'] == 'Пикник'
+
+    def test_rendered_from_the_primary(self):
+        request = snapshots.build_request('/api/v1/titles/?genre=drama')
+        assert middleware.is_pinned(request)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSnapshotBackend:
+
+    def test_purged_keys_republish(self, root, catalog, settings):
+        settings.CACHE_PURGE_BACKEND = 'api.purge.LocMemBackend'
+        settings.CACHE_PURGE_BATCH_WINDOW = 60
+        snapshots.publish_all()
+        purge.dispatcher.pending.clear()
+        purge.LocMemBackend.purged.clear()
+        Genre.objects.create(name='Комедия', slug='comedy')
+        purge.dispatcher.flush()
+        for keys in purge.LocMemBackend.purged:
+            snapshots.SnapshotBackend().purge(keys)
+        genres = snapshot(root, 'api/v1/genres/index.json')
+        assert {genre['slug'] for genre in genres['results']} == {
+            'drama', 'comedy'
+        }
+        assert (root / 'api/v1/titles/genre=comedy.json').exists()
@@ -0,0 +1,88 @@
+import pytest
+from api.reference import references
+from api.serializers import TitleReadSerializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Review, Title, User
+
+
+@pytest.fixture
+def title(db):
+    title = Title.objects.create(
+        name='Сталкер',
+        year=1979,
+        description='Фильм Андрея Тарковского',
+        category=Category.objects.create(name='Фильм', slug='movie'),
+    )
+    title.genre.add(Genre.objects.create(name='Драма', slug='drama'))
+    for number, score in enumerate((7, 10)):
+        Review.objects.create(
+            title=title,
+            author=User.objects.create(
+                username=f'critic{number}', email=f'critic{number}@yamdb.fake'
+            ),
+            text='Отзыв',
+            score=score,
+        )
+    # Loaded at startup, see api.reference.
+    references.load()
+    return title
+
+
+def get(url):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get(url)
+    assert response.status_code == 200
+    return response.json(), [query['sql'] for query in queries]
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_full_title_listing(self, title):
+        data, queries = get('/api/v1/titles/')
+        assert set(data['results'][0]) == {
+            'id', 'name', 'year', 'description', 'genre', 'category', 'rating'
+        }
+        assert data['results'][0]['rating'] == 8.5
+        # The count version, COUNT, the page with its category and rating,
+        # the genres.
+        assert len(queries) == 4
+
+    def test_fields_narrow_payload_and_columns(self, title):
+        data, queries = get('/api/v1/titles/?fields=id,name,rating')
+        assert data['results'] == [
+            {'id': title.pk, 'name': 'Сталкер', 'rating': 8.5}
+        ]
+        version, count, page = queries
+        assert '"description"' not in page
+        assert 'reviews_category' not in page
+
+    def test_rating_is_computed_only_when_requested(self, title):
+        _, queries = get('/api/v1/titles/?fields=id,name')
+        assert 'AVG' not in queries[-1]
+
+    def test_rating_of_a_title_read_elsewhere(self, title):
+        data = TitleReadSerializer(Title.objects.get(pk=title.pk)).data
+        assert data['rating'] == 8.5
+
+    def test_exclude(self, title):
+        data, queries = get(
+            f'/api/v1/titles/{title.pk}/?exclude=description,genre'
+        )
+        assert set(data) == {'id', 'name', 'year', 'category', 'rating'}
+        assert len(queries) == 1
+
+    def test_reviews_without_author_skip_the_join(self, title):
+        data, queries = get(
+            f'/api/v1/titles/{title.pk}/reviews/?fields=id,score'
+        )
+        assert {item['score'] for item in data['results']} == {7, 10}
+        assert set(data['results'][0]) == {'id', 'score'}
+        assert 'reviews_user' not in queries[-1]
+        assert '"text"' not in queries[-1]
+
+    def test_unknown_fields_are_ignored(self, title):
+        data, _ = get('/api/v1/genres/?fields=slug,color')
+        assert data['results'] == [{'slug': 'drama'}]
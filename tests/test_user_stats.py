@@ -0,0 +1,158 @@
+from importlib import import_module
+
+import pytest
+from api import stats
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import (Comment, Genre, Review, Title, User,
+                            UserGenreStats, UserStats)
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='critic', email='critic@yamdb.fake')
+
+
+@pytest.fixture
+def genres(db):
+    return {
+        slug: Genre.objects.create(name=slug.title(), slug=slug)
+        for slug in ('drama', 'comedy', 'horror')
+    }
+
+
+@pytest.fixture
+def titles(genres):
+    titles = []
+    for number, slugs in enumerate((
+        ('drama',), ('drama', 'comedy'), ('drama', 'horror'), ()
+    )):
+        title = Title.objects.create(name=f'Title {number}', year=2000)
+        title.genre.set([genres[slug] for slug in slugs])
+        titles.append(title)
+    return titles
+
+
+@pytest.fixture
+def activity(author, titles):
+    reviews = [
+        Review.objects.create(
+            title=title, author=author, text='Отзыв', score=score
+        )
+        for title, score in zip(titles, (10, 7, 4, 3))
+    ]
+    reader = User.objects.create(username='reader', email='r@yamdb.fake')
+    for review in reviews[:2]:
+        Comment.objects.create(review=review, author=author, text='Да')
+        Comment.objects.create(review=review, author=reader, text='Нет')
+    return reviews
+
+
+def user_stats(username):
+    response = APIClient().get(f'/api/v1/users/{username}/stats/')
+    assert response.status_code == 200
+    return response.json()
+
+
+def computed(user):
+    """What the aggregate queries give for ``user``."""
+    rebuilt = stats.load(user)
+    return (
+        rebuilt.reviews_count,
+        rebuilt.score_sum,
+        rebuilt.comments_count,
+        {
+            row.genre.slug: row.reviews_count
+            for row in UserGenreStats.objects.filter(
+                user=user, reviews_count__gt=0
+            )
+        },
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestUserStats:
+
+    def test_stats_endpoint(self, author, activity, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            data = user_stats('critic')
+        assert data == {
+            'reviews_count': 4,
+            'average_score': 6.0,
+            'comments_count': 2,
+            'top_genres': [
+                {'slug': 'drama', 'name': 'Drama', 'reviews_count': 3},
+                {'slug': 'comedy', 'name': 'Comedy', 'reviews_count': 1},
+                {'slug': 'horror', 'name': 'Horror', 'reviews_count': 1},
+            ],
+        }
+
+    def test_user_without_activity(self, author):
+        assert user_stats('critic') == {
+            'reviews_count': 0,
+            'average_score': None,
+            'comments_count': 0,
+            'top_genres': [],
+        }
+        assert APIClient().get(
+            '/api/v1/users/nobody/stats/'
+        ).status_code == 404
+
+    def test_me_has_a_stats_block(self, author, activity):
+        client = APIClient()
+        client.force_authenticate(author)
+        data = client.get('/api/v1/users/me/').json()
+        assert data['username'] == 'critic'
+        assert data['stats']['reviews_count'] == 4
+
+    def test_writes_keep_stats_current(self, author, activity, genres,
+                                       titles):
+        review = activity[0]
+        review.score = 2
+        review.save()
+        activity[1].delete()
+        Comment.objects.filter(author=author).first().delete()
+        titles[3].genre.add(genres['horror'])
+        genres['drama'].title_set.remove(titles[2])
+        titles[2].genre.clear()
+        incremental = computed(author)
+
+        call_command('rebuild_user_stats')
+        assert computed(author) == incremental
+        assert incremental == (3, 9, 0, {'drama': 1, 'horror': 1})
+
+    def test_deleting_a_title_updates_its_reviewers(self, author, activity,
+                                                    titles):
+        titles[1].delete()
+        incremental = computed(author)
+        call_command('rebuild_user_stats')
+        assert computed(author) == incremental
+        assert UserStats.objects.get(user=author).reviews_count == 3
+
+    def test_score_is_read_on_updates_only(self, author, activity):
+        review = activity[0]
+        with CaptureQueriesContext(connection) as queries:
+            review.text = 'Другой'
+            review.save(update_fields=['text'])
+        assert not any(
+            query['sql'].startswith('SELECT') for query in queries
+        )
+        for score in (2, 5):
+            review.score = score
+            review.save()
+        assert UserStats.objects.get(user=author).score_sum == 5 + 7 + 4 + 3
+
+    def test_migration_fills_stats_of_existing_posts(self, author, activity):
+        incremental = computed(author)
+        # As before migration 0016: posts without statistics.
+        UserGenreStats.objects.all().delete()
+        UserStats.objects.all().delete()
+        import_module(
+            'reviews.migrations.0024_fill_user_stats'
+        ).fill_user_stats(apps, None)
+        assert computed(author) == incremental
+        activity[0].delete()
+        assert UserStats.objects.get(user=author).reviews_count == 3
@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title, User
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+# Statistics of the author kept current by api.stats, see test_user_stats.
+STATS_TABLES = (
+    '"reviews_userstats"', '"reviews_usergenrestats"', '"reviews_title_genre"',
+)
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='critic', email='critic@yamdb.fake')
+
+
+@pytest.fixture
+def client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+@pytest.fixture
+def review(author):
+    title = Title.objects.create(name='Сталкер', year=1979)
+    return Review.objects.create(
+        title=title, author=author, text='Шедевр', score=10
+    )
+
+
+def post(client, url, data):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, data)
+    statements = [
+        query['sql'].split()[0]
+        for query in queries.captured_queries
+        if not query['sql'].startswith(TRANSACTION_CONTROL)
+        and not any(table in query['sql'] for table in STATS_TABLES)
+    ]
+    return response, statements
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReviewWritePath:
+
+    def test_create_checks_title_and_inserts(self, client):
+        title = Title.objects.create(name='Солярис', year=1972)
+        response, statements = post(
+            client,
+            f'/api/v1/titles/{title.pk}/reviews/',
+            {'text': 'Хорошо', 'score': 8},
+        )
+        assert response.status_code == 201
+        assert statements == ['SELECT', 'INSERT']
+        assert Review.objects.get().title == title
+
+    def test_second_review_is_rejected(self, client, review):
+        response, _ = post(
+            client,
+            f'/api/v1/titles/{review.title_id}/reviews/',
+            {'text': 'Ещё раз', 'score': 1},
+        )
+        assert response.status_code == 400
+        assert response.json() == {
+            'detail': ['Not allowed to create multiple reviews.']
+        }
+        assert Review.objects.count() == 1
+
+    def test_missing_title_is_not_found(self, client):
+        response, statements = post(
+            client, '/api/v1/titles/999/reviews/', {'text': 'Нет', 'score': 1}
+        )
+        assert response.status_code == 404
+        assert statements == ['SELECT']
+
+    def test_missing_title_inside_a_transaction(self, client):
+        # Foreign keys checked at the outer commit would let the insert by.
+        with transaction.atomic():
+            response, _ = post(
+                client,
+                '/api/v1/titles/999/reviews/',
+                {'text': 'Нет', 'score': 1},
+            )
+            assert not Review.objects.exists()
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCommentWritePath:
+
+    def test_create_checks_review_and_inserts(self, client, review):
+        response, statements = post(
+            client,
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/',
+            {'text': 'Согласен'},
+        )
+        assert response.status_code == 201
+        assert statements == ['SELECT', 'INSERT']
+        assert Comment.objects.get().review == review
+
+    def test_review_of_other_title_is_not_found(self, client, review):
+        other = Title.objects.create(name='Зеркало', year=1975)
+        response, statements = post(
+            client,
+            f'/api/v1/titles/{other.pk}/reviews/{review.pk}/comments/',
+            {'text': 'Мимо'},
+        )
+        assert response.status_code == 404
+        assert statements == ['SELECT']